@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.bench_suggestions import misspell  # noqa: E402
+
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="word/document.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+
+
+def novel(size: int, seed: int) -> List[str]:
+    # Paragraphs of Zipf-distributed dictionary words with roughly one typo
+    # per hundred words, until the UTF-8 text reaches `size` bytes.
+    from services.hot_words import top_words
+
+    rng = random.Random(seed)
+    vocabulary = top_words(30000)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    paragraphs: List[str] = []
+    total = 0
+    while total < size:
+        sentences = []
+        for _ in range(rng.randint(2, 8)):
+            words = rng.choices(vocabulary, weights, k=rng.randint(5, 18))
+            words = [misspell(word, rng) if len(word) > 3 and rng.random() < 0.01 else word for word in words]
+            sentences.append(' '.join(words).capitalize() + rng.choice('..!?'))
+        paragraph = ' '.join(sentences)
+        paragraphs.append(paragraph)
+        total += len(paragraph.encode('utf-8')) + 1
+    return paragraphs
+
+
+def write_txt(paragraphs: List[str], path: Path) -> None:
+    path.write_text('\n'.join(paragraphs) + '\n', encoding='utf-8')
+
+
+def write_docx(paragraphs: List[str], path: Path) -> None:
+    # A minimal but valid WordprocessingML package; every paragraph is split
+    # into a few runs, as word processors do.
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', DOCX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', DOCX_RELS)
+        with archive.open('word/document.xml', 'w') as xml:
+            xml.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+            )
+            for paragraph in paragraphs:
+                runs = ''.join(
+                    f'<w:r><w:t xml:space="preserve">{escape(part)} </w:t></w:r>'
+                    for part in paragraph.split('. ')
+                )
+                xml.write(f'<w:p>{runs}</w:p>'.encode('utf-8'))
+            xml.write(b'</w:body></w:document>')
+
+
+def memory_kb() -> Dict[str, int]:
+    memory = {}
+    with open('/proc/self/status') as status:
+        for line in status:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'VmHWM'):
+                memory[key] = int(value.split()[0])
+    return memory
+
+
+def reset_peak() -> None:
+    # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux 4.0+).
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+async def child(path: Path, document_type: str, mode: str, pipeline: str) -> Dict[str, float]:
+    from loguru import logger
+
+    from services import nlp_service, spell_check_service
+    from services.document_service import process_document
+    from services.executor import shutdown_executors, start_executors
+    from services.spell_check_service import check_spelling_stream
+
+    logger.remove()
+    nlp_service.warm_up()
+    spell_check_service.warm_up()
+    start_executors(process_workers=0)
+
+    async def on_progress(report) -> None:
+        pass
+
+    reset_peak()
+    before = memory_kb()
+    started = time.perf_counter()
+    if pipeline == 'streaming':
+        with tempfile.TemporaryFile('w', encoding='utf-8') as output:
+            report = await process_document(path, document_type, mode, output, on_progress)
+        characters, words = report.characters, report.words
+    else:
+        # The previous upload path: the whole file in memory, decoded and
+        # checked by the in-memory chunked stream.
+        text = path.read_bytes().decode('utf-8-sig')
+        errors = []
+        async for progress in check_spelling_stream(text):
+            errors = progress.errors
+        characters, words = len(text), 0
+    elapsed = time.perf_counter() - started
+    after = memory_kb()
+    shutdown_executors()
+
+    return {
+        'seconds': elapsed,
+        'characters': characters,
+        'words': words,
+        'rss_before_mb': before['VmRSS'] / 1024,
+        'peak_growth_mb': (after['VmHWM'] - before['VmRSS']) / 1024,
+    }
+
+
+def run_case(path: Path, document_type: str, mode: str, pipeline: str) -> Dict[str, float]:
+    # Every case runs in a fresh interpreter so peak RSS is its own.
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', str(path), document_type, mode, pipeline],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        cwd=ROOT,
+        check=True,
+    ).stdout
+    return json.loads(output)
+
+
+def run(args: argparse.Namespace) -> None:
+    paragraphs = novel(args.size_mb * 1024 * 1024, args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        txt = Path(workdir) / 'novel.txt'
+        docx = Path(workdir) / 'novel.docx'
+        write_txt(paragraphs, txt)
+        write_docx(paragraphs, docx)
+        print(f'novel: {txt.stat().st_size / 1024 / 1024:.1f} MB txt, '
+              f'{docx.stat().st_size / 1024 / 1024:.1f} MB docx, {len(paragraphs)} paragraphs')
+
+        cases = [
+            (txt, 'txt', 'spell_check', 'in-memory'),
+            (txt, 'txt', 'spell_check', 'streaming'),
+            (docx, 'docx', 'spell_check', 'streaming'),
+            (txt, 'txt', 'lemmatize', 'streaming'),
+            (docx, 'docx', 'lemmatize', 'streaming'),
+        ]
+        print(f'{"file":>6}{"mode":>13}{"pipeline":>11}{"seconds":>9}{"MB/s":>7}{"words":>10}'
+              f'{"base RSS MB":>13}{"peak +MB":>10}')
+        for path, document_type, mode, pipeline in cases:
+            result = run_case(path, document_type, mode, pipeline)
+            throughput = txt.stat().st_size / 1024 / 1024 / result['seconds']
+            print(f'{document_type:>6}{mode:>13}{pipeline:>11}{result["seconds"]:>9.2f}{throughput:>7.2f}'
+                  f'{result["words"]:>10}{result["rss_before_mb"]:>13.0f}{result["peak_growth_mb"]:>10.1f}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        print(json.dumps(asyncio.run(child(Path(sys.argv[2]), *sys.argv[3:6]))))
+        sys.exit()
+
+    parser = argparse.ArgumentParser(description='Time and peak memory of processing an uploaded novel')
+    parser.add_argument('--size-mb', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    run(args)
@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PORT = 8766
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp(prefix="bench_db_")}/bench.db'
+os.environ['MAX_REQUESTS_PER_MINUTE'] = str(10 ** 9)
+os.environ['METRICS_PORT'] = '0'
+os.environ.setdefault('GIGACHAT_CREDENTIALS', 'ZmFrZTpmYWtl')
+os.environ['GIGACHAT_BASE_URL'] = f'http://127.0.0.1:{PORT}/api/v1'
+os.environ['GIGACHAT_AUTH_URL'] = f'http://127.0.0.1:{PORT}/api/v2/oauth'
+
+from loguru import logger  # noqa: E402
+
+from benchmarks.fake_gigachat import start_fake_server  # noqa: E402
+from handlers.message_handlers import (  # noqa: E402
+    handle_analyze,
+    handle_examples,
+    handle_lemmatize,
+    handle_pos,
+    handle_spell_check,
+)
+from models.database import close_db, init_db  # noqa: E402
+from services import nlp_service, spell_check_service  # noqa: E402
+from services.executor import shutdown_executors, start_executors  # noqa: E402
+from services.llm_service import llm_client  # noqa: E402
+from services.metrics import service_latency  # noqa: E402
+from services.query_log import query_log  # noqa: E402
+
+WORDS = [
+    'книга', 'красивый', 'бежать', 'дом', 'солнце', 'говорить', 'быстро', 'море',
+    'человек', 'время', 'работа', 'город', 'весёлый', 'читать', 'учитель', 'дорога',
+    'окно', 'зелёный', 'писать', 'лес', 'ребёнок', 'большой', 'думать', 'вода',
+]
+
+TEXTS = [
+    'Мама мыла раму, а папа читал газету на кухне.',
+    'Это написано корректна, но некоторые слава требуют праверки.',
+    'Вчера вечером мы долго гуляли по старому парку и разговаривали о будущем.',
+    'Русский язык богат синонимами, и выбрать точное слово бывает непросто.',
+    'Превед, как дила? Севодня очень хорошея пагода для прогулки.',
+    'Студенты внимательно слушали лекцию о морфологии современного русского языка.',
+]
+
+DB_OPERATIONS = ('db.history', 'db.clear_history', 'db.flush')
+
+COMMANDS = {
+    'analyze': (handle_analyze, WORDS),
+    'spell_check': (handle_spell_check, TEXTS),
+    'examples': (handle_examples, WORDS),
+    'lemmatize': (handle_lemmatize, TEXTS),
+    'pos': (handle_pos, TEXTS),
+}
+
+
+class ReplySink:
+    def __init__(self) -> None:
+        self.messages = 0
+        self.chars = 0
+
+    def record(self, text: str) -> None:
+        self.messages += 1
+        self.chars += len(text)
+
+
+class FakeChat:
+    async def send_action(self, action: str) -> None:
+        pass
+
+
+class FakeSentMessage:
+    def __init__(self, sink: ReplySink) -> None:
+        self.sink = sink
+
+    async def edit_text(self, text: str, parse_mode: Optional[str] = None) -> None:
+        self.sink.record(text)
+
+
+class FakeMessage:
+    def __init__(self, sink: ReplySink) -> None:
+        self.sink = sink
+        self.chat = FakeChat()
+
+    async def reply_text(self, text: str, parse_mode: Optional[str] = None) -> FakeSentMessage:
+        self.sink.record(text)
+        return FakeSentMessage(self.sink)
+
+
+class FakeUser:
+    def __init__(self, user_id: int) -> None:
+        self.id = user_id
+
+
+class FakeUpdate:
+    def __init__(self, user_id: int, sink: ReplySink) -> None:
+        self.effective_user = FakeUser(user_id)
+        self.message = FakeMessage(sink)
+
+
+class FakeContext:
+    def __init__(self, args: List[str]) -> None:
+        self.args = args
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def db_seconds() -> float:
+    return sum(service_latency.total(operation) for operation in DB_OPERATIONS)
+
+
+async def call(handler, corpus: List[str], rng: random.Random, sink: ReplySink) -> float:
+    update = FakeUpdate(rng.randrange(1000), sink)
+    context = FakeContext(rng.choice(corpus).split())
+    started = time.perf_counter()
+    await handler(update, context)
+    return time.perf_counter() - started
+
+
+async def measure_allocations(handler, corpus: List[str], samples: int) -> Dict[str, float]:
+    # Sequential calls, so each peak belongs to one request. Work done in
+    # executor processes is not visible to tracemalloc.
+    rng = random.Random(2)
+    sink = ReplySink()
+    peaks = []
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for _ in range(samples):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        await call(handler, corpus, rng, sink)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    return {
+        'alloc_peak_kb_avg': sum(peaks) / len(peaks) / 1024,
+        'alloc_peak_kb_max': max(peaks) / 1024,
+        'alloc_retained_kb': retained / 1024,
+    }
+
+
+async def bench_command(
+        name: str,
+        requests: int,
+        concurrency: int,
+        alloc_samples: int,
+        warmup: int,
+) -> Dict[str, Any]:
+    handler, corpus = COMMANDS[name]
+    rng = random.Random(1)
+    sink = ReplySink()
+
+    # Unmeasured calls first: executor workers finish loading and caches
+    # reach the state a running bot would have.
+    await asyncio.gather(*(call(handler, corpus, rng, ReplySink()) for _ in range(warmup)))
+    await query_log.flush()
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            latencies.append(await call(handler, corpus, rng, sink))
+
+    db_before = db_seconds()
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    await query_log.flush()
+    elapsed = time.perf_counter() - started
+    db_time = db_seconds() - db_before
+
+    latencies.sort()
+    result = {
+        'requests': requests,
+        'concurrency': concurrency,
+        'elapsed_s': elapsed,
+        'throughput_rps': requests / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'db_ms_per_request': db_time / requests * 1000,
+        'replies': sink.messages,
+        'reply_chars': sink.chars,
+    }
+    if alloc_samples:
+        result.update(await measure_allocations(handler, corpus, alloc_samples))
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_report(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]]) -> None:
+    columns = ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'db_ms_per_request', 'alloc_peak_kb_avg')
+    print(f'{"command":<12}' + ''.join(f'{column:>20}' for column in columns))
+
+    for name, result in results.items():
+        cells = []
+        for column in columns:
+            value = result.get(column)
+            if value is None:
+                cells.append(f'{"-":>20}')
+                continue
+            cell = f'{value:.2f}'
+            previous = (baseline or {}).get(name, {}).get(column)
+            if previous:
+                cell += f' ({(value - previous) / previous * 100:+.0f}%)'
+            cells.append(f'{cell:>20}')
+        print(f'{name:<12}' + ''.join(cells))
+
+
+async def run(args: argparse.Namespace) -> None:
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+
+    init_db()
+    nlp_service.warm_up()
+    spell_check_service.warm_up()
+    start_executors()
+    llm_client.start()
+    runner = await start_fake_server(port=PORT, latency=args.llm_latency)
+
+    results = {}
+    for name in args.commands:
+        results[name] = await bench_command(
+            name, args.requests, args.concurrency, args.alloc_samples, args.warmup
+        )
+
+    await runner.cleanup()
+    await llm_client.close()
+    shutdown_executors()
+    await close_db()
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'warmup': args.warmup,
+            'llm_latency': args.llm_latency,
+        },
+        'commands': results,
+    }
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))['commands']
+    print_report(results, baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f'Saved results to {args.output}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Drive the real handlers with fake updates, offline')
+    parser.add_argument('--commands', nargs='+', choices=list(COMMANDS), default=list(COMMANDS))
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--warmup', type=int, default=50, help='unmeasured requests per command')
+    parser.add_argument('--llm-latency', type=float, default=0.2)
+    parser.add_argument('--alloc-samples', type=int, default=50,
+                        help='sequential requests traced with tracemalloc (0 disables)')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='JSON file from an earlier run to diff against')
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
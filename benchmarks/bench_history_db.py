@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DB_PATH = Path(tempfile.mkdtemp(prefix='bench_db_')) / 'history.db'
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from models.database import close_db, init_db  # noqa: E402
+from services.retention import compact_history  # noqa: E402
+
+LEGACY_SCHEMA = '''
+CREATE TABLE user_queries (
+    id INTEGER NOT NULL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    command VARCHAR(50) NOT NULL,
+    query_text TEXT NOT NULL,
+    response_text TEXT NOT NULL,
+    created_at DATETIME
+);
+CREATE INDEX ix_user_queries_id ON user_queries (id);
+CREATE INDEX ix_user_queries_user_id ON user_queries (user_id);
+CREATE INDEX ix_user_queries_created_at ON user_queries (created_at);
+'''
+
+HISTORY_SQL = (
+    'SELECT command, query_text, created_at FROM user_queries '
+    'WHERE user_id = ? ORDER BY created_at DESC LIMIT 10'
+)
+COUNT_SQL = 'SELECT COUNT(id) FROM user_queries WHERE user_id = ? AND created_at >= ?'
+
+
+def populate(rows: int, users: int) -> None:
+    connection = sqlite3.connect(DB_PATH)
+    connection.executescript(LEGACY_SCHEMA)
+    connection.execute('PRAGMA synchronous=OFF')
+
+    rng = random.Random(1)
+    start = datetime.utcnow() - timedelta(days=90)
+    step = timedelta(days=90) / rows
+    batch = 100_000
+
+    for offset in range(0, rows, batch):
+        connection.executemany(
+            'INSERT INTO user_queries (user_id, command, query_text, response_text, created_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (
+                (
+                    # A few very active users on top of a uniform tail.
+                    rng.randrange(100) if rng.random() < 0.2 else rng.randrange(users),
+                    '/analyze',
+                    'слово',
+                    'ответ ' * 20,
+                    (start + step * i).strftime('%Y-%m-%d %H:%M:%S.%f'),
+                )
+                for i in range(offset, min(offset + batch, rows))
+            ),
+        )
+        connection.commit()
+    connection.close()
+
+
+def measure(label: str, users: int, iterations: int) -> None:
+    connection = sqlite3.connect(DB_PATH)
+    rng = random.Random(2)
+    since = (datetime.utcnow() - timedelta(minutes=1)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    for name, sql, params in (
+            ('history', HISTORY_SQL, lambda: (rng.randrange(users),)),
+            ('count', COUNT_SQL, lambda: (rng.randrange(users), since)),
+    ):
+        plan = connection.execute(f'EXPLAIN QUERY PLAN {sql}', params()).fetchall()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            connection.execute(sql, params()).fetchall()
+        elapsed = (time.perf_counter() - started) / iterations * 1000
+        print(f'{label:<10} {name:<8} {elapsed:8.3f} ms/query   plan: {plan[-1][-1]}')
+
+    connection.close()
+
+
+def table_rows() -> int:
+    connection = sqlite3.connect(DB_PATH)
+    count = connection.execute('SELECT COUNT(*) FROM user_queries').fetchone()[0]
+    connection.close()
+    return count
+
+
+async def run(rows: int, users: int, iterations: int, keep_rows: int) -> None:
+    started = time.perf_counter()
+    populate(rows, users)
+    print(f'populated {rows} rows for {users} users in {time.perf_counter() - started:.1f} s')
+    measure('legacy', users, iterations)
+
+    started = time.perf_counter()
+    init_db()
+    print(f'migration took {time.perf_counter() - started:.1f} s')
+    measure('composite', users, iterations)
+
+    stats = await compact_history(keep_rows=keep_rows)
+    print(f'compaction: {stats}, rows left: {table_rows()}, '
+          f'file: {DB_PATH.stat().st_size / 1024 / 1024:.1f} MB')
+    measure('compacted', users, iterations)
+
+    await close_db()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark user_queries indexes and retention')
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--users', type=int, default=50_000)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--keep-rows', type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.rows, args.users, args.iterations, args.keep_rows))
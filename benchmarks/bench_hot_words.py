@@ -0,0 +1,106 @@
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_suggestions import misspell  # noqa: E402
+from services import nlp_service  # noqa: E402
+from services.hot_words import HotWords, top_words  # noqa: E402
+from services.index_file import write_atomic  # noqa: E402
+from services.spell_check_service import get_spell  # noqa: E402
+
+
+def query_log(path: Optional[str], queries: int, typo_share: float, rng: random.Random) -> List[str]:
+    # Without a recorded log, queries are drawn from the whole frequency list
+    # weighted by corpus frequency (the long tail falls outside the table),
+    # with a share of misspelled words that no table can answer.
+    if path:
+        words = [line.strip().lower() for line in Path(path).read_text(encoding='utf-8').splitlines()]
+        return [word for word in words if word]
+
+    frequency = get_spell().word_frequency.dictionary
+    words = list(frequency)
+    log = rng.choices(words, weights=[frequency[word] for word in words], k=queries)
+    return [
+        misspell(word, rng) if len(word) > 3 and rng.random() < typo_share else word
+        for word in log
+    ]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def measure(lookup: Callable[[str], object], words: List[str]) -> Dict[str, float]:
+    latencies = []
+    for word in words:
+        started = time.perf_counter()
+        lookup(word)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        'mean_us': sum(latencies) / len(latencies) * 1e6,
+        'p50_us': percentile(latencies, 0.50) * 1e6,
+        'p99_us': percentile(latencies, 0.99) * 1e6,
+    }
+
+
+def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    path = Path(args.table) if args.table else Path(tempfile.mkdtemp(prefix='hot_words_')) / 'hot_words.bin'
+
+    if not args.table or not path.exists():
+        started = time.perf_counter()
+        write_atomic(path, nlp_service.build_hot_words(top_words(args.top)))
+        print(f'built table:         {args.top} words in {time.perf_counter() - started:.1f} s')
+
+    started = time.perf_counter()
+    table = HotWords.load(path)
+    print(f'table:               {len(table)} words, {path.stat().st_size / 1024:.0f} KiB, '
+          f'loaded in {(time.perf_counter() - started) * 1000:.2f} ms')
+
+    words = query_log(args.log, args.queries, args.typo_share, rng)
+    nlp_service.get_morph()
+
+    # No LRU caches here: every query pays the full lookup, which is what a
+    # cold cache or a cache miss costs.
+    def baseline(word: str) -> object:
+        return nlp_service._build_morphology(word)
+
+    def with_table(word: str) -> object:
+        entry = table.morphology(word)
+        if entry is None:
+            return nlp_service._build_morphology(word)
+        return entry, table.paradigm(word)
+
+    hits = [word for word in words if table.word_id(word) is not None]
+    print(f'queries:             {len(words)} ({len(set(words))} distinct)')
+    print(f'hit rate:            {len(hits) / len(words) * 100:.1f}% of queries, '
+          f'{len(set(hits)) / len(set(words)) * 100:.1f}% of distinct words')
+
+    print(f'{"":<21}{"mean us":>10}{"p50 us":>10}{"p99 us":>10}')
+    for name, lookup, sample in (
+            ('pymorphy3', baseline, words),
+            ('hot table + fallback', with_table, words),
+            ('hot table hits only', with_table, hits),
+    ):
+        result = measure(lookup, sample)
+        print(f'{name:<21}{result["mean_us"]:>10.1f}{result["p50_us"]:>10.1f}{result["p99_us"]:>10.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Hit rate and latency of the hot words table')
+    parser.add_argument('--table', help='existing table to use (built into a temp dir if omitted)')
+    parser.add_argument('--top', type=int, default=10000, help='words to build into the table')
+    parser.add_argument('--log', help='file with one queried word per line instead of a synthetic log')
+    parser.add_argument('--queries', type=int, default=20000)
+    parser.add_argument('--typo-share', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    run(args)
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ['METRICS_PORT'] = '0'
+
+from loguru import logger  # noqa: E402
+
+from handlers.inline_handlers import handle_inline_query  # noqa: E402
+from services import inline_service, nlp_service, spell_check_service  # noqa: E402
+from services.executor import shutdown_executors, start_executors  # noqa: E402
+from services.hot_words import top_words  # noqa: E402
+
+
+class FakeInlineQuery:
+    def __init__(self, user_id: int, query: str, answered: List[float], received: float) -> None:
+        self.query = query
+        self.from_user = SimpleNamespace(id=user_id)
+        self._answered = answered
+        self._received = received
+        self.results: List[Any] = []
+
+    async def answer(self, results: List[Any], cache_time: int = 300) -> None:
+        self.results = results
+        self._answered.append(time.perf_counter() - self._received)
+
+
+async def type_word(user_id: int, word: str, keystroke: float, rng: random.Random,
+                    answered: List[float], tasks: List[asyncio.Task]) -> None:
+    # Every keystroke is a separate inline query, handled concurrently as
+    # the dispatcher does for updates without a chat.
+    for length in range(1, len(word) + 1):
+        query = FakeInlineQuery(user_id, word[:length], answered, time.perf_counter())
+        update = SimpleNamespace(inline_query=query)
+        tasks.append(asyncio.create_task(handle_inline_query(update, None)))
+        await asyncio.sleep(rng.uniform(0.5, 1.5) * keystroke)
+
+
+async def run_scenario(words: List[str], args: argparse.Namespace, debounce: float) -> Dict[str, Any]:
+    rng = random.Random(1)
+    inline_service.latest_queries.delay = debounce
+    inline_service.completion_cache.clear()
+    before = inline_service.latest_queries.stats()
+    answered: List[float] = []
+    tasks: List[asyncio.Task] = []
+
+    async def user(user_id: int) -> None:
+        for _ in range(args.words_per_user):
+            await type_word(user_id, rng.choice(words), args.keystroke, rng, answered, tasks)
+            await asyncio.sleep(args.keystroke * 3)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(user_id) for user_id in range(args.users)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    after = inline_service.latest_queries.stats()
+    answered.sort()
+    return {
+        'queries': len(tasks),
+        'answered': len(answered),
+        'superseded': after['superseded'] - before['superseded'],
+        'p50_ms': answered[len(answered) // 2] * 1000,
+        'p99_ms': answered[min(int(len(answered) * 0.99), len(answered) - 1)] * 1000,
+        'max_ms': answered[-1] * 1000,
+        'qps': len(tasks) / elapsed,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+
+    started = time.perf_counter()
+    nlp_service.warm_up()
+    spell_check_service.warm_up()
+    inline_service.warm_up()
+    start_executors(process_workers=0)
+    print(f'dictionaries and prefix index loaded in {time.perf_counter() - started:.2f} s, '
+          f'{len(inline_service.get_prefix_index())} lemmas, '
+          f'hot words table: {"yes" if nlp_service.get_hot_words() else "no"}')
+
+    index = inline_service.get_prefix_index()
+    samples = []
+    for prefix in ('к', 'кн', 'кни', 'книг', 'по', 'пред', 'красив'):
+        lookup_started = time.perf_counter()
+        for _ in range(1000):
+            index.complete(prefix, 8)
+        samples.append(f'{prefix}: {(time.perf_counter() - lookup_started) * 1000:.0f} µs')
+    print('prefix lookup (uncached): ' + ', '.join(samples))
+
+    words = [word for word in top_words(args.vocabulary) if len(word) > 3]
+    print(f'{"caches":>6}{"debounce ms":>12}{"queries":>9}{"answered":>10}{"superseded":>12}'
+          f'{"p50 ms":>9}{"p99 ms":>9}{"max ms":>9}{"q/s":>8}')
+    # The first pass starts with empty caches; later ones run warm, as on a
+    # bot that has been up for a while.
+    for label, debounce in [('cold', args.debounce[0])] + [('warm', value) for value in args.debounce]:
+        result = await run_scenario(words, args, debounce / 1000)
+        print(f'{label:>6}{debounce:>12.0f}{result["queries"]:>9}{result["answered"]:>10}{result["superseded"]:>12}'
+              f'{result["p50_ms"]:>9.1f}{result["p99_ms"]:>9.1f}{result["max_ms"]:>9.1f}{result["qps"]:>8.0f}')
+    print('latency is from receiving the inline query to answering it, debounce included')
+    shutdown_executors()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Server-side latency of inline queries while users type')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--words-per-user', type=int, default=5)
+    parser.add_argument('--keystroke', type=float, default=0.08, help='mean seconds between keystrokes')
+    parser.add_argument('--vocabulary', type=int, default=20000)
+    parser.add_argument('--debounce', type=float, nargs='+', default=[0, 20, 100])
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PORT = 8765
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp(prefix="bench_db_")}/bench.db'
+os.environ.setdefault('GIGACHAT_CREDENTIALS', 'ZmFrZTpmYWtl')
+os.environ['GIGACHAT_BASE_URL'] = f'http://127.0.0.1:{PORT}/api/v1'
+os.environ['GIGACHAT_AUTH_URL'] = f'http://127.0.0.1:{PORT}/api/v2/oauth'
+
+from benchmarks.fake_gigachat import start_fake_server  # noqa: E402
+from models.database import close_db, init_db  # noqa: E402
+from services.examples_cache import examples_cache  # noqa: E402
+from services.llm_service import generate_examples, llm_client  # noqa: E402
+
+WORDS = ['красивый', 'книга', 'бежать', 'дом', 'солнце', 'говорить', 'быстро', 'море']
+
+
+async def run(requests: int, latency: float, rounds: int) -> None:
+    init_db()
+    runner = await start_fake_server(port=PORT, latency=latency)
+    llm_client.start()
+
+    rng = random.Random(1)
+    latencies = []
+
+    async def one() -> None:
+        started = time.perf_counter()
+        await generate_examples(rng.choice(WORDS), count=3)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    await llm_client.close()
+    state = runner.app['state']
+    await runner.cleanup()
+    await close_db()
+
+    latencies.sort()
+    print(f'requests:         {requests} x {rounds} rounds')
+    print(f'elapsed:          {elapsed:.2f} s')
+    print(f'p50/p99 latency:  {latencies[len(latencies) // 2] * 1000:.0f} / '
+          f'{latencies[int(len(latencies) * 0.99)] * 1000:.0f} ms')
+    print(f'upstream calls:   {state["chat_requests"]}')
+    print(f'token exchanges:  {state["token_requests"]}')
+    print(f'client stats:     {llm_client.stats()}')
+    print(f'examples cache:   {examples_cache.stats()}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark generate_examples against a fake GigaChat')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.requests, args.latency, args.rounds))
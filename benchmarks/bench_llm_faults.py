@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PORT = 8767
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp(prefix="bench_db_")}/bench.db'
+os.environ.setdefault('GIGACHAT_CREDENTIALS', 'ZmFrZTpmYWtl')
+os.environ['GIGACHAT_BASE_URL'] = f'http://127.0.0.1:{PORT}/api/v1'
+os.environ['GIGACHAT_AUTH_URL'] = f'http://127.0.0.1:{PORT}/api/v2/oauth'
+# Short deadlines so the scenario finishes quickly, and a pool that never
+# fills, so every request goes upstream while fallbacks still find examples.
+os.environ.setdefault('LLM_ATTEMPT_TIMEOUT_SECONDS', '1')
+os.environ.setdefault('REQUEST_TIMEOUT_SECONDS', '3')
+os.environ.setdefault('LLM_BREAKER_RESET_SECONDS', '2')
+os.environ['EXAMPLES_POOL_SIZE'] = '1000'
+
+from loguru import logger  # noqa: E402
+
+from benchmarks.fake_gigachat import start_fake_server  # noqa: E402
+from config import LLM_BREAKER_RESET_SECONDS  # noqa: E402
+from models.database import close_db, init_db  # noqa: E402
+from services import llm_service  # noqa: E402
+from services.examples_cache import examples_cache  # noqa: E402
+from services.llm_service import generate_examples, llm_client  # noqa: E402
+
+WORDS = [
+    'книга', 'красивый', 'бежать', 'дом', 'солнце', 'говорить', 'быстро', 'море',
+    'человек', 'время', 'работа', 'город', 'весёлый', 'читать', 'учитель', 'дорога',
+]
+
+HEALTHY = {'failure_rate': 0.0, 'slow_rate': 0.0}
+
+# (name, faults, hedging enabled)
+PHASES = [
+    ('healthy', HEALTHY, True),
+    ('slow tail, no hedge', {'slow_rate': 0.03, 'slow_latency': 0.8}, False),
+    ('slow tail, hedged', {'slow_rate': 0.03, 'slow_latency': 0.8}, True),
+    ('30% errors', {'slow_rate': 0.0, 'failure_rate': 0.3}, True),
+    ('outage', {'failure_rate': 1.0}, True),
+    ('hanging upstream', {'failure_rate': 0.0, 'slow_rate': 1.0, 'slow_latency': 30.0}, True),
+    ('recovered', HEALTHY, True),
+]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def run_phase(requests: int, concurrency: int, rng: random.Random) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    answered = 0
+
+    async def one() -> None:
+        nonlocal answered
+        async with semaphore:
+            started = time.perf_counter()
+            if await generate_examples(rng.choice(WORDS), count=3):
+                answered += 1
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    latencies.sort()
+    return {
+        'answered': answered,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    logger.remove()
+    logger.add(sys.stderr, level='CRITICAL')
+
+    init_db()
+    runner = await start_fake_server(port=PORT, latency=args.latency)
+    state = runner.app['state']
+    llm_client.start()
+    rng = random.Random(1)
+    hedge_percentile = llm_service.LLM_HEDGE_PERCENTILE
+
+    columns = ('answered', 'fallback', 'upstream', 'retries', 'hedges', 'timeouts', 'p50_ms', 'p99_ms', 'max_ms')
+    print(f'{"phase":<22}' + ''.join(f'{column:>10}' for column in columns) + '  breaker')
+
+    for name, faults, hedge in PHASES:
+        if llm_client.breaker.state == llm_client.breaker.OPEN:
+            # Every phase starts with the breaker at least half-open, so the
+            # first call probes the new upstream behaviour.
+            await asyncio.sleep(LLM_BREAKER_RESET_SECONDS)
+        state.update(faults)
+        llm_service.LLM_HEDGE_PERCENTILE = hedge_percentile if hedge else 0.0
+
+        before = {**llm_client.stats(), 'fallback': examples_cache.fallback_hits, 'upstream': state['chat_requests']}
+        result = await run_phase(args.requests, args.concurrency, rng)
+        after = {**llm_client.stats(), 'fallback': examples_cache.fallback_hits, 'upstream': state['chat_requests']}
+
+        for key in ('fallback', 'upstream', 'retries', 'hedges', 'timeouts'):
+            result[key] = after[key] - before[key]
+        breaker = llm_client.breaker.state
+        print(
+            f'{name:<22}'
+            + ''.join(
+                f'{result[column]:>10.0f}' if column.endswith('_ms') else f'{result[column]:>10}'
+                for column in columns
+            )
+            + f'  {breaker}'
+        )
+
+    await llm_client.close()
+    await runner.cleanup()
+    await close_db()
+    print(f'requests per phase: {args.requests}, answered includes fallbacks to cached examples')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Drive generate_examples through injected GigaChat faults')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import sys
+import timeit
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger  # noqa: E402
+
+from services import nlp_service, render  # noqa: E402
+from services.spell_check_service import find_spelling_errors  # noqa: E402
+from services.stats_service import analyze_texts  # noqa: E402
+from services.user_service import encode_result  # noqa: E402
+
+TEXT = (
+    'Это написано корректна, но некоторые слава требуют праверки. Вчера вечером мы долго '
+    'гуляли по старому парку и разговаривали о будущем. Превед, как дила? Севодня очень '
+    'хорошея пагода для прогулки. Студенты внимательно слушали лекцию о морфологии.'
+)
+EXAMPLES = [
+    'Красивый закат озарил небо яркими красками.',
+    'Она надела красивое платье для праздника.',
+    'На картине изображён красивый пейзаж & <подпись> автора.',
+]
+HISTORY = [('/analyze', 'книга', '01.12 10:00'), ('/spell_check', TEXT, '01.12 10:01')] * 5
+
+
+def measure(call: Callable[[], Any], number: int) -> Tuple[float, int, int]:
+    # Best of three runs in µs per call, then the bytes allocated while
+    # rendering once (output included) and the output length.
+    seconds = min(timeit.repeat(call, number=number, repeat=3)) / number
+    tracemalloc.start()
+    output = call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds * 1e6, peak, len(output)
+
+
+async def inputs() -> Dict[str, Any]:
+    analysis = await nlp_service.analyze_word('красивый')
+    paradigm = await nlp_service.get_paradigm('красивый')
+    errors = find_spelling_errors(TEXT)
+    for error in errors:
+        error['positions'] = error['positions'] * 2
+    return {
+        'analysis': analysis,
+        'paradigm': paradigm,
+        'errors': errors,
+        'lemmas': await nlp_service.lemmatize_text(TEXT * 5),
+        'pos': await nlp_service.extract_pos(TEXT * 5),
+        'stats': await analyze_texts([TEXT * 5]),
+    }
+
+
+def cases(data: Dict[str, Any]) -> List[Tuple[str, Callable[[], Any]]]:
+    def analysis_cold() -> str:
+        render.paradigm_text_cache.clear()
+        return render.render_analysis(data['analysis'], data['paradigm'])
+
+    return [
+        ('analysis (table cached)', lambda: render.render_analysis(data['analysis'], data['paradigm'])),
+        ('analysis (table rendered)', analysis_cold),
+        ('inline description', lambda: render.render_inline_description(data['analysis'])),
+        ('spell check result', lambda: render.render_spell_check_result(data['errors'])),
+        ('document progress', lambda: render.render_document_progress('spell_check', 0.42, 123456, 9876)),
+        ('document summary', lambda: render.render_document_summary(
+            'spell_check', 5000000, 800000, 40000, Counter({e['word']: len(e['positions']) for e in data['errors']})
+        )),
+        ('examples (escaped)', lambda: render.render_examples('красивый', EXAMPLES)),
+        ('history', lambda: render.render_history(HISTORY)),
+        ('lemmas', lambda: render.render_lemmas(data['lemmas'])),
+        ('pos', lambda: render.render_pos(data['pos'])),
+        ('stats', lambda: render.render_stats(data['stats'], 'текст сообщения')),
+        ('stored result', lambda: encode_result({'errors': 12, 'words': [e['word'] for e in data['errors']]})),
+    ]
+
+
+def run(args: argparse.Namespace) -> None:
+    logger.remove()
+    data = asyncio.run(inputs())
+
+    print(f'{"formatter":<28}{"µs/call":>10}{"alloc B":>10}{"chars":>8}')
+    for name, call in cases(data):
+        micros, allocated, chars = measure(call, args.number)
+        print(f'{name:<28}{micros:>10.1f}{allocated:>10}{chars:>8}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of the reply templates')
+    parser.add_argument('--number', type=int, default=2000, help='calls per timing run')
+    args = parser.parse_args()
+
+    run(args)
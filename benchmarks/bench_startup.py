@@ -0,0 +1,85 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+scenario, settle = sys.argv[1], float(sys.argv[2])
+
+started = time.perf_counter()
+from services import nlp_service, spell_check_service
+imported = time.perf_counter()
+if scenario == 'eager':
+    # What importing the services used to cost: both dictionaries parsed in full.
+    import pymorphy3
+    from spellchecker import SpellChecker
+    morph = pymorphy3.MorphAnalyzer()
+    spell = SpellChecker(language='ru')
+    warmed = time.perf_counter()
+else:
+    if scenario == 'warm':
+        nlp_service.warm_up()
+        spell_check_service.warm_up()
+    warmed = time.perf_counter()
+
+time.sleep(settle)
+
+memory = {{}}
+for name in ('/proc/self/smaps_rollup', '/proc/self/status'):
+    try:
+        for line in open(name):
+            key, _, value = line.partition(':')
+            if key in ('Rss', 'Pss', 'VmRSS'):
+                memory[key] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+
+print(json.dumps({{
+    'import_s': imported - started,
+    'warm_up_s': warmed - imported,
+    'rss_mb': memory.get('Rss', memory.get('VmRSS', 0.0)),
+    'pss_mb': memory.get('Pss', 0.0),
+}}))
+'''
+
+
+def run_scenario(scenario: str, processes: int) -> dict:
+    code = CHILD.format(root=str(ROOT))
+    settle = 2.0 if processes > 1 else 0.0
+    started = time.perf_counter()
+    children = [
+        subprocess.Popen(
+            [sys.executable, '-c', code, scenario, str(settle)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=ROOT,
+        )
+        for _ in range(processes)
+    ]
+    results = [json.loads(child.communicate()[0]) for child in children]
+    wall = time.perf_counter() - started - settle
+
+    return {
+        'scenario': scenario,
+        'processes': processes,
+        'wall_s': round(wall, 3),
+        'import_s': round(max(r['import_s'] for r in results), 3),
+        'warm_up_s': round(max(r['warm_up_s'] for r in results), 3),
+        'rss_mb_per_process': round(sum(r['rss_mb'] for r in results) / processes, 1),
+        'pss_mb_total': round(sum(r['pss_mb'] for r in results), 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure dictionary start-up time and memory')
+    parser.add_argument('--processes', type=int, default=1, help='concurrent processes per scenario')
+    args = parser.parse_args()
+
+    for scenario in ('eager', 'lazy', 'warm'):
+        print(json.dumps(run_scenario(scenario, args.processes), ensure_ascii=False))
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Awaitable, Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ['METRICS_PORT'] = '0'
+
+from loguru import logger  # noqa: E402
+
+from benchmarks.bench_documents import novel  # noqa: E402
+from services import nlp_service, spell_check_service  # noqa: E402
+from services.executor import shutdown_executors, start_executors  # noqa: E402
+from services.stats_service import analyze_texts, morphology_table  # noqa: E402
+
+
+async def per_word_lists(texts: List[str]) -> int:
+    # What the existing API offers: extract_pos and lemmatize_text build a
+    # list entry per token, counted afterwards.
+    pos: Counter = Counter()
+    lemmas: Counter = Counter()
+    for text in texts:
+        for tag, words in (await nlp_service.extract_pos(text)).items():
+            pos[tag] += len(words)
+        lemmas.update(lemma for _, lemma in await nlp_service.lemmatize_text(text))
+    return sum(pos.values())
+
+
+async def interned(texts: List[str]) -> int:
+    return (await analyze_texts(texts)).tokens
+
+
+async def measure(call: Callable[[List[str]], Awaitable[int]], texts: List[str]) -> float:
+    started = time.perf_counter()
+    await call(texts)
+    return time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> None:
+    logger.remove()
+    nlp_service.warm_up()
+    spell_check_service.warm_up()
+    start_executors(process_workers=args.process_workers)
+    await analyze_texts(['прогрев пула'])
+
+    paragraphs = novel(args.size_kb * 1024, args.seed)
+    # One large text, and the same words as a history of short messages.
+    corpora = {'one text': ['\n'.join(paragraphs)], 'history': paragraphs}
+    tokens = len(nlp_service.tokenize(corpora['one text'][0]))
+    print(f'{tokens} tokens, {len(paragraphs)} paragraphs, process workers: {args.process_workers}')
+
+    print(f'{"input":>10}{"pipeline":>18}{"cold s":>9}{"warm s":>9}{"tokens/s warm":>15}')
+    for name, texts in corpora.items():
+        for label, call in (('per-word lists', per_word_lists), ('interned ids', interned)):
+            nlp_service.token_cache.clear()
+            morphology_table.clear()
+            cold = await measure(call, texts)
+            warm = min([await measure(call, texts) for _ in range(args.repeat)])
+            print(f'{name:>10}{label:>18}{cold:>9.3f}{warm:>9.3f}{tokens / warm:>15.0f}')
+
+    stats = await analyze_texts(corpora['one text'])
+    print(f'forms {stats.forms}, lemmas {stats.lemmas}, type/token {stats.type_token_ratio:.3f}, '
+          f'tags interned {len(morphology_table.tags)}')
+    shutdown_executors()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Corpus statistics over hundreds of thousands of tokens')
+    parser.add_argument('--size-kb', type=int, default=3072, help='size of the generated text')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--process-workers', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
@@ -0,0 +1,60 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.spell_check_service import get_spell, get_suggestion_index  # noqa: E402
+
+LETTERS = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    for _ in range(rng.choice((1, 2))):
+        i = rng.randrange(len(word))
+        op = rng.choice(('delete', 'replace', 'insert', 'transpose'))
+        if op == 'delete' and len(word) > 2:
+            word = word[:i] + word[i + 1:]
+        elif op == 'replace':
+            word = word[:i] + rng.choice(LETTERS) + word[i + 1:]
+        elif op == 'insert':
+            word = word[:i] + rng.choice(LETTERS) + word[i:]
+        elif i + 1 < len(word):
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+
+def timed(func, words):
+    started = time.perf_counter()
+    results = [func(word) for word in words]
+    return results, time.perf_counter() - started
+
+
+def run(samples: int, seed: int) -> None:
+    rng = random.Random(seed)
+    spell = get_spell()
+    suggestion_index = get_suggestion_index()
+    dictionary = sorted(w for w in spell.word_frequency.dictionary if len(w) >= 4)
+    words = [misspell(rng.choice(dictionary), rng) for _ in range(samples)]
+
+    baseline, baseline_time = timed(spell.candidates, words)
+    indexed, indexed_time = timed(suggestion_index.lookup, words)
+
+    agree = sum(set(a or ()) == set(b or ()) for a, b in zip(baseline, indexed))
+
+    print(f'words:               {samples}')
+    print(f'pyspellchecker:      {baseline_time / samples * 1000:.2f} ms/word')
+    print(f'suggestion index:    {indexed_time / samples * 1000:.2f} ms/word')
+    print(f'speedup:             {baseline_time / indexed_time:.1f}x')
+    print(f'identical results:   {agree}/{samples}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare spell.candidates with the suggestion index')
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    run(args.samples, args.seed)
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BENCH_DIR = tempfile.mkdtemp(prefix='bench_db_')
+os.environ['DATABASE_URL'] = f'sqlite:///{BENCH_DIR}/bench.db'
+
+from models.database import init_db, close_db  # noqa: E402
+from services.query_log import query_log  # noqa: E402
+from services.rate_limiter import rate_limiter  # noqa: E402
+from services.user_service import save_query, get_user_history  # noqa: E402
+
+
+async def simulate_user(user_id: int, updates: int) -> None:
+    for i in range(updates):
+        await rate_limiter.allow(user_id)
+        await save_query(user_id, '/analyze', f'слово{i}', {'normal_form': f'слово{i}', 'pos': 'существительное'})
+        if i % 5 == 0:
+            await get_user_history(user_id, limit=10)
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list, interval: float = 0.01) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - started - interval)
+
+
+async def run(users: int, updates: int) -> None:
+    init_db()
+    query_log.start()
+
+    stop = asyncio.Event()
+    lags: list = []
+    lag_task = asyncio.create_task(measure_loop_lag(stop, lags))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(simulate_user(user_id, updates) for user_id in range(users)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await lag_task
+    await query_log.stop()
+    await close_db()
+
+    total = users * updates
+    lags.sort()
+    max_lag = lags[-1] * 1000 if lags else 0.0
+    p99_lag = lags[int(len(lags) * 0.99)] * 1000 if lags else 0.0
+
+    print(f'users:            {users}')
+    print(f'updates:          {total}')
+    print(f'elapsed:          {elapsed:.2f} s')
+    print(f'updates/sec:      {total / elapsed:.1f}')
+    print(f'loop lag p99/max: {p99_lag:.1f} / {max_lag:.1f} ms')
+    print(f'query log:        {query_log.stats()}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark user_service under concurrent users')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--updates', type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.users, args.updates))
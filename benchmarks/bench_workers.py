@@ -0,0 +1,250 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from services.hot_words import top_words  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+API_PORT = 8783
+WEBHOOK_PORT = 8784
+TOKEN = '123456:fake-token'
+HEADER = 'Анализ слова: "'
+
+
+class FakeTelegramApi:
+    # Records, per chat, the words of /analyze replies in arrival order and
+    # when the reply to each (chat, word) arrived.
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.get_me = 0
+        self.order: Dict[int, List[str]] = {}
+        self.replied: Dict[Tuple[int, str], float] = {}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        params = dict(await request.post()) if request.can_read_body else {}
+
+        if method == 'getMe':
+            self.get_me += 1
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        elif method == 'sendMessage':
+            chat_id = int(params['chat_id'])
+            text = params.get('text', '')
+            if text.startswith('📖 ' + HEADER):
+                word = text.split('"', 2)[1]
+                self.order.setdefault(chat_id, []).append(word)
+                self.replied.setdefault((chat_id, word), time.perf_counter())
+            result = {
+                'message_id': random.randint(1, 10 ** 9),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': text,
+            }
+        else:
+            result = True
+
+        return web.json_response({'ok': True, 'result': result})
+
+
+def make_update(update_id: int, chat_id: int, word: str) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench'},
+            'text': f'/analyze {word}',
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len('/analyze')}],
+        },
+    }
+
+
+def start_bot(workers: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        'TELEGRAM_BOT_TOKEN': TOKEN,
+        'TELEGRAM_API_BASE_URL': f'http://127.0.0.1:{API_PORT}/bot',
+        'BOT_MODE': 'webhook',
+        'BOT_WORKERS': str(workers),
+        'WEBHOOK_HOST': '127.0.0.1',
+        'WEBHOOK_PORT': str(WEBHOOK_PORT),
+        'WEBHOOK_URL': '',
+        'DATABASE_URL': f'sqlite:///{tempfile.mkdtemp(prefix="bench_db_")}/bench.db',
+        'GIGACHAT_CREDENTIALS': '',
+        'MAX_REQUESTS_PER_MINUTE': '1000000',
+        'METRICS_PORT': '0',
+        'LOG_LEVEL': 'WARNING',
+        'LOG_FILE': '',
+        # Every process does its own NLP on the event loop's threads, so the
+        # worker count is the number of busy cores.
+        'NLP_PROCESS_WORKERS': '0',
+        # Only the morphology caches, no prebuilt table: work stays CPU-bound.
+        'HOT_WORDS_PATH': '/nonexistent/hot_words.bin',
+    }
+    return subprocess.Popen([sys.executable, str(ROOT / 'main.py')], cwd=ROOT, env=env)
+
+
+async def wait_ready(api: FakeTelegramApi, processes: int, timeout: float = 120) -> None:
+    # Every process with a Bot calls getMe once it is initialized.
+    deadline = time.perf_counter() + timeout
+    while api.get_me < processes:
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f'only {api.get_me}/{processes} processes came up')
+        await asyncio.sleep(0.1)
+
+
+async def post_updates(
+        session: aiohttp.ClientSession,
+        updates: List[dict],
+        concurrency: int,
+        sent: Dict[Tuple[int, str], float],
+) -> None:
+    # Updates of one chat are posted one after another, as Telegram does;
+    # chats are posted concurrently.
+    url = f'http://127.0.0.1:{WEBHOOK_PORT}/telegram'
+    by_chat: Dict[int, List[dict]] = {}
+    for update in updates:
+        by_chat.setdefault(update['message']['chat']['id'], []).append(update)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post_chat(chat_updates: List[dict]) -> None:
+        async with semaphore:
+            for update in chat_updates:
+                key = (update['message']['chat']['id'], update['message']['text'].split()[1])
+                while True:
+                    sent[key] = time.perf_counter()
+                    async with session.post(url, data=json.dumps(update),
+                                            headers={'Content-Type': 'application/json'}) as resp:
+                        if resp.status != 429:
+                            break
+                    await asyncio.sleep(float(resp.headers.get('Retry-After', '1')))
+
+    await asyncio.gather(*(post_chat(chat_updates) for chat_updates in by_chat.values()))
+
+
+def build_updates(words: List[str], chats: int, per_chat: int, first_id: int, rng: random.Random) -> List[dict]:
+    updates = []
+    update_id = first_id
+    for chat_id in range(first_id, first_id + chats):
+        for word in rng.sample(words, per_chat):
+            updates.append(make_update(update_id, chat_id, word))
+            update_id += 1
+    return updates
+
+
+async def wait_replies(api: FakeTelegramApi, keys: List[Tuple[int, str]], timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while not all(key in api.replied for key in keys) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.02)
+
+
+def order_violations(api: FakeTelegramApi, updates: List[dict]) -> int:
+    expected: Dict[int, List[str]] = {}
+    for update in updates:
+        expected.setdefault(update['message']['chat']['id'], []).append(update['message']['text'].split()[1])
+    return sum(api.order.get(chat_id, []) != words for chat_id, words in expected.items())
+
+
+async def bench_workers(workers: int, args: argparse.Namespace, words: List[str], api: FakeTelegramApi) -> dict:
+    rng = random.Random(workers)
+    api.reset()
+    process = start_bot(workers)
+    try:
+        await wait_ready(api, workers + 1 if workers else 1)
+
+        async with aiohttp.ClientSession() as session:
+            warmup = build_updates(words, args.chats, 2, 1_000_000, rng)
+            sent: Dict[Tuple[int, str], float] = {}
+            await post_updates(session, warmup, args.concurrency, sent)
+            await wait_replies(api, list(sent), 120)
+
+            updates = build_updates(words, args.chats, args.per_chat, 2_000_000, rng)
+            sent = {}
+            started = time.perf_counter()
+            await post_updates(session, updates, args.concurrency, sent)
+            await wait_replies(api, list(sent), 300)
+            elapsed = time.perf_counter() - started
+
+            latencies = sorted(api.replied[key] - sent[key] for key in sent if key in api.replied)
+            completed = len(latencies)
+            violations = order_violations(api, updates)
+
+            # Graceful drain: SIGTERM right after the last update is accepted;
+            # every accepted update must still be answered.
+            drain_updates = build_updates(words, args.chats, 2, 3_000_000, rng)
+            drain_sent: Dict[Tuple[int, str], float] = {}
+            await post_updates(session, drain_updates, args.concurrency, drain_sent)
+            process.send_signal(signal.SIGTERM)
+            await asyncio.get_running_loop().run_in_executor(None, process.wait, 120)
+            drained = sum(key in api.replied for key in drain_sent)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+    return {
+        'workers': workers,
+        'updates': len(updates),
+        'completed': completed,
+        'throughput': completed / elapsed,
+        'p50_ms': latencies[completed // 2] * 1000 if latencies else 0.0,
+        'p99_ms': latencies[min(completed - 1, int(completed * 0.99))] * 1000 if latencies else 0.0,
+        'order_violations': violations,
+        'drained': f'{drained}/{len(drain_sent)}',
+        'exit_code': process.returncode,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    api = FakeTelegramApi()
+    api_app = web.Application()
+    api_app.router.add_post('/bot{token}/{method}', api.handle)
+    api_runner = web.AppRunner(api_app, access_log=None)
+    await api_runner.setup()
+    await web.TCPSite(api_runner, '127.0.0.1', API_PORT).start()
+
+    words = [word for word in top_words(20000) if len(word) > 3]
+    results = []
+    for workers in args.workers:
+        results.append(await bench_workers(workers, args, words, api))
+    await api_runner.cleanup()
+
+    print(f'cores: {os.cpu_count()}, chats: {args.chats}, updates per chat: {args.per_chat}')
+    print(f'{"workers":>8}{"updates/s":>12}{"speedup":>10}{"p50 ms":>10}{"p99 ms":>10}'
+          f'{"order":>8}{"drained":>10}{"exit":>6}')
+    base = results[0]['throughput']
+    for result in results:
+        print(
+            f'{result["workers"]:>8}{result["throughput"]:>12.1f}{result["throughput"] / base:>10.2f}'
+            f'{result["p50_ms"]:>10.1f}{result["p99_ms"]:>10.1f}{result["order_violations"]:>8}'
+            f'{result["drained"]:>10}{result["exit_code"]:>6}'
+        )
+    print('workers 0 is the single-process mode; order counts chats whose replies came out of order')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Throughput of main.py with BOT_WORKERS worker processes')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--chats', type=int, default=200)
+    parser.add_argument('--per-chat', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
@@ -0,0 +1,128 @@
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from aiohttp import web
+
+# Faults that can be changed at runtime with POST /faults.
+FAULTS = ('latency', 'failure_rate', 'failure_status', 'slow_rate', 'slow_latency')
+
+
+async def oauth(request: web.Request) -> web.Response:
+    state = request.app['state']
+    state['token_requests'] += 1
+    return web.json_response({
+        'access_token': uuid.uuid4().hex,
+        'expires_at': int((time.time() + state['token_ttl']) * 1000),
+    })
+
+
+async def chat_completions(request: web.Request) -> web.Response:
+    state = request.app['state']
+    state['chat_requests'] += 1
+    payload = await request.json()
+    prompt = payload['messages'][-1]['content']
+
+    if random.random() < state['failure_rate']:
+        state['failed_requests'] += 1
+        status = state['failure_status']
+        return web.json_response({'status': status, 'message': 'Injected failure'}, status=status)
+
+    slow = random.random() < state['slow_rate']
+    await asyncio.sleep(state['slow_latency'] if slow else state['latency'])
+
+    content = '\n'.join(
+        f'{i}. Пример предложения {random.randint(1, 10 ** 6)} для запроса.' for i in range(1, 4)
+    )
+    return web.json_response({
+        'choices': [{
+            'message': {'role': 'assistant', 'content': content},
+            'index': 0,
+            'finish_reason': 'stop',
+        }],
+        'created': int(time.time()),
+        'model': payload.get('model', 'GigaChat'),
+        'usage': {'prompt_tokens': len(prompt), 'completion_tokens': len(content), 'total_tokens': 0},
+        'object': 'chat.completion',
+    })
+
+
+async def stats(request: web.Request) -> web.Response:
+    return web.json_response(request.app['state'])
+
+
+async def faults(request: web.Request) -> web.Response:
+    state = request.app['state']
+    update = await request.json()
+    unknown = set(update) - set(FAULTS)
+    if unknown:
+        return web.json_response({'unknown': sorted(unknown)}, status=400)
+    state.update(update)
+    return web.json_response({key: state[key] for key in FAULTS})
+
+
+def create_app(
+        latency: float = 0.2,
+        token_ttl: float = 1800,
+        failure_rate: float = 0.0,
+        failure_status: int = 500,
+        slow_rate: float = 0.0,
+        slow_latency: float = 5.0,
+) -> web.Application:
+    app = web.Application()
+    app['state'] = {
+        'latency': latency,
+        'token_ttl': token_ttl,
+        'failure_rate': failure_rate,
+        'failure_status': failure_status,
+        'slow_rate': slow_rate,
+        'slow_latency': slow_latency,
+        'token_requests': 0,
+        'chat_requests': 0,
+        'failed_requests': 0,
+    }
+    app.router.add_post('/api/v2/oauth', oauth)
+    app.router.add_post('/api/v1/chat/completions', chat_completions)
+    app.router.add_get('/stats', stats)
+    app.router.add_post('/faults', faults)
+    return app
+
+
+async def start_fake_server(
+        host: str = '127.0.0.1',
+        port: int = 8765,
+        latency: float = 0.2,
+        **faults: float,
+) -> web.AppRunner:
+    runner = web.AppRunner(create_app(latency, **faults))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local fake GigaChat API for tests and benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='share of chat requests that fail')
+    parser.add_argument('--failure-status', type=int, default=500)
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='share of chat requests that are slow')
+    parser.add_argument('--slow-latency', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f'GIGACHAT_BASE_URL=http://{args.host}:{args.port}/api/v1')
+    print(f'GIGACHAT_AUTH_URL=http://{args.host}:{args.port}/api/v2/oauth')
+    web.run_app(
+        create_app(
+            args.latency,
+            failure_rate=args.failure_rate,
+            failure_status=args.failure_status,
+            slow_rate=args.slow_rate,
+            slow_latency=args.slow_latency,
+        ),
+        host=args.host,
+        port=args.port,
+    )
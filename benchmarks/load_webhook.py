@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+API_PORT = 8781
+WEBHOOK_PORT = 8782
+TOKEN = '123456:fake-token'
+
+os.environ.update({
+    'TELEGRAM_BOT_TOKEN': TOKEN,
+    'TELEGRAM_API_BASE_URL': f'http://127.0.0.1:{API_PORT}/bot',
+    'BOT_MODE': 'webhook',
+    'WEBHOOK_HOST': '127.0.0.1',
+    'WEBHOOK_PORT': str(WEBHOOK_PORT),
+    'WEBHOOK_URL': '',
+    'DATABASE_URL': f'sqlite:///{tempfile.mkdtemp(prefix="bench_db_")}/bench.db',
+    'GIGACHAT_CREDENTIALS': '',
+    'MAX_REQUESTS_PER_MINUTE': '1000000',
+})
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+from loguru import logger  # noqa: E402
+
+from main import BotApplication  # noqa: E402
+
+COMMANDS = [
+    '/analyze книга', '/analyze красивый', '/analyze бежать', '/analyze домами',
+    '/spell_check Это написано корректна', '/spell_check Превет как дила',
+    '/lemmatize Мама мыла раму', '/start', '/help',
+]
+
+
+class FakeTelegramApi:
+    # Answers the Bot API methods the handlers call and records when the
+    # first reply for each chat arrives.
+    def __init__(self) -> None:
+        self.replies: dict = {}
+        self.calls = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        method = request.match_info['method']
+        params = dict(await request.post()) if request.can_read_body else {}
+
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        elif method == 'sendMessage':
+            chat_id = int(params['chat_id'])
+            self.replies.setdefault(chat_id, time.perf_counter())
+            result = {
+                'message_id': random.randint(1, 10 ** 9),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': params.get('text', ''),
+            }
+        else:
+            result = True
+
+        return web.json_response({'ok': True, 'result': result})
+
+
+def make_update(update_id: int, text: str) -> dict:
+    command = text.split()[0]
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': update_id, 'type': 'private'},
+            'from': {'id': update_id, 'is_bot': False, 'first_name': 'Bench'},
+            'text': text,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}],
+        },
+    }
+
+
+async def run(updates: int, concurrency: int) -> None:
+    fake_api = FakeTelegramApi()
+    api_app = web.Application()
+    api_app.router.add_post('/bot{token}/{method}', fake_api.handle)
+    api_runner = web.AppRunner(api_app, access_log=None)
+    await api_runner.setup()
+    await web.TCPSite(api_runner, '127.0.0.1', API_PORT).start()
+
+    bot_app = BotApplication()
+    await bot_app.start()
+
+    sent = {}
+    statuses: dict = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    url = f'http://127.0.0.1:{WEBHOOK_PORT}/telegram'
+
+    async with aiohttp.ClientSession() as session:
+        async def post(update_id: int) -> None:
+            payload = json.dumps(make_update(update_id, random.choice(COMMANDS)))
+            async with semaphore:
+                while True:
+                    sent[update_id] = time.perf_counter()
+                    async with session.post(url, data=payload, headers={'Content-Type': 'application/json'}) as resp:
+                        statuses[resp.status] = statuses.get(resp.status, 0) + 1
+                        if resp.status != 429:
+                            return
+                    await asyncio.sleep(float(resp.headers.get('Retry-After', '1')))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post(i) for i in range(1, updates + 1)))
+
+        deadline = time.perf_counter() + 60
+        while len(fake_api.replies) < updates and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+
+    await bot_app.stop()
+    await api_runner.cleanup()
+
+    latencies = sorted(fake_api.replies[i] - sent[i] for i in fake_api.replies if i in sent)
+    completed = len(latencies)
+
+    print(f'updates:          {updates} (concurrency {concurrency})')
+    print(f'completed:        {completed}')
+    print(f'elapsed:          {elapsed:.2f} s')
+    print(f'updates/sec:      {completed / elapsed:.1f}')
+    if latencies:
+        print(f'latency p50/p99:  {latencies[completed // 2] * 1000:.1f} / '
+              f'{latencies[min(completed - 1, int(completed * 0.99))] * 1000:.1f} ms')
+    print(f'webhook statuses: {statuses}')
+    print(f'bot API calls:    {fake_api.calls}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='POST synthetic updates to the webhook receiver')
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    asyncio.run(run(args.updates, args.concurrency))
@@ -9,8 +9,17 @@ load_dotenv(env_file)
 TELEGRAM_BOT_TOKEN: str = os.getenv('TELEGRAM_BOT_TOKEN', '')
 OPENAI_API_KEY: str = os.getenv('OPENAI_API_KEY', '')
 GIGACHAT_CREDENTIALS: str = os.getenv('GIGACHAT_CREDENTIALS', '')
+GIGACHAT_BASE_URL: str = os.getenv('GIGACHAT_BASE_URL', '')
+GIGACHAT_AUTH_URL: str = os.getenv('GIGACHAT_AUTH_URL', '')
 DATABASE_URL: str = os.getenv('DATABASE_URL', 'sqlite:///./bot_database.db')
 LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT: str = os.getenv('LOG_FORMAT', 'text')
+LOG_FILE: str = os.getenv('LOG_FILE', 'logs/bot.log')
+LOG_ROTATION: str = os.getenv('LOG_ROTATION', '100 MB')
+LOG_RETENTION: str = os.getenv('LOG_RETENTION', '14 days')
+LOG_COMPRESSION: str = os.getenv('LOG_COMPRESSION', 'gz')
+LOG_SAMPLING: str = os.getenv('LOG_SAMPLING', '')
+LOG_QUEUE_SIZE: int = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
 MAX_REQUESTS_PER_MINUTE: int = int(os.getenv('MAX_REQUESTS_PER_MINUTE', '10'))
 REQUEST_TIMEOUT_SECONDS: int = int(os.getenv('REQUEST_TIMEOUT_SECONDS', '30'))
 
@@ -18,4 +27,89 @@ YANDEX_SPELLER_URL: str = 'https://speller.yandex.net/services/spellchecker.json
 OPENAI_API_URL: str = 'https://api.openai.com/v1/chat/completions'
 
 MAX_MESSAGE_LENGTH: int = 1000
+MAX_TEXT_LENGTH: int = 4096
+TELEGRAM_MESSAGE_LIMIT: int = 4096
 HISTORY_LIMIT: int = 10
+
+QUERY_LOG_BATCH_SIZE: int = int(os.getenv('QUERY_LOG_BATCH_SIZE', '100'))
+QUERY_LOG_FLUSH_INTERVAL: float = float(os.getenv('QUERY_LOG_FLUSH_INTERVAL', '1.0'))
+QUERY_LOG_MAX_PENDING: int = int(os.getenv('QUERY_LOG_MAX_PENDING', '10000'))
+
+RATE_LIMIT_BACKEND: str = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_WINDOW_SECONDS: int = int(os.getenv('RATE_LIMIT_WINDOW_SECONDS', '60'))
+RATE_LIMIT_MAX_KEYS: int = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+
+MORPH_CACHE_MAX_ENTRIES: int = int(os.getenv('MORPH_CACHE_MAX_ENTRIES', '50000'))
+MORPH_CACHE_MAX_BYTES: int = int(os.getenv('MORPH_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv('TOKEN_CACHE_MAX_ENTRIES', '200000'))
+PARADIGM_CACHE_MAX_ENTRIES: int = int(os.getenv('PARADIGM_CACHE_MAX_ENTRIES', '5000'))
+HOT_WORDS_PATH: str = os.getenv('HOT_WORDS_PATH', 'data/hot_words.bin')
+HOT_WORDS_TOP_N: int = int(os.getenv('HOT_WORDS_TOP_N', '10000'))
+
+NLP_THREAD_WORKERS: int = int(os.getenv('NLP_THREAD_WORKERS', '4'))
+NLP_PROCESS_WORKERS: int = int(os.getenv('NLP_PROCESS_WORKERS', '2'))
+# How long a request waits for NLP work. A call past the budget is not
+# interrupted: it keeps its pool worker until it finishes.
+NLP_TIME_BUDGET_SECONDS: float = float(os.getenv('NLP_TIME_BUDGET_SECONDS', '10'))
+
+SPELL_INDEX_PATH: str = os.getenv('SPELL_INDEX_PATH', 'data/spell_index.bin')
+SPELL_CHUNK_SIZE: int = int(os.getenv('SPELL_CHUNK_SIZE', '1000'))
+SPELL_PROGRESS_INTERVAL_SECONDS: float = float(os.getenv('SPELL_PROGRESS_INTERVAL_SECONDS', '1'))
+
+DOCUMENT_MAX_BYTES: int = int(os.getenv('DOCUMENT_MAX_BYTES', str(20 * 1024 * 1024)))
+DOCUMENT_CHUNK_CHARS: int = int(os.getenv('DOCUMENT_CHUNK_CHARS', '65536'))
+DOCUMENT_PROGRESS_INTERVAL_SECONDS: float = float(os.getenv('DOCUMENT_PROGRESS_INTERVAL_SECONDS', '2'))
+
+PREFIX_INDEX_PATH: str = os.getenv('PREFIX_INDEX_PATH', 'data/prefix_index.bin')
+INLINE_MAX_RESULTS: int = int(os.getenv('INLINE_MAX_RESULTS', '8'))
+INLINE_DEBOUNCE_SECONDS: float = float(os.getenv('INLINE_DEBOUNCE_SECONDS', '0'))
+INLINE_CACHE_SECONDS: int = int(os.getenv('INLINE_CACHE_SECONDS', '300'))
+
+STATS_TOP_LEMMAS: int = int(os.getenv('STATS_TOP_LEMMAS', '10'))
+STATS_HISTORY_MAX_ROWS: int = int(os.getenv('STATS_HISTORY_MAX_ROWS', '1000'))
+STATS_VOCABULARY_MAX_ENTRIES: int = int(os.getenv('STATS_VOCABULARY_MAX_ENTRIES', '200000'))
+
+LLM_MAX_CONCURRENCY: int = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+LLM_ATTEMPT_TIMEOUT_SECONDS: float = float(os.getenv('LLM_ATTEMPT_TIMEOUT_SECONDS', '10'))
+LLM_MAX_RETRIES: int = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_RETRY_BASE_DELAY_SECONDS: float = float(os.getenv('LLM_RETRY_BASE_DELAY_SECONDS', '0.2'))
+LLM_RETRY_MAX_DELAY_SECONDS: float = float(os.getenv('LLM_RETRY_MAX_DELAY_SECONDS', '2'))
+LLM_BREAKER_FAILURES: int = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_RESET_SECONDS: float = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+LLM_HEDGE_PERCENTILE: float = float(os.getenv('LLM_HEDGE_PERCENTILE', '0.95'))
+
+EXAMPLES_CACHE_TTL_SECONDS: int = int(os.getenv('EXAMPLES_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+EXAMPLES_CACHE_MAX_ENTRIES: int = int(os.getenv('EXAMPLES_CACHE_MAX_ENTRIES', '5000'))
+EXAMPLES_CACHE_MAX_ROWS: int = int(os.getenv('EXAMPLES_CACHE_MAX_ROWS', '100000'))
+EXAMPLES_CACHE_RANDOM: bool = os.getenv('EXAMPLES_CACHE_RANDOM', 'true').lower() in ('1', 'true', 'yes')
+EXAMPLES_POOL_SIZE: int = int(os.getenv('EXAMPLES_POOL_SIZE', '12'))
+
+BOT_MODE: str = os.getenv('BOT_MODE', 'polling')
+TELEGRAM_API_BASE_URL: str = os.getenv('TELEGRAM_API_BASE_URL', '')
+WEBHOOK_URL: str = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_HOST: str = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT: int = int(os.getenv('WEBHOOK_PORT', '8080'))
+WEBHOOK_PATH: str = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_SECRET: str = os.getenv('WEBHOOK_SECRET', '')
+UPDATE_QUEUE_SIZE: int = int(os.getenv('UPDATE_QUEUE_SIZE', '1000'))
+BOT_WORKERS: int = int(os.getenv('BOT_WORKERS', '0'))
+WORKER_DRAIN_TIMEOUT_SECONDS: float = float(os.getenv('WORKER_DRAIN_TIMEOUT_SECONDS', '30'))
+CONCURRENT_UPDATES: int = int(os.getenv('CONCURRENT_UPDATES', '64'))
+
+FAST_LANE_CONCURRENCY: int = int(os.getenv('FAST_LANE_CONCURRENCY', '48'))
+SLOW_LANE_CONCURRENCY: int = int(os.getenv('SLOW_LANE_CONCURRENCY', '16'))
+SLOW_LANE_COMMANDS: frozenset = frozenset(
+    os.getenv('SLOW_LANE_COMMANDS', 'examples,stats').split(',')
+)
+
+SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+# Rows of history kept per user by compaction; 0 keeps everything. A limit
+# below STATS_HISTORY_MAX_ROWS also shrinks what /stats can read back.
+HISTORY_RETENTION_ROWS: int = int(os.getenv('HISTORY_RETENTION_ROWS', '0'))
+HISTORY_RETENTION_DAYS: int = int(os.getenv('HISTORY_RETENTION_DAYS', '0'))
+COMPACTION_INTERVAL_SECONDS: int = int(os.getenv('COMPACTION_INTERVAL_SECONDS', '3600'))
+COMPACTION_BATCH_USERS: int = int(os.getenv('COMPACTION_BATCH_USERS', '500'))
+COMPACTION_BATCH_ROWS: int = int(os.getenv('COMPACTION_BATCH_ROWS', '5000'))
+
+METRICS_HOST: str = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT: int = int(os.getenv('METRICS_PORT', '9090'))
@@ -1,7 +1,9 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from services.user_service import save_query, format_history, get_user_history
+from services.metrics import track_handler
+from services.render import render_history
+from services.user_service import save_query, get_user_history
 
 HELP_TEXT = '''Я ассистент по анализу русского языка! 📚
 
@@ -11,14 +13,26 @@ HELP_TEXT = '''Я ассистент по анализу русского язы
 /help — справка
 /analyze <слово> — морфологический анализ слова
 /spell_check <текст> — проверка орфографии
+(длинный текст можно прислать файлом .txt или .docx)
 /examples <слово> — примеры использования слова
+/lemmatize <текст> — начальные формы всех слов текста
+(для файла добавьте подпись /lemmatize)
+/pos <текст> — распределение слов по частям речи
+/stats [текст] — статистика текста или всей вашей истории:
+части речи, граммемы, частые леммы, отношение тип/токен
 /history — просмотр ваших запросов
 /clear_history — удалить историю
 
+В любом чате наберите @имя_бота и слово —
+бот подскажет варианты и покажет разбор.
+
 Примеры использования:
 /analyze книга
 /spell_check Это написано корректна
 /examples красивый
+/lemmatize Мама мыла раму
+/pos Мама мыла раму
+/stats Мама мыла раму, а рама блестела
 '''
 
 START_TEXT = '''Привет! 👋 Я "Русский Филолог" — ваш ассистент по анализу текстов на русском языке!
@@ -33,26 +47,30 @@ START_TEXT = '''Привет! 👋 Я "Русский Филолог" — ваш
 '''
 
 
+@track_handler('start')
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
-    await save_query(user_id, '/start', '', START_TEXT)
+    await save_query(user_id, '/start', '')
     await update.message.reply_text(START_TEXT)
 
 
+@track_handler('help')
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
-    await save_query(user_id, '/help', '', HELP_TEXT)
+    await save_query(user_id, '/help', '')
     await update.message.reply_text(HELP_TEXT)
 
 
+@track_handler('history')
 async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
     history = await get_user_history(user_id, limit=10)
-    response = await format_history(history)
-    await save_query(user_id, '/history', '', response)
+    response = render_history(history)
+    await save_query(user_id, '/history', '', {'entries': len(history)})
     await update.message.reply_text(response)
 
 
+@track_handler('clear_history')
 async def clear_history_command(
         update: Update,
         context: ContextTypes.DEFAULT_TYPE
@@ -62,5 +80,5 @@ async def clear_history_command(
     user_id = update.effective_user.id
     count = await clear_user_history(user_id)
     response = f'✅ История очищена! Удалено {count} записей.'
-    await save_query(user_id, '/clear_history', '', response)
+    await save_query(user_id, '/clear_history', '', {'deleted': count})
     await update.message.reply_text(response)
@@ -0,0 +1,34 @@
+from telegram import InlineQueryResultArticle, InputTextMessageContent, Update
+from telegram.ext import ContextTypes
+
+from config import INLINE_CACHE_SECONDS
+from services.inline_service import latest_inline_answers, normalize_query
+from services.metrics import track_handler
+
+
+@track_handler('inline')
+async def handle_inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    # "@bot слово" arrives as a new inline query on every keystroke, so
+    # there is no rate limit or history here: a user's older queries are
+    # cancelled instead, and Telegram caches the answers per query text.
+    inline_query = update.inline_query
+    query = normalize_query(inline_query.query)
+
+    if query is None:
+        await inline_query.answer([], cache_time=INLINE_CACHE_SECONDS)
+        return
+
+    answers = await latest_inline_answers(inline_query.from_user.id, query)
+    if answers is None:
+        return
+
+    results = [
+        InlineQueryResultArticle(
+            id=str(number),
+            title=answer['word'],
+            description=answer['description'],
+            input_message_content=InputTextMessageContent(answer['text']),
+        )
+        for number, answer in enumerate(answers)
+    ]
+    await inline_query.answer(results, cache_time=INLINE_CACHE_SECONDS)
@@ -1,15 +1,82 @@
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
 from loguru import logger
 from telegram import Update
 from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
 
-from config import MAX_MESSAGE_LENGTH, MAX_REQUESTS_PER_MINUTE
-from services.llm_service import generate_examples, format_examples
-from services.nlp_service import analyze_word, get_word_variations
-from services.spell_check_service import check_spelling, format_spell_check_result
-from services.user_service import save_query, get_user_query_count
-
-
+from config import (
+    DOCUMENT_MAX_BYTES,
+    DOCUMENT_PROGRESS_INTERVAL_SECONDS,
+    MAX_MESSAGE_LENGTH,
+    MAX_REQUESTS_PER_MINUTE,
+    MAX_TEXT_LENGTH,
+    SPELL_PROGRESS_INTERVAL_SECONDS,
+    TELEGRAM_MESSAGE_LIMIT,
+)
+from services.document_service import DocumentError, DocumentReport, download_document, process_document
+from services.llm_service import generate_examples
+from services.metrics import mark_failed, track_handler
+from services.nlp_service import (
+    analyze_word,
+    extract_pos,
+    get_paradigm,
+    lemmatize_text,
+)
+from services.rate_limiter import rate_limiter
+from services.render import (
+    HISTORY_EMPTY,
+    SPELL_SHOWN,
+    render_analysis,
+    render_document_progress,
+    render_document_summary,
+    render_examples,
+    render_lemmas,
+    render_pos,
+    render_spell_check_partial,
+    render_spell_check_result,
+    render_stats,
+)
+from services.spell_check_service import SpellCheckProgress, check_spelling
+from services.stats_service import analyze_texts
+from services.user_service import get_user_texts, save_query
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    chunks = []
+    current: List[str] = []
+    size = 0
+
+    for line in text.split('\n'):
+        while len(line) > limit:
+            if current:
+                chunks.append('\n'.join(current))
+                current, size = [], 0
+            chunks.append(line[:limit])
+            line = line[limit:]
+
+        if size + len(line) + 1 > limit and current:
+            chunks.append('\n'.join(current))
+            current, size = [], 0
+
+        current.append(line)
+        size += len(line) + 1
+
+    if current:
+        chunks.append('\n'.join(current))
+
+    return chunks
+
+
+async def reply_chunked(update: Update, text: str, parse_mode: Optional[str] = None) -> None:
+    for chunk in split_message(text):
+        await update.message.reply_text(chunk, parse_mode=parse_mode)
+
+
+@track_handler('analyze')
 async def handle_analyze(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
 
@@ -19,14 +86,6 @@ async def handle_analyze(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return
 
-    query_count = await get_user_query_count(user_id, minutes=1)
-    if query_count > MAX_REQUESTS_PER_MINUTE:
-        await update.message.reply_text(
-            f'⚠️ Вы превысили лимит запросов ({MAX_REQUESTS_PER_MINUTE}/мин). '
-            'Повторите позже.'
-        )
-        return
-
     word = ' '.join(context.args).strip()
 
     if len(word) > MAX_MESSAGE_LENGTH:
@@ -35,35 +94,33 @@ async def handle_analyze(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return
 
+    if not await rate_limiter.allow(user_id):
+        await update.message.reply_text(
+            f'⚠️ Вы превысили лимит запросов ({MAX_REQUESTS_PER_MINUTE}/мин). '
+            'Повторите позже.'
+        )
+        return
+
     try:
         analysis = await analyze_word(word)
-        variations = await get_word_variations(word)
-
-        response = f'''📖 Анализ слова: "{word}"
-
-🔤 Нормальная форма: {analysis['normal_form']}
-📋 Часть речи: {analysis['pos']}
-📝 Морфологические признаки: {analysis['grammemes']}
-
-📚 Формы слова:
-• Именительный: {', '.join(variations['nominative'])}
-• Родительный: {', '.join(variations['genitive'])}
-• Дательный: {', '.join(variations['dative'])}
-• Винительный: {', '.join(variations['accusative'])}
-• Творительный: {', '.join(variations['instrumental'])}
-• Предложный: {', '.join(variations['prepositional'])}
-'''
-
-        await save_query(user_id, '/analyze', word, response)
-        await update.message.reply_text(response)
+        paradigm = await get_paradigm(word)
+        response = render_analysis(analysis, paradigm)
+
+        await save_query(user_id, '/analyze', word, {
+            'normal_form': analysis['normal_form'],
+            'pos': analysis['pos'],
+        })
+        await reply_chunked(update, response)
         logger.info(f'User {user_id} analyzed word: {word}')
 
     except Exception as e:
+        mark_failed()
         error_msg = f'❌ Ошибка при анализе: {str(e)}'
         await update.message.reply_text(error_msg)
         logger.error(f'Error analyzing word for user {user_id}: {e}')
 
 
+@track_handler('spell_check')
 async def handle_spell_check(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
 
@@ -73,54 +130,154 @@ async def handle_spell_check(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return
 
-    query_count = await get_user_query_count(user_id, minutes=1)
-    if query_count > MAX_REQUESTS_PER_MINUTE:
-        await update.message.reply_text(
-            f'⚠️ Вы превысили лимит запросов ({MAX_REQUESTS_PER_MINUTE}/мин). '
-            'Повторите позже.'
-        )
-        return
-
     text = ' '.join(context.args).strip()
 
-    if len(text) > MAX_MESSAGE_LENGTH:
+    if not await rate_limiter.allow(user_id):
         await update.message.reply_text(
-            f'❌ Текст слишком длинный (макс {MAX_MESSAGE_LENGTH} символов)'
+            f'⚠️ Вы превысили лимит запросов ({MAX_REQUESTS_PER_MINUTE}/мин). '
+            'Повторите позже.'
         )
         return
 
     try:
         await update.message.chat.send_action('typing')
-        errors = await check_spelling(text)
-        response = await format_spell_check_result(errors)
-
-        await save_query(user_id, '/spell_check', text, response)
-        await update.message.reply_text(response, parse_mode=ParseMode.HTML)
+        reply = None
+        shown = ''
+        last_edit = 0.0
+
+        async def on_progress(progress: SpellCheckProgress) -> None:
+            # A long text is answered as soon as its first chunk is checked;
+            # the reply is then edited as further chunks complete, at most
+            # every few seconds.
+            nonlocal reply, shown, last_edit
+            now = time.monotonic()
+            if progress.chunk == progress.chunks or now - last_edit < SPELL_PROGRESS_INTERVAL_SECONDS:
+                return
+            partial = render_spell_check_partial(progress.errors, progress.chunk, progress.chunks)
+            if reply is None:
+                reply = await update.message.reply_text(partial, parse_mode=ParseMode.HTML)
+            elif partial != shown:
+                await reply.edit_text(partial, parse_mode=ParseMode.HTML)
+            shown, last_edit = partial, now
+
+        errors = await check_spelling(text, on_progress)
+        response = render_spell_check_result(errors)
+
+        await save_query(user_id, '/spell_check', text, {
+            'errors': len(errors),
+            'words': [error['word'] for error in errors[:SPELL_SHOWN]],
+        })
+        if reply is None:
+            await update.message.reply_text(response, parse_mode=ParseMode.HTML)
+        else:
+            await reply.edit_text(response, parse_mode=ParseMode.HTML)
         logger.info(f'User {user_id} checked spelling')
 
     except Exception as e:
+        mark_failed()
         error_msg = f'❌ Ошибка при проверке орфографии: {str(e)}'
         await update.message.reply_text(error_msg)
         logger.error(f'Error in spell check for user {user_id}: {e}')
 
 
-async def handle_examples(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+DOCUMENT_COMMANDS = {'spell_check': '/spell_check_file', 'lemmatize': '/lemmatize_file'}
+
+
+def document_mode(caption: Optional[str]) -> str:
+    # The caption picks the mode; a bare file is spell checked.
+    if caption and caption.split(maxsplit=1)[0].split('@', 1)[0].lower() == '/lemmatize':
+        return 'lemmatize'
+    return 'spell_check'
+
+
+@track_handler('document')
+async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
+    document = update.message.document
+    mode = document_mode(update.message.caption)
 
-    if not context.args:
+    if document.file_size and document.file_size > DOCUMENT_MAX_BYTES:
         await update.message.reply_text(
-            '❌ Пожалуйста, укажите слово:\n/examples <слово>'
+            f'❌ Файл слишком большой (макс {DOCUMENT_MAX_BYTES // (1024 * 1024)} МБ)'
         )
         return
 
-    query_count = await get_user_query_count(user_id, minutes=1)
-    if query_count > MAX_REQUESTS_PER_MINUTE:
+    if not await rate_limiter.allow(user_id):
         await update.message.reply_text(
             f'⚠️ Вы превысили лимит запросов ({MAX_REQUESTS_PER_MINUTE}/мин). '
             'Повторите позже.'
         )
         return
 
+    file_name = document.file_name or 'document.txt'
+    document_type = 'docx' if file_name.lower().endswith('.docx') else 'txt'
+    status = None
+    try:
+        status = await update.message.reply_text(render_document_progress(mode, 0.0, 0, 0))
+        shown = status.text
+        last_edit = time.monotonic()
+
+        async def on_progress(report: DocumentReport) -> None:
+            # One status message, edited at most every few seconds and only
+            # when its text changes.
+            nonlocal shown, last_edit
+            now = time.monotonic()
+            if now - last_edit < DOCUMENT_PROGRESS_INTERVAL_SECONDS:
+                return
+            text = render_document_progress(mode, report.progress, report.words, report.unique_words)
+            if text != shown:
+                await status.edit_text(text)
+                shown, last_edit = text, now
+
+        with tempfile.TemporaryDirectory(prefix='document-') as workdir:
+            source = Path(workdir) / f'source.{document_type}'
+            result = Path(workdir) / 'result.txt'
+            await download_document(await document.get_file(), source)
+            with open(result, 'w', encoding='utf-8', newline='') as output:
+                report = await process_document(source, document_type, mode, output, on_progress)
+
+            await status.edit_text(
+                render_document_summary(mode, report.characters, report.words, report.unique_words, report.counts),
+                parse_mode=ParseMode.HTML,
+            )
+            # Telegram rejects empty files; the summary already says there
+            # was no text.
+            if report.characters:
+                with open(result, 'rb') as annotated:
+                    await update.message.reply_document(
+                        annotated, filename=f'{Path(file_name).stem}.{mode}.txt'
+                    )
+
+        await save_query(user_id, DOCUMENT_COMMANDS[mode], file_name, {
+            'characters': report.characters,
+            'words': report.words,
+            'unique': report.unique_words,
+            'errors' if mode == 'spell_check' else 'lemmas': len(report.counts),
+        })
+        logger.info(
+            f'User {user_id} processed a {report.characters} character {document_type} document ({mode})'
+        )
+
+    except (DocumentError, UnicodeDecodeError):
+        error_msg = '❌ Не удалось прочитать файл: ожидается .docx или текст в UTF-8/CP1251'
+        await (status.edit_text(error_msg) if status else update.message.reply_text(error_msg))
+    except Exception as e:
+        mark_failed()
+        error_msg = f'❌ Ошибка при обработке файла: {str(e)}'
+        await (status.edit_text(error_msg) if status else update.message.reply_text(error_msg))
+        logger.error(f'Error in document processing for user {user_id}: {e}')
+
+
+@track_handler('examples')
+async def handle_examples(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user_id = update.effective_user.id
+
+    if not context.args:
+        await update.message.reply_text(
+            '❌ Пожалуйста, укажите слово:\n/examples <слово>'
+        )
+        return
+
     word = ' '.join(context.args).strip()
 
     if len(word) > MAX_MESSAGE_LENGTH:
@@ -129,20 +286,164 @@ async def handle_examples(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return
 
+    if not await rate_limiter.allow(user_id):
+        await update.message.reply_text(
+            f'⚠️ Вы превысили лимит запросов ({MAX_REQUESTS_PER_MINUTE}/мин). '
+            'Повторите позже.'
+        )
+        return
+
     try:
         await update.message.chat.send_action('typing')
         examples = await generate_examples(word, count=3)
 
-        if examples is None:
-            response = '⚠️ Генерация примеров недоступна (нет API ключа OpenAI)'
-        else:
-            response = await format_examples(word, examples)
+        response = render_examples(word, examples)
 
-        await save_query(user_id, '/examples', word, response)
+        await save_query(user_id, '/examples', word, {
+            'examples': len(examples) if examples is not None else None,
+        })
         await update.message.reply_text(response, parse_mode=ParseMode.HTML)
         logger.info(f'User {user_id} requested examples for: {word}')
 
     except Exception as e:
+        mark_failed()
         error_msg = f'❌ Ошибка при генерации примеров: {str(e)}'
         await update.message.reply_text(error_msg)
         logger.error(f'Error generating examples for user {user_id}: {e}')
+
+
+@track_handler('lemmatize')
+async def handle_lemmatize(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user_id = update.effective_user.id
+
+    if not context.args:
+        await update.message.reply_text(
+            '❌ Пожалуйста, укажите текст для лемматизации:\n/lemmatize <текст>'
+        )
+        return
+
+    text = ' '.join(context.args).strip()
+
+    if len(text) > MAX_TEXT_LENGTH:
+        await update.message.reply_text(
+            f'❌ Текст слишком длинный (макс {MAX_TEXT_LENGTH} символов)'
+        )
+        return
+
+    if not await rate_limiter.allow(user_id):
+        await update.message.reply_text(
+            f'⚠️ Вы превысили лимит запросов ({MAX_REQUESTS_PER_MINUTE}/мин). '
+            'Повторите позже.'
+        )
+        return
+
+    try:
+        await update.message.chat.send_action('typing')
+        lemmatized = await lemmatize_text(text)
+        response = render_lemmas(lemmatized)
+
+        await save_query(user_id, '/lemmatize', text, {
+            'words': len(lemmatized),
+            'lemmas': len({lemma for _, lemma in lemmatized}),
+        })
+        await reply_chunked(update, response)
+        logger.info(f'User {user_id} lemmatized {len(lemmatized)} words')
+
+    except Exception as e:
+        mark_failed()
+        error_msg = f'❌ Ошибка при лемматизации: {str(e)}'
+        await update.message.reply_text(error_msg)
+        logger.error(f'Error lemmatizing text for user {user_id}: {e}')
+
+
+@track_handler('pos')
+async def handle_pos(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user_id = update.effective_user.id
+
+    if not context.args:
+        await update.message.reply_text(
+            '❌ Пожалуйста, укажите текст для разбора:\n/pos <текст>'
+        )
+        return
+
+    text = ' '.join(context.args).strip()
+
+    if len(text) > MAX_TEXT_LENGTH:
+        await update.message.reply_text(
+            f'❌ Текст слишком длинный (макс {MAX_TEXT_LENGTH} символов)'
+        )
+        return
+
+    if not await rate_limiter.allow(user_id):
+        await update.message.reply_text(
+            f'⚠️ Вы превысили лимит запросов ({MAX_REQUESTS_PER_MINUTE}/мин). '
+            'Повторите позже.'
+        )
+        return
+
+    try:
+        await update.message.chat.send_action('typing')
+        pos_dict = await extract_pos(text)
+        response = render_pos(pos_dict)
+
+        await save_query(user_id, '/pos', text, {
+            'pos': {pos: len(words) for pos, words in pos_dict.items()},
+        })
+        await reply_chunked(update, response)
+        logger.info(f'User {user_id} extracted parts of speech')
+
+    except Exception as e:
+        mark_failed()
+        error_msg = f'❌ Ошибка при разборе частей речи: {str(e)}'
+        await update.message.reply_text(error_msg)
+        logger.error(f'Error extracting POS for user {user_id}: {e}')
+
+
+@track_handler('stats')
+async def handle_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user_id = update.effective_user.id
+
+    # With a text the statistics cover it; without, every text the user
+    # has sent that is still kept in the history.
+    text = ' '.join(context.args or []).strip()
+
+    if len(text) > MAX_TEXT_LENGTH:
+        await update.message.reply_text(
+            f'❌ Текст слишком длинный (макс {MAX_TEXT_LENGTH} символов)'
+        )
+        return
+
+    if not await rate_limiter.allow(user_id):
+        await update.message.reply_text(
+            f'⚠️ Вы превысили лимит запросов ({MAX_REQUESTS_PER_MINUTE}/мин). '
+            'Повторите позже.'
+        )
+        return
+
+    try:
+        await update.message.chat.send_action('typing')
+        if text:
+            texts, source = [text], 'текст сообщения'
+        else:
+            texts = await get_user_texts(user_id)
+            source = f'история запросов ({len(texts)})'
+            if not texts:
+                await update.message.reply_text(HISTORY_EMPTY)
+                return
+
+        stats = await analyze_texts(texts)
+        response = render_stats(stats, source)
+
+        await save_query(user_id, '/stats', text, {
+            'tokens': stats.tokens,
+            'forms': stats.forms,
+            'lemmas': stats.lemmas,
+        })
+        await reply_chunked(update, response)
+        logger.info(f'User {user_id} computed statistics over {stats.tokens} words')
+
+    except Exception as e:
+        mark_failed()
+        error_msg = f'❌ Ошибка при подсчёте статистики: {str(e)}'
+        await update.message.reply_text(error_msg)
+        logger.error(f'Error computing statistics for user {user_id}: {e}')
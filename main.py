@@ -1,14 +1,36 @@
 import asyncio
+import multiprocessing
 import signal
+import time
+from typing import Any, List, Optional
 from telegram.ext import (
     Application,
     CommandHandler,
     ContextTypes,
+    InlineQueryHandler,
+    MessageHandler,
+    filters,
+)
+from config import (
+    BOT_MODE,
+    BOT_WORKERS,
+    CONCURRENT_UPDATES,
+    METRICS_HOST,
+    METRICS_PORT,
+    NLP_PROCESS_WORKERS,
+    TELEGRAM_API_BASE_URL,
+    TELEGRAM_BOT_TOKEN,
+    UPDATE_QUEUE_SIZE,
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    WORKER_DRAIN_TIMEOUT_SECONDS,
 )
-from config import TELEGRAM_BOT_TOKEN, LOG_LEVEL
 from loguru import logger
 import sys
-from models.database import init_db
+from models.database import init_db, close_db
 from handlers.command_handlers import (
     start_command,
     help_command,
@@ -18,59 +40,273 @@ from handlers.command_handlers import (
 from handlers.message_handlers import (
     handle_analyze,
     handle_spell_check,
+    handle_document,
     handle_examples,
+    handle_lemmatize,
+    handle_pos,
+    handle_stats,
 )
 from handlers.error_handler import error_handler
+from handlers.inline_handlers import handle_inline_query
+from services import inline_service, nlp_service, spell_check_service, stats_service
+from services.cluster import UpdateRouter, feed_updates, join_workers
+from services.dispatcher import OrderedUpdateProcessor
+from services.examples_cache import examples_cache
+from services.executor import start_executors, shutdown_executors, stats as executor_stats
+from services.llm_service import llm_client
+from services.logging_setup import log_pipeline, setup_logging, worker_log_file
+from services.metrics import MetricsServer, registry
+from services.query_log import query_log
+from services.rate_limiter import rate_limiter
+from services.retention import compaction
+from services.webhook_server import WebhookServer
 
+ALLOWED_UPDATES = ['message', 'inline_query', 'my_chat_member']
 
-logger.remove()
-logger.add(
-    sys.stdout,
-    format='<level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan> '
-           '- <level>{message}</level>',
-    level=LOG_LEVEL,
-)
-logger.add(
-    'logs/bot.log',
-    rotation='500 MB',
-    level=LOG_LEVEL,
-    format='{time} | {level: <8} | {name}:{function} - {message}',
-)
+
+def build_application(update_processor: Optional[OrderedUpdateProcessor] = None) -> Application:
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .update_queue(asyncio.Queue(maxsize=UPDATE_QUEUE_SIZE))
+    )
+    if update_processor is not None:
+        builder = builder.concurrent_updates(update_processor)
+    if TELEGRAM_API_BASE_URL:
+        builder = builder.base_url(TELEGRAM_API_BASE_URL)
+    return builder.build()
+
+
+async def start_receiving(app: Application) -> Optional[WebhookServer]:
+    if BOT_MODE != 'webhook':
+        await app.updater.start_polling(allowed_updates=ALLOWED_UPDATES)
+        logger.info('Bot started successfully and polling for updates')
+        return None
+
+    webhook = WebhookServer(
+        app,
+        host=WEBHOOK_HOST,
+        port=WEBHOOK_PORT,
+        path=WEBHOOK_PATH,
+        secret=WEBHOOK_SECRET,
+    )
+    await webhook.start()
+
+    if WEBHOOK_URL:
+        await app.bot.set_webhook(
+            url=WEBHOOK_URL,
+            allowed_updates=ALLOWED_UPDATES,
+            secret_token=WEBHOOK_SECRET or None,
+            max_connections=min(CONCURRENT_UPDATES, 100),
+        )
+    logger.info('Bot started successfully and receiving updates via webhook')
+    return webhook
+
+
+async def stop_receiving(app: Application, webhook: Optional[WebhookServer]) -> None:
+    if webhook is not None:
+        await webhook.stop()
+    if app.updater.running:
+        await app.updater.stop()
 
 
 class BotApplication:
-    def __init__(self) -> None:
-        self.app: Application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    # Standalone (worker_index is None): receives updates and handles them.
+    # Worker: gets updates from the ingress process and leaves schema
+    # migrations and history compaction to it.
+    def __init__(self, worker_index: Optional[int] = None) -> None:
+        self.worker_index = worker_index
+        self.update_processor = OrderedUpdateProcessor()
+        self.app: Application = build_application(self.update_processor)
+        self.webhook: Optional[WebhookServer] = None
+        self.metrics: Optional[MetricsServer] = None
         self.setup_handlers()
+        self.setup_metrics()
         
     def setup_handlers(self) -> None:
         self.app.add_handler(CommandHandler('start', start_command))
         self.app.add_handler(CommandHandler('help', help_command))
         self.app.add_handler(CommandHandler('analyze', handle_analyze))
         self.app.add_handler(CommandHandler('spell_check', handle_spell_check))
+        self.app.add_handler(MessageHandler(
+            filters.Document.FileExtension('txt') | filters.Document.FileExtension('docx'), handle_document
+        ))
         self.app.add_handler(CommandHandler('examples', handle_examples))
+        self.app.add_handler(CommandHandler('lemmatize', handle_lemmatize))
+        self.app.add_handler(CommandHandler('pos', handle_pos))
+        self.app.add_handler(CommandHandler('stats', handle_stats))
         self.app.add_handler(CommandHandler('history', history_command))
         self.app.add_handler(CommandHandler('clear_history', clear_history_command))
+        self.app.add_handler(InlineQueryHandler(handle_inline_query))
         
         self.app.add_error_handler(error_handler)
+
+    def setup_metrics(self) -> None:
+        registry.register_stats('cache', lambda: {
+            'morphology': nlp_service.morphology_cache.stats(),
+            'token': nlp_service.token_cache.stats(),
+            'paradigm': nlp_service.paradigm_cache.stats(),
+            'completion': inline_service.completion_cache.stats(),
+            'inline_answer': inline_service.answer_cache.stats(),
+            'examples': examples_cache.stats(),
+        }, label='cache')
+        registry.register_stats('hot_words', lambda: (
+            nlp_service.get_hot_words().stats() if nlp_service.get_hot_words() else {}
+        ))
+        registry.register_stats('inline', inline_service.stats)
+        registry.register_stats('morphology_table', stats_service.stats)
+        registry.register_stats('query_log', query_log.stats)
+        registry.register_stats('rate_limit', rate_limiter.stats)
+        registry.register_stats('nlp_executor', executor_stats)
+        registry.register_stats('llm', llm_client.stats)
+        registry.register_stats('log', log_pipeline.stats)
+        registry.register_stats('dispatcher', self.update_processor.stats)
+        registry.register_stats(
+            'dispatcher_lane', lambda: self.update_processor.stats()['lanes'], label='lane'
+        )
+        registry.register_stats('update_queue', lambda: {
+            'depth': self.app.update_queue.qsize(),
+            'size': self.app.update_queue.maxsize,
+        })
     
     async def start(self) -> None:
-        logger.info('Initializing database...')
-        init_db()
-        logger.info('Database initialized successfully')
-        
+        if self.worker_index is None:
+            logger.info('Initializing database...')
+            init_db()
+            logger.info('Database initialized successfully')
+            compaction.start()
+        query_log.start()
+
+        logger.info('Loading dictionaries...')
+        started = time.perf_counter()
+        nlp_service.warm_up()
+        spell_check_service.warm_up()
+        inline_service.warm_up()
+        logger.info(f'Dictionaries loaded in {time.perf_counter() - started:.2f} s')
+
+        # A worker is already one of several processes: it keeps NLP work on
+        # its thread pool instead of spawning its own process pool with
+        # another copy of the dictionaries.
+        start_executors(process_workers=NLP_PROCESS_WORKERS if self.worker_index is None else 0)
+        llm_client.start()
+
+        if METRICS_PORT:
+            # Workers listen on the ports after the ingress one.
+            port = METRICS_PORT if self.worker_index is None else METRICS_PORT + 1 + self.worker_index
+            self.metrics = MetricsServer(METRICS_HOST, port)
+            await self.metrics.start()
+
         logger.info('Starting bot...')
         await self.app.initialize()
         await self.app.start()
-        await self.app.updater.start_polling(allowed_updates=['message', 'my_chat_member'])
-        logger.info('Bot started successfully and polling for updates')
+
+        if self.worker_index is None:
+            self.webhook = await start_receiving(self.app)
+
+    async def run_worker(self, source: Any) -> None:
+        await self.start()
+        logger.info(f'Worker {self.worker_index} ready')
+        await feed_updates(source, self.app)
+        logger.info(f'Worker {self.worker_index} draining')
+        await self.stop()
         
     async def stop(self) -> None:
         logger.info('Shutting down bot...')
-        await self.app.updater.stop()
+        await stop_receiving(self.app, self.webhook)
         await self.app.stop()
         await self.app.shutdown()
-        logger.info('Bot stopped')
+        await compaction.stop()
+        await query_log.stop()
+        logger.info(f'Query log flushed: {query_log.stats()}')
+        shutdown_executors()
+        await llm_client.close()
+        if self.metrics is not None:
+            await self.metrics.stop()
+        await close_db()
+        logger.info(f'Bot stopped, log pipeline: {log_pipeline.stats()}')
+        log_pipeline.stop()
+
+
+def run_worker(index: int, source: Any) -> None:
+    # Entry point of a worker process. Ctrl+C and SIGTERM reach the whole
+    # process group; workers ignore them and finish once the ingress has
+    # stopped receiving and drained their queue.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    setup_logging(worker_log_file(index))
+    asyncio.run(BotApplication(worker_index=index).run_worker(source))
+
+
+class IngressApplication:
+    # Receives updates (polling or webhook) and routes them to worker
+    # processes, each with its own analyzers, caches and dispatcher, so
+    # NLP work is spread over several cores. No handlers run here.
+    def __init__(self, workers: int = BOT_WORKERS) -> None:
+        self.app: Application = build_application()
+        context = multiprocessing.get_context('spawn')
+        self.router = UpdateRouter(workers, UPDATE_QUEUE_SIZE, context)
+        self.processes: List[Any] = [
+            context.Process(target=run_worker, args=(index, source), name=f'bot-worker-{index}')
+            for index, source in enumerate(self.router.queues)
+        ]
+        self.webhook: Optional[WebhookServer] = None
+        self.metrics: Optional[MetricsServer] = None
+        self._forwarder: Optional[asyncio.Task] = None
+
+        registry.register_stats('worker', self.router.stats, label='worker')
+        registry.register_stats('update_queue', lambda: {
+            'depth': self.app.update_queue.qsize(),
+            'size': self.app.update_queue.maxsize,
+        })
+
+    async def _forward(self) -> None:
+        while True:
+            update = await self.app.update_queue.get()
+            if update is None:
+                return
+            await self.router.put(update)
+
+    async def start(self) -> None:
+        logger.info('Initializing database...')
+        init_db()
+        compaction.start()
+
+        for process in self.processes:
+            process.start()
+        logger.info(f'Started {len(self.processes)} worker processes')
+
+        if METRICS_PORT:
+            self.metrics = MetricsServer(METRICS_HOST, METRICS_PORT)
+            await self.metrics.start()
+
+        await self.app.initialize()
+        self._forwarder = asyncio.create_task(self._forward())
+        self.webhook = await start_receiving(self.app)
+
+    async def stop(self) -> None:
+        # Drain order: stop receiving, hand everything already received to
+        # the workers, then let each worker finish its queue.
+        logger.info('Shutting down ingress...')
+        await stop_receiving(self.app, self.webhook)
+        if self._forwarder is not None:
+            await self.app.update_queue.put(None)
+            await self._forwarder
+            self._forwarder = None
+
+        await self.router.drain()
+        await asyncio.get_running_loop().run_in_executor(
+            None, join_workers, self.processes, WORKER_DRAIN_TIMEOUT_SECONDS
+        )
+        self.router.close()
+        logger.info(f'Workers stopped, routed updates: {self.router.routed}')
+
+        await self.app.shutdown()
+        await compaction.stop()
+        if self.metrics is not None:
+            await self.metrics.stop()
+        await close_db()
+        logger.info(f'Ingress stopped, log pipeline: {log_pipeline.stats()}')
+        log_pipeline.stop()
 
 
 async def main() -> None:
@@ -78,28 +314,32 @@ async def main() -> None:
         logger.error('TELEGRAM_BOT_TOKEN not set in .env file')
         sys.exit(1)
     
-    bot_app = BotApplication()
-    
-    def signal_handler(sig, frame) -> None:
-        logger.info(f'Received signal {sig}, shutting down gracefully...')
-        asyncio.create_task(bot_app.stop())
-    
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    bot_app = IngressApplication() if BOT_WORKERS > 0 else BotApplication()
+    stopping = asyncio.Event()
+
+    def signal_handler(sig: signal.Signals) -> None:
+        logger.info(f'Received signal {sig.name}, shutting down gracefully...')
+        stopping.set()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, signal_handler, sig)
     
     try:
         await bot_app.start()
-        await asyncio.Event().wait()
-    except KeyboardInterrupt:
-        logger.info('Interrupted by user')
-        await bot_app.stop()
+        await stopping.wait()
     except Exception as e:
         logger.error(f'Fatal error: {e}')
         await bot_app.stop()
         sys.exit(1)
 
+    await bot_app.stop()
+
 
 if __name__ == '__main__':
+    # Only the real entry point configures logging: spawned pool workers
+    # import this module as __mp_main__ and must not open the log file.
+    setup_logging()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
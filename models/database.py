@@ -1,35 +1,157 @@
 from datetime import datetime
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+from loguru import logger
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from config import DATABASE_URL
+from config import DATABASE_URL, SQLITE_BUSY_TIMEOUT_MS
 
 Base = declarative_base()
 
+OBSOLETE_INDEXES = {
+    'user_queries': ['ix_user_queries_id', 'ix_user_queries_user_id'],
+}
+
+# PRAGMA auto_vacuum value of INCREMENTAL.
+INCREMENTAL_VACUUM = 2
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
 
 class UserQuery(Base):
     __tablename__ = 'user_queries'
 
-    id: int = Column(Integer, primary_key=True, index=True)
-    user_id: int = Column(Integer, index=True, nullable=False)
+    # Every hot query filters by user and orders or ranges by time, so one
+    # composite index replaces the old single-column user_id index; the
+    # created_at index stays for age-based retention.
+    __table_args__ = (
+        Index('ix_user_queries_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+    id: int = Column(Integer, primary_key=True)
+    user_id: int = Column(Integer, nullable=False)
     command: str = Column(String(50), nullable=False)
     query_text: str = Column(Text, nullable=False)
     response_text: str = Column(Text, nullable=False)
     created_at: datetime = Column(DateTime, default=datetime.utcnow, index=True)
 
 
+class RateLimitCounter(Base):
+    __tablename__ = 'rate_limit_counters'
+
+    user_id: int = Column(Integer, primary_key=True, autoincrement=False)
+    window_start: int = Column(Integer, primary_key=True, autoincrement=False)
+    count: int = Column(Integer, nullable=False, default=0)
+
+
+class ExampleCacheEntry(Base):
+    __tablename__ = 'example_cache'
+
+    lemma: str = Column(String(100), primary_key=True)
+    count: int = Column(Integer, primary_key=True, autoincrement=False)
+    examples: str = Column(Text, nullable=False)
+    fills: int = Column(Integer, nullable=False, default=1)
+    updated_at: datetime = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition('://')
+    if '+' in scheme:
+        return url
+    return f'{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}'
+
+
 engine = create_engine(
     DATABASE_URL,
     connect_args={'check_same_thread': False} if 'sqlite' in DATABASE_URL else {}
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# SQLite allows a single writer, so the async engine serialises access through
+# one pooled connection instead of failing with "database is locked".
+async_pool_args = {
+    'poolclass': AsyncAdaptedQueuePool,
+    'pool_size': 1,
+    'max_overflow': 0,
+    'pool_timeout': 60,
+} if 'sqlite' in DATABASE_URL else {}
+
+async_engine = create_async_engine(to_async_url(DATABASE_URL), **async_pool_args)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def _tune_sqlite(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    # auto_vacuum only takes effect on a fresh database; existing ones are
+    # converted once by enable_incremental_vacuum().
+    cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    cursor.close()
+
+
+if 'sqlite' in DATABASE_URL:
+    event.listen(engine, 'connect', _tune_sqlite)
+    event.listen(async_engine.sync_engine, 'connect', _tune_sqlite)
+
+
+def migrate_db() -> None:
+    # create_all skips indexes of tables that already exist, so new indexes
+    # are added here first and only then the ones they replace are dropped.
+    existing = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            present = {index['name'] for index in existing.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in present:
+                    index.create(connection)
+                    logger.info(f'Created index {index.name}')
+            for name in OBSOLETE_INDEXES.get(table.name, []):
+                if name in present:
+                    connection.execute(text(f'DROP INDEX {name}'))
+                    logger.info(f'Dropped obsolete index {name}')
+
+
+def enable_incremental_vacuum() -> None:
+    # A database created before auto_vacuum was set keeps its old mode until
+    # a full VACUUM rewrites it; without that, PRAGMA incremental_vacuum
+    # frees nothing. The rewrite runs once, at start-up.
+    if 'sqlite' not in DATABASE_URL:
+        return
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        if connection.exec_driver_sql('PRAGMA auto_vacuum').scalar() == INCREMENTAL_VACUUM:
+            return
+        logger.info('Converting the database to incremental auto-vacuum (one-time VACUUM)...')
+        connection.exec_driver_sql('VACUUM')
+
 
 def init_db() -> None:
     Base.metadata.create_all(bind=engine)
+    migrate_db()
+    enable_incremental_vacuum()
 
 
 def get_session():
     return SessionLocal()
+
+
+def get_async_session() -> AsyncSession:
+    return AsyncSessionLocal()
+
+
+async def close_db() -> None:
+    await async_engine.dispose()
+    engine.dispose()
@@ -0,0 +1,164 @@
+import asyncio
+import sys
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+def estimate_size(value: Any) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class LRUCache:
+    def __init__(
+            self,
+            max_entries: int,
+            max_bytes: Optional[int] = None,
+            sizeof: Callable[[Any], int] = estimate_size,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self.current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[1]
+
+        self._data[key] = (value, size)
+        self.current_bytes += size
+        self._shrink()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return default
+        self.current_bytes -= entry[1]
+        return entry[0]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.current_bytes = 0
+
+    def _shrink(self) -> None:
+        while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self.current_bytes > self.max_bytes)
+        ):
+            _, (_, size) = self._data.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'bytes': self.current_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SingleFlight:
+    # Concurrent callers with the same key share one running task.
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.leaders += 1
+        else:
+            self.followers += 1
+
+        return await asyncio.shield(task)
+
+    def cancel_all(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+        self._inflight.clear()
+
+
+class LatestOnly:
+    # One running task per key: a newer call cancels the older one, whose
+    # caller then gets None. Each call first waits `delay` seconds, so a
+    # burst of calls (keystrokes) only does the work of the last one.
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self._latest: Dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.superseded = 0
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    async def _delayed(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        if self.delay > 0:
+            await asyncio.sleep(self.delay)
+        return await factory()
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Optional[Any]:
+        previous = self._latest.get(key)
+        if previous is not None and not previous.done():
+            previous.cancel()
+            self.superseded += 1
+
+        task = asyncio.create_task(self._delayed(factory))
+        self._latest[key] = task
+        self.started += 1
+        try:
+            # wait() tells a superseded task (cancelled) apart from the
+            # caller itself being cancelled (raises here).
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            if self._latest.get(key) is task:
+                del self._latest[key]
+
+        if task.cancelled():
+            return None
+        return task.result()
+
+    def stats(self) -> Dict[str, int]:
+        return {'in_flight': len(self._latest), 'started': self.started, 'superseded': self.superseded}
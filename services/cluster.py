@@ -0,0 +1,103 @@
+import asyncio
+import json
+import multiprocessing
+import queue
+import time
+from typing import Any, Dict, List
+
+from loguru import logger
+from telegram import Update
+from telegram.ext import Application
+
+# Put on a worker queue once the ingress stops receiving: the worker
+# handles everything queued before it and exits.
+DRAIN = None
+PARENT_CHECK_SECONDS = 1.0
+
+
+def affinity_key(update: Update) -> int:
+    # Every update of a chat goes to the same worker, whose dispatcher keeps
+    # per-chat order. Private chats have the user's id as chat id, so a
+    # user's rate limit and caches stay in one process too.
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return update.update_id
+
+
+class UpdateRouter:
+    # Ingress side: one bounded multiprocessing queue per worker. Updates are
+    # sent as JSON so only a string crosses the process boundary. When a
+    # worker's queue is full the put blocks in a thread, which fills the
+    # ingress update queue and in turn slows polling or makes the webhook
+    # answer 429.
+    def __init__(self, workers: int, queue_size: int, context: Any) -> None:
+        self.queues = [context.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.routed = [0] * workers
+
+    def worker_for(self, update: Update) -> int:
+        return affinity_key(update) % len(self.queues)
+
+    async def put(self, update: Update) -> None:
+        index = self.worker_for(update)
+        target = self.queues[index]
+        payload = update.to_json()
+        try:
+            target.put_nowait(payload)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, target.put, payload)
+        self.routed[index] += 1
+
+    async def drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        for target in self.queues:
+            await loop.run_in_executor(None, target.put, DRAIN)
+
+    def close(self) -> None:
+        for target in self.queues:
+            target.close()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        result = {}
+        for index, target in enumerate(self.queues):
+            try:
+                depth = target.qsize()
+            except NotImplementedError:
+                depth = -1
+            result[str(index)] = {'routed': self.routed[index], 'queue_depth': depth}
+        return result
+
+
+async def feed_updates(source: Any, application: Application) -> None:
+    # Worker side: moves updates from the ingress queue into the local
+    # Application's update queue until DRAIN arrives. The ingress going away
+    # without sending DRAIN (e.g. killed) also ends the loop.
+    loop = asyncio.get_running_loop()
+    parent = multiprocessing.parent_process()
+
+    while True:
+        try:
+            payload = await loop.run_in_executor(None, source.get, True, PARENT_CHECK_SECONDS)
+        except queue.Empty:
+            if parent is not None and not parent.is_alive():
+                logger.warning('Ingress process exited without draining, stopping worker')
+                return
+            continue
+
+        if payload is DRAIN:
+            return
+        await application.update_queue.put(Update.de_json(json.loads(payload), application.bot))
+
+
+def join_workers(processes: List[multiprocessing.Process], timeout: float) -> None:
+    # Blocking; called from a thread. Workers ignore SIGTERM (the ingress
+    # drains them through their queues), so stragglers past the deadline
+    # are killed.
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        process.join(max(deadline - time.monotonic(), 0))
+        if process.is_alive():
+            logger.warning(f'{process.name} did not drain in {timeout:.0f} s, killing it')
+            process.kill()
+            process.join()
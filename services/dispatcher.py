@@ -0,0 +1,138 @@
+import asyncio
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from config import (
+    CONCURRENT_UPDATES,
+    FAST_LANE_CONCURRENCY,
+    SLOW_LANE_COMMANDS,
+    SLOW_LANE_CONCURRENCY,
+    UPDATE_QUEUE_SIZE,
+)
+
+
+class Lane:
+    def __init__(self, name: str, concurrency: int) -> None:
+        self.name = name
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.waiting = 0
+        self.active = 0
+        self.processed = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'concurrency': self.concurrency,
+            'waiting': self.waiting,
+            'active': self.active,
+            'processed': self.processed,
+        }
+
+
+class OrderedUpdateProcessor(BaseUpdateProcessor):
+    # Updates from different chats run concurrently, updates from one chat run
+    # strictly in arrival order. Each update then waits for a slot in its lane
+    # (slow LLM commands vs everything else) and in the global limit, so a
+    # slow upstream can only ever occupy the slow lane.
+    #
+    # The base class semaphore bounds admitted updates (waiting + running);
+    # the global running limit is applied only after the chat lock is held,
+    # so chats queued behind their own earlier updates do not take up slots.
+    def __init__(
+            self,
+            max_running: int = CONCURRENT_UPDATES,
+            max_pending: int = UPDATE_QUEUE_SIZE,
+            fast_concurrency: int = FAST_LANE_CONCURRENCY,
+            slow_concurrency: int = SLOW_LANE_CONCURRENCY,
+            slow_commands: frozenset = SLOW_LANE_COMMANDS,
+    ) -> None:
+        super().__init__(max_concurrent_updates=max_pending)
+        self.max_running = max_running
+        self.slow_commands = slow_commands
+        self.lanes = {
+            'fast': Lane('fast', fast_concurrency),
+            'slow': Lane('slow', slow_concurrency),
+        }
+        self._running = asyncio.Semaphore(max_running)
+        self._chat_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._chat_pending: Dict[Hashable, int] = {}
+        self.pending = 0
+
+    @staticmethod
+    def chat_key(update: object) -> Optional[Hashable]:
+        if isinstance(update, Update) and update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+
+    def lane_for(self, update: object) -> Lane:
+        if isinstance(update, Update) and update.effective_message and update.effective_message.document:
+            # Uploaded documents are processed in full.
+            return self.lanes['slow']
+        if isinstance(update, Update) and update.effective_message and update.effective_message.text:
+            text = update.effective_message.text
+            if text.startswith('/'):
+                command = text.split(maxsplit=1)[0][1:].split('@', 1)[0].lower()
+                if command in self.slow_commands:
+                    return self.lanes['slow']
+        return self.lanes['fast']
+
+    async def _run_in_lane(self, lane: Lane, coroutine: Awaitable[Any]) -> None:
+        lane.waiting += 1
+        started = False
+        try:
+            async with lane.semaphore, self._running:
+                lane.waiting -= 1
+                started = True
+                lane.active += 1
+                try:
+                    await coroutine
+                finally:
+                    lane.active -= 1
+                    lane.processed += 1
+        finally:
+            if not started:
+                lane.waiting -= 1
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        lane = self.lane_for(update)
+        key = self.chat_key(update)
+        self.pending += 1
+
+        try:
+            if key is None:
+                await self._run_in_lane(lane, coroutine)
+                return
+
+            lock = self._chat_locks.get(key)
+            if lock is None:
+                lock = self._chat_locks[key] = asyncio.Lock()
+            self._chat_pending[key] = self._chat_pending.get(key, 0) + 1
+
+            try:
+                async with lock:
+                    await self._run_in_lane(lane, coroutine)
+            finally:
+                remaining = self._chat_pending[key] - 1
+                if remaining:
+                    self._chat_pending[key] = remaining
+                else:
+                    del self._chat_pending[key]
+                    del self._chat_locks[key]
+        finally:
+            self.pending -= 1
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': self.pending,
+            'chats_with_backlog': sum(1 for n in self._chat_pending.values() if n > 1),
+            'max_chat_depth': max(self._chat_pending.values(), default=0),
+            'lanes': {name: lane.stats() for name, lane in self.lanes.items()},
+        }
@@ -0,0 +1,272 @@
+import codecs
+import io
+import re
+import zipfile
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, BinaryIO, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+from xml.etree import ElementTree
+
+import aiohttp
+from telegram import File
+
+from config import DOCUMENT_CHUNK_CHARS
+from services.executor import run_heavy, run_light
+from services.nlp_service import TOKEN_RE, parse_tokens
+from services.spell_check_service import WORD_RE, find_unknown_words
+
+MODES = ('spell_check', 'lemmatize')
+DOCUMENT_TYPES = ('txt', 'docx')
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+SUGGESTIONS_IN_FILE = 3
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DOCX_PARAGRAPH = W + 'p'
+DOCX_TEXT = W + 't'
+DOCX_TAB = W + 'tab'
+DOCX_BREAKS = (W + 'br', W + 'cr')
+DOCX_BODY = W + 'body'
+
+
+class DocumentError(ValueError):
+    pass
+
+
+async def download_document(file: File, target: Path) -> None:
+    # PTB's download helpers read the whole file into memory first; remote
+    # files are streamed to disk instead.
+    if not file.file_path.startswith(('http://', 'https://')):
+        await file.download_to_drive(target)
+        return
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(file.file_path) as response:
+            response.raise_for_status()
+            with open(target, 'wb') as out:
+                async for block in response.content.iter_chunked(DOWNLOAD_CHUNK_BYTES):
+                    out.write(block)
+
+
+def detect_encoding(path: Path) -> str:
+    # UTF-8 (with or without BOM) if the whole file decodes, CP1251
+    # otherwise; checked in one streaming pass.
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    with open(path, 'rb') as f:
+        try:
+            while True:
+                block = f.read(DOWNLOAD_CHUNK_BYTES)
+                if not block:
+                    decoder.decode(b'', final=True)
+                    return 'utf-8-sig'
+                decoder.decode(block)
+        except UnicodeDecodeError:
+            return 'cp1251'
+
+
+def read_txt(path: Path, chunk_chars: int = DOCUMENT_CHUNK_CHARS) -> Iterator[Tuple[str, float]]:
+    # Yields (text, fraction of the file read).
+    size = path.stat().st_size or 1
+    with open(path, 'rb') as raw:
+        text = io.TextIOWrapper(raw, encoding=detect_encoding(path), newline='')
+        while True:
+            block = text.read(chunk_chars)
+            if not block:
+                return
+            yield block, min(raw.tell() / size, 1.0)
+
+
+class _CountingReader(io.RawIOBase):
+    def __init__(self, stream: BinaryIO) -> None:
+        self.stream = stream
+        self.consumed = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.consumed += len(data)
+        return data
+
+
+def read_docx(path: Path, chunk_chars: int = DOCUMENT_CHUNK_CHARS) -> Iterator[Tuple[str, float]]:
+    # Paragraph text of word/document.xml, parsed incrementally straight from
+    # the archive. Finished top-level elements are dropped from the body, so
+    # the tree never holds more than the paragraph being read.
+    try:
+        archive = zipfile.ZipFile(path)
+        info = archive.getinfo('word/document.xml')
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise DocumentError('файл .docx повреждён') from e
+
+    with archive, archive.open(info) as xml:
+        reader = _CountingReader(xml)
+        size = info.file_size or 1
+        body: Optional[ElementTree.Element] = None
+        depth = 0
+        parts: List[str] = []
+        length = 0
+
+        try:
+            for event, element in ElementTree.iterparse(reader, events=('start', 'end')):
+                if event == 'start':
+                    depth += 1
+                    if element.tag == DOCX_BODY:
+                        body = element
+                    continue
+
+                depth -= 1
+                tag = element.tag
+                if tag == DOCX_TEXT and element.text:
+                    parts.append(element.text)
+                    length += len(element.text)
+                elif tag == DOCX_TAB:
+                    parts.append('\t')
+                elif tag in DOCX_BREAKS:
+                    parts.append('\n')
+                elif tag == DOCX_PARAGRAPH:
+                    parts.append('\n')
+                    length += 1
+                # Also mid-paragraph, so one long paragraph is not read whole.
+                if length >= chunk_chars:
+                    yield ''.join(parts), min(reader.consumed / size, 1.0)
+                    parts, length = [], 0
+
+                # document > body > top-level paragraphs and tables.
+                if depth == 2 and body is not None:
+                    body.clear()
+        except ElementTree.ParseError as e:
+            raise DocumentError('файл .docx повреждён') from e
+
+        if parts:
+            yield ''.join(parts), 1.0
+
+
+def read_document(path: Path, document_type: str) -> Iterator[Tuple[str, float]]:
+    if document_type == 'docx':
+        return read_docx(path)
+    return read_txt(path)
+
+
+@dataclass
+class DocumentReport:
+    mode: str
+    characters: int = 0
+    words: int = 0
+    progress: float = 0.0
+    # Spell check: occurrences of every unknown word. Lemmatize: occurrences
+    # of every lemma. Both grow with the vocabulary, not with the text.
+    counts: Counter = field(default_factory=Counter)
+    unique_words: int = 0
+
+
+class DocumentPipeline:
+    # tokenizer -> dedupe -> analysis -> annotation, one chunk at a time.
+    # Each distinct word is analysed once, on the executor pool; the chunk
+    # is then written out with mystem-style annotations:
+    #   spell check: only unknown words, "карова{?корова|карта}"
+    #   lemmatize:   every word, "мыла{мыть}"
+    def __init__(self, mode: str, output: TextIO, chunk_chars: int = DOCUMENT_CHUNK_CHARS) -> None:
+        if mode not in MODES:
+            raise ValueError(f'Unknown document mode {mode}')
+        self.mode = mode
+        self.output = output
+        self.chunk_chars = chunk_chars
+        self.pattern = WORD_RE if mode == 'spell_check' else TOKEN_RE
+        self.annotations: Dict[str, str] = {}
+        self.report = DocumentReport(mode)
+        self._tail = ''
+
+    def _new_words(self, chunk: str) -> List[str]:
+        annotations = self.annotations
+        return list(dict.fromkeys(
+            word for word in map(str.lower, self.pattern.findall(chunk)) if word not in annotations
+        ))
+
+    async def _analyze(self, words: List[str]) -> Dict[str, str]:
+        if self.mode == 'spell_check':
+            unknown = await run_heavy(find_unknown_words, words)
+            return {
+                word: '{?' + '|'.join(unknown[word][:SUGGESTIONS_IN_FILE]) + '}' if word in unknown else ''
+                for word in words
+            }
+        parsed = await parse_tokens(words)
+        return {word: '{' + parsed[word][0] + '}' for word in words}
+
+    def _annotate(self, chunk: str) -> None:
+        annotations = self.annotations
+        counts = self.report.counts
+        words = 0
+        lemmatize = self.mode == 'lemmatize'
+
+        def annotate(match: 're.Match[str]') -> str:
+            nonlocal words
+            words += 1
+            token = match.group()
+            annotation = annotations[token.lower()]
+            if annotation:
+                counts[annotation[1:-1] if lemmatize else token.lower()] += 1
+            return token + annotation
+
+        self.output.write(self.pattern.sub(annotate, chunk))
+        self.report.words += words
+        self.report.characters += len(chunk)
+        self.report.unique_words = len(annotations)
+
+    async def _process(self, chunk: str) -> None:
+        fresh = await run_light(self._new_words, chunk)
+        if fresh:
+            self.annotations.update(await self._analyze(fresh))
+        await run_light(self._annotate, chunk)
+
+    async def feed(self, text: str) -> None:
+        # The part after the last whitespace may be a word cut in two; it is
+        # kept for the next chunk. A whole chunk without whitespace is split
+        # where it ends rather than buffered.
+        text = self._tail + text
+        cut = max(text.rfind(' '), text.rfind('\n'), text.rfind('\t'))
+        if cut < 0 and len(text) >= self.chunk_chars:
+            cut = len(text) - 1
+        self._tail = text[cut + 1:]
+        if cut >= 0:
+            await self._process(text[:cut + 1])
+
+    async def finish(self) -> DocumentReport:
+        if self._tail:
+            await self._process(self._tail)
+            self._tail = ''
+        self.report.progress = 1.0
+        return self.report
+
+
+async def process_document(
+        path: Path,
+        document_type: str,
+        mode: str,
+        output: TextIO,
+        on_progress: Callable[[DocumentReport], Awaitable[None]],
+) -> DocumentReport:
+    # Memory is bounded by the chunk size plus the vocabulary: the text is
+    # never held in full, neither on input nor on output.
+    pipeline = DocumentPipeline(mode, output)
+    chunks = read_document(path, document_type)
+    # Reading a chunk is plain I/O bounded by the chunk size, so it runs
+    # without a time budget; the budget applies to the analysis of each
+    # chunk. A read interrupted by cancellation is still running on its
+    # worker and cannot be closed; the generator is closed when collected.
+    reading = False
+    try:
+        while True:
+            reading = True
+            item = await run_light(next, chunks, None, budget=None)
+            reading = False
+            if item is None:
+                break
+            text, pipeline.report.progress = item
+            await pipeline.feed(text)
+            await on_progress(pipeline.report)
+    finally:
+        if not reading:
+            chunks.close()
+    return await pipeline.finish()
@@ -0,0 +1,191 @@
+import random
+import re
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import delete, func, select
+
+from config import (
+    EXAMPLES_CACHE_MAX_ENTRIES,
+    EXAMPLES_CACHE_MAX_ROWS,
+    EXAMPLES_CACHE_RANDOM,
+    EXAMPLES_CACHE_TTL_SECONDS,
+    EXAMPLES_POOL_SIZE,
+)
+from models.database import ExampleCacheEntry, get_async_session
+from services.cache import LRUCache
+
+NUMBERING_RE = re.compile(r'^\s*\d+\s*[.)]\s*')
+PRUNE_EVERY = 100
+
+
+def strip_numbering(example: str) -> str:
+    return NUMBERING_RE.sub('', example).strip()
+
+
+class ExamplesCache:
+    # Two tiers: an in-memory LRU of sentence pools in front of the
+    # example_cache table, keyed by (lemma, count).
+    def __init__(
+            self,
+            ttl: float = EXAMPLES_CACHE_TTL_SECONDS,
+            max_entries: int = EXAMPLES_CACHE_MAX_ENTRIES,
+            max_rows: int = EXAMPLES_CACHE_MAX_ROWS,
+            pool_size: int = EXAMPLES_POOL_SIZE,
+            randomize: bool = EXAMPLES_CACHE_RANDOM,
+    ) -> None:
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.pool_size = pool_size
+        self.randomize = randomize
+        self.memory = LRUCache(max_entries)
+        self.disk_hits = 0
+        self.fallback_hits = 0
+        self._puts = 0
+
+    async def _load(self, key: Tuple[str, int]) -> Optional[Tuple[List[str], int]]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            pool, fills, stored_at = entry
+            if time.time() - stored_at < self.ttl:
+                return pool, fills
+            self.memory.pop(key)
+
+        async with get_async_session() as session:
+            try:
+                row = await session.get(ExampleCacheEntry, key)
+            except Exception as e:
+                logger.error(f'Examples cache read error: {e}')
+                return None
+
+        if row is None:
+            return None
+
+        age = (datetime.utcnow() - row.updated_at).total_seconds()
+        if age >= self.ttl:
+            return None
+
+        pool = row.examples.split('\n')
+        self.memory.set(key, (pool, row.fills, time.time() - age))
+        self.disk_hits += 1
+        return pool, row.fills
+
+    def _max_fills(self, count: int) -> int:
+        return -(-self.pool_size // count)
+
+    async def get(self, lemma: str, count: int) -> Optional[List[str]]:
+        cached = await self._load((lemma, count))
+        if cached is None:
+            return None
+
+        pool, fills = cached
+        if len(pool) < count:
+            return None
+
+        if not self.randomize:
+            return pool[:count]
+
+        # Keep asking upstream until the pool is full (or the model stops
+        # producing new sentences) so repeated requests stay varied, then
+        # serve random samples from it.
+        if len(pool) < self.pool_size and fills < self._max_fills(count):
+            return None
+        return random.sample(pool, count)
+
+    async def fallback(self, lemma: str, count: int) -> Optional[List[str]]:
+        # Used when the upstream is failing: whatever has been stored for the
+        # key, ignoring TTL and pool fill, is better than no answer.
+        entry = self.memory.get((lemma, count))
+        if entry is not None:
+            pool = entry[0]
+        else:
+            async with get_async_session() as session:
+                try:
+                    row = await session.get(ExampleCacheEntry, (lemma, count))
+                except Exception as e:
+                    logger.error(f'Examples cache read error: {e}')
+                    return None
+            if row is None:
+                return None
+            pool = row.examples.split('\n')
+
+        pool = [example for example in pool if example]
+        if not pool:
+            return None
+        self.fallback_hits += 1
+        return random.sample(pool, min(count, len(pool))) if self.randomize else pool[:count]
+
+    async def put(self, lemma: str, count: int, examples: List[str]) -> None:
+        key = (lemma, count)
+        cleaned = [strip_numbering(e) for e in examples]
+        cleaned = [e for e in cleaned if e]
+        if not cleaned:
+            return
+
+        pool, fills = await self._load(key) or ([], 0)
+        if self.randomize:
+            pool = list(pool)
+            for example in cleaned:
+                if example not in pool:
+                    pool.append(example)
+            pool = pool[-self.pool_size:]
+        else:
+            pool = cleaned
+        fills += 1
+
+        self.memory.set(key, (pool, fills, time.time()))
+
+        async with get_async_session() as session:
+            try:
+                await session.merge(ExampleCacheEntry(
+                    lemma=lemma,
+                    count=count,
+                    examples='\n'.join(pool),
+                    fills=fills,
+                    updated_at=datetime.utcnow(),
+                ))
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.error(f'Examples cache write error: {e}')
+                return
+
+        self._puts += 1
+        if self._puts % PRUNE_EVERY == 0:
+            await self.prune()
+
+    async def prune(self) -> int:
+        async with get_async_session() as session:
+            try:
+                expired = await session.execute(
+                    delete(ExampleCacheEntry).where(
+                        ExampleCacheEntry.updated_at < datetime.utcnow() - timedelta(seconds=self.ttl)
+                    )
+                )
+                removed = expired.rowcount
+
+                total = await session.scalar(select(func.count()).select_from(ExampleCacheEntry))
+                overflow = (total or 0) - self.max_rows
+                if overflow > 0:
+                    oldest = select(ExampleCacheEntry.updated_at).order_by(
+                        ExampleCacheEntry.updated_at
+                    ).offset(overflow).limit(1).scalar_subquery()
+                    trimmed = await session.execute(
+                        delete(ExampleCacheEntry).where(ExampleCacheEntry.updated_at < oldest)
+                    )
+                    removed += trimmed.rowcount
+
+                await session.commit()
+                return removed
+            except Exception as e:
+                await session.rollback()
+                logger.error(f'Examples cache prune error: {e}')
+                return 0
+
+    def stats(self) -> dict:
+        return {**self.memory.stats(), 'disk_hits': self.disk_hits, 'fallback_hits': self.fallback_hits}
+
+
+examples_cache = ExamplesCache()
@@ -0,0 +1,120 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+from config import NLP_PROCESS_WORKERS, NLP_THREAD_WORKERS, NLP_TIME_BUDGET_SECONDS
+
+
+class NLPTimeoutError(TimeoutError):
+    pass
+
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+# Calls that ran past their budget, and those of them still holding a
+# worker: the caller got NLPTimeoutError, but the call runs to the end.
+# The done-callback that releases an abandoned call runs on a pool thread,
+# hence the lock.
+_timeouts = 0
+_abandoned_running = 0
+_abandoned_lock = threading.Lock()
+
+
+def _init_worker() -> None:
+    # Each worker loads MorphAnalyzer and maps the spelling index once at
+    # start-up, so tasks never pay the dictionary load.
+    from services import nlp_service, spell_check_service
+
+    nlp_service.warm_up()
+    spell_check_service.warm_up()
+
+
+def start_executors(
+        thread_workers: int = NLP_THREAD_WORKERS,
+        process_workers: int = NLP_PROCESS_WORKERS,
+) -> None:
+    global _thread_pool, _process_pool
+
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix='nlp')
+
+    if _process_pool is None and process_workers > 0:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=process_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+        # Spawn every worker now so their dictionaries load before the first request.
+        for _ in range(process_workers):
+            _process_pool.submit(os.getpid)
+        logger.info(f'NLP process pool started with {process_workers} workers')
+
+
+def shutdown_executors() -> None:
+    global _thread_pool, _process_pool
+
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+
+
+async def _run(
+        executor: Optional[Executor],
+        func: Callable[..., Any],
+        args: tuple,
+        budget: Optional[float],
+) -> Any:
+    # The budget bounds how long the caller waits, not the work itself: a
+    # call still queued is cancelled, but neither a thread nor a process
+    # pool can interrupt a running call, so it keeps its worker until it
+    # returns. Such calls are counted in stats().
+    global _timeouts, _abandoned_running
+
+    loop = asyncio.get_running_loop()
+    if executor is None:
+        future = loop.run_in_executor(None, partial(func, *args))
+        submitted: Optional[Future] = None
+    else:
+        submitted = executor.submit(func, *args)
+        future = asyncio.wrap_future(submitted)
+    try:
+        return await asyncio.wait_for(future, timeout=budget)
+    except asyncio.TimeoutError:
+        _timeouts += 1
+        if submitted is not None and not submitted.cancel() and not submitted.done():
+            with _abandoned_lock:
+                _abandoned_running += 1
+            submitted.add_done_callback(_abandoned_done)
+        logger.warning(f'{func.__name__} exceeded time budget of {budget} s')
+        raise NLPTimeoutError(f'обработка заняла больше {budget:g} сек') from None
+
+
+def _abandoned_done(_: Future) -> None:
+    global _abandoned_running
+    with _abandoned_lock:
+        _abandoned_running -= 1
+
+
+async def run_light(func: Callable[..., Any], *args: Any, budget: Optional[float] = NLP_TIME_BUDGET_SECONDS) -> Any:
+    return await _run(_thread_pool, func, args, budget)
+
+
+async def run_heavy(func: Callable[..., Any], *args: Any, budget: Optional[float] = NLP_TIME_BUDGET_SECONDS) -> Any:
+    return await _run(_process_pool or _thread_pool, func, args, budget)
+
+
+def stats() -> Dict[str, int]:
+    return {
+        'timeouts': _timeouts,
+        'abandoned_running': _abandoned_running,
+    }
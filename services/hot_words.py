@@ -0,0 +1,270 @@
+import argparse
+import mmap
+import struct
+import sys
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from loguru import logger
+
+from config import HOT_WORDS_PATH, HOT_WORDS_TOP_N
+from services import index_file
+from services.paradigm import Paradigm
+
+MAGIC = b'HOTWRD01'
+HEADER = struct.Struct('<8sIIIII')
+# normal_form, POS label, grammemes, raw POS tag, offset of the paradigm in data.
+RECORD_FIELDS = 5
+NONE = 0xFFFFFFFF
+
+Entry = Tuple[Dict[str, Any], Paradigm]
+
+
+def _offsets(encoded: List[bytes]) -> List[int]:
+    offsets = [0]
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return offsets
+
+
+def serialize_table(entries: Dict[str, Entry], fingerprint: int) -> bytes:
+    # Words are sorted in one UTF-8 blob (binary search over the buffer, as in
+    # the suggestion index). Every string is stored once in a string table;
+    # records and paradigms are plain uint32 arrays of string ids, and forms
+    # of one lexeme share a single encoded paradigm.
+    strings: Dict[str, int] = {}
+    data: List[int] = []
+    paradigms: Dict[Paradigm, int] = {}
+
+    def string_id(text: Optional[str]) -> int:
+        if text is None:
+            return NONE
+        return strings.setdefault(text, len(strings))
+
+    def paradigm_offset(paradigm: Paradigm) -> int:
+        # Forms are one newline-joined string, decoded with a single call.
+        if paradigm not in paradigms:
+            paradigms[paradigm] = len(data)
+            data.extend((
+                string_id(paradigm.lemma),
+                string_id(paradigm.pos),
+                string_id('\n'.join(paradigm.forms)),
+                len(paradigm.cells),
+            ))
+            for section, row, column, indexes in paradigm.cells:
+                data.extend((string_id(section), string_id(row), string_id(column), len(indexes)))
+                data.extend(indexes)
+        return paradigms[paradigm]
+
+    words = sorted(entries)
+    records: List[int] = []
+    for word in words:
+        entry, paradigm = entries[word]
+        records.extend((
+            string_id(entry['normal_form']),
+            string_id(entry['pos']),
+            string_id(entry['grammemes']),
+            string_id(paradigm.pos),
+            paradigm_offset(paradigm),
+        ))
+
+    encoded_words = [word.encode('utf-8') for word in words]
+    encoded_strings = [text.encode('utf-8') for text in strings]
+    word_offsets = _offsets(encoded_words)
+    string_offsets = _offsets(encoded_strings)
+
+    return b''.join((
+        HEADER.pack(MAGIC, fingerprint, len(words), len(strings), len(data), word_offsets[-1]),
+        struct.pack(f'<{len(word_offsets)}I', *word_offsets),
+        struct.pack(f'<{len(records)}I', *records),
+        struct.pack(f'<{len(string_offsets)}I', *string_offsets),
+        struct.pack(f'<{len(data)}I', *data),
+        *encoded_words,
+        *encoded_strings,
+    ))
+
+
+class _WordKeys:
+    def __init__(self, table: 'HotWords') -> None:
+        self.table = table
+
+    def __len__(self) -> int:
+        return self.table.word_count
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.table.word_bytes(i)
+
+
+class HotWords:
+    # Precomputed morphology and paradigms for the most frequent words,
+    # read straight from a (usually mmap-ed) buffer. Lookups run on the
+    # event loop: a binary search plus decoding a few dozen string ids is far
+    # cheaper than a round trip to the executor and a pymorphy3 parse.
+    def __init__(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        magic, fingerprint, word_count, string_count, data_len, words_len = \
+            HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError('not a hot words table')
+
+        self.fingerprint = fingerprint
+        self.word_count = word_count
+        self._buffer = buffer
+        self._labels: Dict[int, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+        view = memoryview(buffer)
+        offset = HEADER.size
+        self.word_offsets = view[offset:offset + (word_count + 1) * 4].cast('I')
+        offset += (word_count + 1) * 4
+        self.records = view[offset:offset + word_count * RECORD_FIELDS * 4].cast('I')
+        offset += word_count * RECORD_FIELDS * 4
+        self.string_offsets = view[offset:offset + (string_count + 1) * 4].cast('I')
+        offset += (string_count + 1) * 4
+        self.data = view[offset:offset + data_len * 4].cast('I')
+        offset += data_len * 4
+        self.words_blob = view[offset:offset + words_len]
+        offset += words_len
+        self.strings_blob = view[offset:offset + self.string_offsets[string_count]]
+
+    @classmethod
+    def load(cls, path: Path) -> 'HotWords':
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return self.word_count
+
+    def word_bytes(self, i: int) -> bytes:
+        return bytes(self.words_blob[self.word_offsets[i]:self.word_offsets[i + 1]])
+
+    def string(self, i: int) -> Optional[str]:
+        if i == NONE:
+            return None
+        return sys.intern(
+            bytes(self.strings_blob[self.string_offsets[i]:self.string_offsets[i + 1]]).decode('utf-8')
+        )
+
+    def _label(self, i: int) -> str:
+        # Section, row and column names come from a few dozen grammemes.
+        label = self._labels.get(i)
+        if label is None:
+            label = self._labels[i] = self.string(i)
+        return label
+
+    def word_id(self, word: str) -> Optional[int]:
+        encoded = word.encode('utf-8')
+        i = bisect_left(_WordKeys(self), encoded)
+        if i < self.word_count and self.word_bytes(i) == encoded:
+            return i
+        return None
+
+    def _record(self, word: str) -> Optional[int]:
+        word_id = self.word_id(word)
+        if word_id is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return word_id * RECORD_FIELDS
+
+    def morphology(self, word: str) -> Optional[Dict[str, Any]]:
+        # Same shape as nlp_service._build_morphology's entry.
+        record = self._record(word)
+        if record is None:
+            return None
+        paradigm = self.records[record + 4]
+        return {
+            'normal_form': self.string(self.records[record]),
+            'pos': self.string(self.records[record + 1]),
+            'grammemes': self.string(self.records[record + 2]),
+            'paradigm_key': (self.string(self.data[paradigm]), self.string(self.data[paradigm + 1])),
+        }
+
+    def token(self, word: str) -> Optional[Tuple[str, str]]:
+        # (normal form, POS tag), as nlp_service._parse_words returns them.
+        record = self._record(word)
+        if record is None:
+            return None
+        return self.string(self.records[record]), self.string(self.records[record + 3])
+
+    def paradigm(self, word: str) -> Optional[Paradigm]:
+        word_id = self.word_id(word)
+        if word_id is None:
+            return None
+
+        data = self.data
+        offset = self.records[word_id * RECORD_FIELDS + 4]
+        lemma, pos, forms, cell_count = data[offset:offset + 4]
+        offset += 4
+
+        cells = []
+        for _ in range(cell_count):
+            section, row, column, index_count = data[offset:offset + 4]
+            offset += 4
+            cells.append((
+                self._label(section), self._label(row), self._label(column),
+                tuple(data[offset:offset + index_count]),
+            ))
+            offset += index_count
+
+        return Paradigm(
+            self.string(lemma),
+            self._label(pos),
+            tuple(sys.intern(form) for form in self.string(forms).split('\n')),
+            tuple(cells),
+        )
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            'words': self.word_count,
+            'bytes': len(self._buffer),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+def load_table(path: Path, fingerprint: int) -> Optional[HotWords]:
+    # The table is built offline (python -m services.hot_words); without a
+    # current one every lookup simply goes to pymorphy3.
+    if not path.exists():
+        logger.info(f'Hot words table {path} not found, build it with python -m services.hot_words')
+        return None
+    table = index_file.load_current(
+        path, 'hot words table', HotWords.load, lambda table: table.fingerprint == fingerprint
+    )
+    if table is not None:
+        logger.info(f'Loaded {len(table)} hot words from {path}')
+    return table
+
+
+def top_words(count: int) -> List[str]:
+    from services.spell_check_service import get_spell
+
+    frequency = get_spell().word_frequency.dictionary
+    return sorted(frequency, key=lambda word: (-frequency[word], word))[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build the hot words table from the frequency list')
+    parser.add_argument('--top', type=int, default=HOT_WORDS_TOP_N, help='number of most frequent words')
+    parser.add_argument('--output', default=HOT_WORDS_PATH)
+    args = parser.parse_args()
+
+    from services import nlp_service
+
+    started = time.perf_counter()
+    words = top_words(args.top)
+    data = nlp_service.build_hot_words(words)
+    index_file.write_atomic(Path(args.output), data)
+    print(
+        f'Wrote {len(words)} words ({len(data) / 1024:.0f} KiB) to {args.output} '
+        f'in {time.perf_counter() - started:.1f} s'
+    )
+
+
+if __name__ == '__main__':
+    main()
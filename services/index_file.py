@@ -0,0 +1,67 @@
+import os
+from pathlib import Path
+from typing import Callable, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar('T')
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    # Other processes may have the file mapped or be loading it: the data is
+    # written and synced under a per-process name, then renamed over the old
+    # file in one step, so a reader sees either the old file or the new one.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'{path.suffix}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def load_current(
+        path: Path,
+        name: str,
+        load: Callable[[Path], T],
+        is_current: Callable[[T], bool],
+) -> Optional[T]:
+    if not path.exists():
+        return None
+    try:
+        loaded = load(path)
+    except Exception as e:
+        logger.warning(f'Failed to load {name} {path}: {e}')
+        return None
+    if not is_current(loaded):
+        logger.info(f'{name.capitalize()} {path} is stale')
+        return None
+    return loaded
+
+
+def load_or_build(
+        path: Path,
+        name: str,
+        load: Callable[[Path], T],
+        is_current: Callable[[T], bool],
+        build: Callable[[], bytes],
+        from_bytes: Callable[[bytes], T],
+) -> T:
+    # A missing, unreadable or stale file is rebuilt and replaced; if it
+    # cannot be written, the freshly built data is served from memory.
+    loaded = load_current(path, name, load, is_current)
+    if loaded is not None:
+        return loaded
+
+    logger.info(f'Building {name} {path}...')
+    data = build()
+    try:
+        write_atomic(path, data)
+        return load(path)
+    except OSError as e:
+        logger.warning(f'Failed to persist {name} to {path}: {e}')
+        return from_bytes(data)
@@ -0,0 +1,136 @@
+import asyncio
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import (
+    INLINE_DEBOUNCE_SECONDS,
+    INLINE_MAX_RESULTS,
+    MAX_MESSAGE_LENGTH,
+    PREFIX_INDEX_PATH,
+    TELEGRAM_MESSAGE_LIMIT,
+)
+from services.cache import LatestOnly, LRUCache
+from services.metrics import timed
+from services.nlp_service import (
+    analyze_word,
+    get_morph,
+    get_paradigm,
+    hot_words_fingerprint,
+    normalize_word,
+)
+from services.prefix_index import PrefixIndex, load_or_build
+from services.render import render_analysis, render_inline_description
+from services.spell_check_service import get_suggestion_index
+from services.suggestion_index import source_fingerprint
+
+# A word being typed: Cyrillic letters, possibly hyphenated ("кто-", "кто-то").
+QUERY_RE = re.compile(r'[а-яё]+(?:-[а-яё]*)*')
+COMPLETION_CACHE_ENTRIES = 4096
+ANSWER_CACHE_ENTRIES = 4096
+
+_prefix_index: Optional[PrefixIndex] = None
+_prefix_index_lock = threading.Lock()
+
+completion_cache = LRUCache(COMPLETION_CACHE_ENTRIES)
+answer_cache = LRUCache(ANSWER_CACHE_ENTRIES)
+# Keyed by user: every keystroke is a new inline query, and only the answer
+# to the latest one is still visible to the user.
+latest_queries = LatestOnly(INLINE_DEBOUNCE_SECONDS)
+
+
+def lemma_weights() -> Dict[str, int]:
+    # Lemmas of the spelling dictionary's words, weighted by the summed
+    # frequency of all their forms.
+    morph = get_morph()
+    index = get_suggestion_index()
+    weights: Dict[str, int] = {}
+    for i in range(index.word_count):
+        lemma = morph.parse(index.word(i))[0].normal_form
+        weights[lemma] = weights.get(lemma, 0) + index.frequencies[i]
+    return weights
+
+
+def get_prefix_index() -> PrefixIndex:
+    # Built once (a few seconds of pymorphy3 parsing) and then mapped from
+    # disk like the spelling index.
+    global _prefix_index
+    if _prefix_index is None:
+        with _prefix_index_lock:
+            if _prefix_index is None:
+                _prefix_index = load_or_build(
+                    Path(PREFIX_INDEX_PATH),
+                    source_fingerprint(hot_words_fingerprint(), get_suggestion_index().fingerprint),
+                    lemma_weights,
+                )
+    return _prefix_index
+
+
+def warm_up() -> None:
+    get_prefix_index().complete('а', 1)
+
+
+def normalize_query(text: str) -> Optional[str]:
+    query = normalize_word(text)
+    if len(query) > MAX_MESSAGE_LENGTH or not QUERY_RE.fullmatch(query):
+        return None
+    return query
+
+
+def complete(prefix: str, limit: int = INLINE_MAX_RESULTS) -> List[str]:
+    key = (prefix, limit)
+    completions = completion_cache.get(key)
+    if completions is None:
+        completions = get_prefix_index().complete(prefix, limit)
+        completion_cache.set(key, completions)
+    return completions
+
+
+def candidates(query: str, limit: int = INLINE_MAX_RESULTS) -> List[str]:
+    # The typed word itself when it is already a dictionary word, then the
+    # most frequent lemmas it is a prefix of.
+    words = [query] if get_morph().word_is_known(query) else []
+    for lemma in complete(query, limit):
+        if lemma not in words:
+            words.append(lemma)
+    return words[:limit]
+
+
+async def _build_answer(word: str) -> Dict[str, str]:
+    # The answer depends only on the word, so it is formatted once: the
+    # paradigm table is by far the most expensive part of a reply.
+    analysis = await analyze_word(word)
+    paradigm = await get_paradigm(word)
+    answer = {
+        'word': word,
+        'description': render_inline_description(analysis),
+        'text': render_analysis(analysis, paradigm)[:TELEGRAM_MESSAGE_LIMIT],
+    }
+    answer_cache.set(word, answer)
+    return answer
+
+
+@timed('inline.answers')
+async def inline_answers(query: str) -> List[Dict[str, str]]:
+    # Cached answers are returned without suspending; only the missing ones
+    # (rare words the hot words table does not have) run concurrently.
+    words = candidates(query)
+    answers = [answer_cache.get(word) for word in words]
+    missing = [word for word, answer in zip(words, answers) if answer is None]
+    if missing:
+        computed = dict(zip(missing, await asyncio.gather(*(_build_answer(word) for word in missing))))
+        answers = [computed.get(word, answer) for word, answer in zip(words, answers)]
+    return answers
+
+
+async def latest_inline_answers(user_id: int, query: str) -> Optional[List[Dict[str, str]]]:
+    # None when a newer query of the same user superseded this one.
+    return await latest_queries.run(user_id, lambda: inline_answers(query))
+
+
+def stats() -> Dict[str, int]:
+    return {
+        'lemmas': len(_prefix_index) if _prefix_index is not None else 0,
+        **latest_queries.stats(),
+    }
@@ -1,50 +1,259 @@
-from typing import Optional, List
+import asyncio
+import time
+from typing import Dict, Optional, List, Tuple
 
 from gigachat import GigaChat
+from gigachat.exceptions import AuthenticationError, ResponseError
 from loguru import logger
 
-from config import GIGACHAT_CREDENTIALS
+from config import (
+    GIGACHAT_AUTH_URL,
+    GIGACHAT_BASE_URL,
+    GIGACHAT_CREDENTIALS,
+    LLM_ATTEMPT_TIMEOUT_SECONDS,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SECONDS,
+    LLM_HEDGE_PERCENTILE,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY_SECONDS,
+    LLM_RETRY_MAX_DELAY_SECONDS,
+    REQUEST_TIMEOUT_SECONDS,
+)
+from services.cache import SingleFlight
+from services.examples_cache import examples_cache
+from services.metrics import timed
+from services.nlp_service import get_morphology
+from services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyWindow,
+    backoff_delay,
+    hedged,
+)
 
+TOKEN_REFRESH_MARGIN_SECONDS = 60
+
+
+def is_retryable(error: BaseException) -> bool:
+    # Timeouts and transport errors are worth another attempt, as are
+    # throttling and server errors; other API errors (bad request, auth)
+    # would fail the same way again.
+    if isinstance(error, AuthenticationError):
+        return False
+    if isinstance(error, ResponseError):
+        status = error.args[1] if len(error.args) > 1 else 0
+        return status == 429 or status >= 500
+    return True
+
+
+class GigaChatToken:
+    # The SDK (pinned in requirements.txt) only fetches a token lazily, inside
+    # each call, so concurrent first calls each run their own OAuth exchange
+    # and an expiring token is only replaced after a request fails. It has no
+    # public way to refresh ahead of time; this is the one place that reaches
+    # into its internals for that. If they are missing, attach() returns None
+    # and the client falls back to the SDK's own per-call token handling.
+    def __init__(self, giga: GigaChat) -> None:
+        self._giga = giga
+
+    @classmethod
+    def attach(cls, giga: GigaChat) -> Optional['GigaChatToken']:
+        if not hasattr(giga, '_access_token') or not callable(getattr(giga, '_aupdate_token', None)):
+            logger.warning('GigaChat SDK has no token internals, leaving token refresh to the SDK')
+            return None
+        return cls(giga)
+
+    def is_fresh(self) -> bool:
+        token = getattr(self._giga, '_access_token', None)
+        expires_at = getattr(token, 'expires_at', None)
+        if token is None:
+            return False
+        return not expires_at or expires_at / 1000 - time.time() > TOKEN_REFRESH_MARGIN_SECONDS
+
+    async def refresh(self) -> None:
+        await self._giga._aupdate_token()
+
+
+class GigaChatClient:
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY) -> None:
+        self.max_concurrency = max_concurrency
+        self._giga: Optional[GigaChat] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._token: Optional[GigaChatToken] = None
+        self._token_lock = asyncio.Lock()
+        self._flight = SingleFlight()
+        self.breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS)
+        self.latency = LatencyWindow()
+
+        self.upstream_calls = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.hedges = 0
+
+    def start(self) -> None:
+        if self._giga is not None or not GIGACHAT_CREDENTIALS:
+            return
+
+        # One long-lived client keeps its httpx connection pool and OAuth token
+        # between calls instead of repeating the TLS handshake and token exchange.
+        self._giga = GigaChat(
+            credentials=GIGACHAT_CREDENTIALS,
+            verify_ssl_certs=False,
+            scope='GIGACHAT_API_PERS',
+            timeout=LLM_ATTEMPT_TIMEOUT_SECONDS,
+            **({'base_url': GIGACHAT_BASE_URL} if GIGACHAT_BASE_URL else {}),
+            **({'auth_url': GIGACHAT_AUTH_URL} if GIGACHAT_AUTH_URL else {}),
+        )
+        self._token = GigaChatToken.attach(self._giga)
+        logger.info('GigaChat client started')
+
+    async def close(self) -> None:
+        self._flight.cancel_all()
+
+        if self._giga is not None:
+            await self._giga.aclose()
+            self._giga = None
+            self._token = None
+            logger.info('GigaChat client closed')
+
+    async def _ensure_token(self) -> None:
+        # Concurrent callers share a single OAuth exchange and reuse the token
+        # until shortly before it expires.
+        if self._token is None or self._token.is_fresh():
+            return
+        async with self._token_lock:
+            if not self._token.is_fresh():
+                await self._token.refresh()
+
+    @timed('gigachat.complete')
+    async def _complete(self, prompt: str) -> str:
+        async with self._semaphore:
+            await self._ensure_token()
+            self.upstream_calls += 1
+            response = await self._giga.achat(prompt)
+            return response.choices[0].message.content
+
+    def _count_hedge(self) -> None:
+        self.hedges += 1
+
+    async def _attempt(self, prompt: str) -> str:
+        # Hedge only while there is spare concurrency: under load a second
+        # request would just queue behind the semaphore.
+        delay = self.latency.percentile(LLM_HEDGE_PERCENTILE) if LLM_HEDGE_PERCENTILE else None
+        if delay is None or self._semaphore.locked():
+            return await self._complete(prompt)
+        return await hedged(lambda: self._complete(prompt), delay, self._count_hedge)
+
+    async def _resilient_complete(self, prompt: str) -> str:
+        # Every attempt has its own timeout and all of them share the
+        # REQUEST_TIMEOUT_SECONDS deadline, so a degraded upstream cannot hold
+        # a handler longer than that. Retries back off with jitter and stop as
+        # soon as the breaker opens.
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + REQUEST_TIMEOUT_SECONDS
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError('GigaChat circuit breaker is open')
+
+            started = loop.time()
+            timeout = min(LLM_ATTEMPT_TIMEOUT_SECONDS, deadline - started)
+            try:
+                content = await asyncio.wait_for(self._attempt(prompt), timeout)
+            except asyncio.CancelledError:
+                self.breaker.record_cancelled()
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                if timed_out:
+                    self.timeouts += 1
+
+                delay = backoff_delay(attempt, LLM_RETRY_BASE_DELAY_SECONDS, LLM_RETRY_MAX_DELAY_SECONDS)
+                if attempt == LLM_MAX_RETRIES or not is_retryable(e) or loop.time() + delay >= deadline:
+                    if timed_out:
+                        raise asyncio.TimeoutError(f'GigaChat did not answer in {timeout:.1f} s') from e
+                    raise
+                logger.warning(f'GigaChat attempt {attempt + 1} failed ({e!r}), retrying')
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self.latency.observe(loop.time() - started)
+            return content
+
+    async def complete(self, key: Tuple[str, int], prompt: str) -> str:
+        if self._giga is None:
+            self.start()
+
+        return await self._flight.run(key, lambda: self._resilient_complete(prompt))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'upstream_calls': self.upstream_calls,
+            'coalesced_calls': self._flight.followers,
+            'inflight': len(self._flight),
+            'timeouts': self.timeouts,
+            'retries': self.retries,
+            'hedges': self.hedges,
+            **self.breaker.stats(),
+        }
+
+
+llm_client = GigaChatClient()
+examples_flight = SingleFlight()
+
+
+async def examples_key(word: str) -> str:
+    normalized = word.strip().lower()
+    if ' ' in normalized:
+        return normalized
+    return (await get_morphology(normalized))['normal_form']
+
+
+async def _fetch_examples(word: str, lemma: str, count: int) -> Optional[List[str]]:
+    # The cache is keyed by lemma, so the prompt is built from the lemma too:
+    # every form of a word shares one entry, and it fits all of them.
+    cached = await examples_cache.get(lemma, count)
+    if cached is not None:
+        logger.info(f"Serving cached examples for word '{word}' (lemma '{lemma}')")
+        return cached
 
-async def generate_examples(word: str, count: int = 3) -> Optional[List[str]]:
     if not GIGACHAT_CREDENTIALS:
         logger.warning("GIGACHAT_CREDENTIALS not set")
         return None
 
     try:
-        async with GigaChat(credentials=GIGACHAT_CREDENTIALS, verify_ssl_certs=False,
-                            scope="GIGACHAT_API_PERS") as giga:
+        prompt = (
+            f'Придумай {count} предложения со словом "{lemma}" (в любой форме). '
+            'Каждое предложение должно быть с новой строки и начинаться с цифры. '
+            'Не пиши никакого вводного текста, только сами предложения.'
+        )
 
-            prompt = (
-                f'Придумай {count} предложения со словом "{word}". '
-                'Каждое предложение должно быть с новой строки и начинаться с цифры. '
-                'Не пиши никакого вводного текста, только сами предложения.'
-            )
+        content = await llm_client.complete((lemma, count), prompt)
 
-            response = await giga.achat(prompt)
+        examples = [line.strip() for line in content.split('\n') if line.strip()]
 
-            content = response.choices[0].message.content
+        logger.info(f"GigaChat generated {len(examples)} examples for lemma '{lemma}'")
+        await examples_cache.put(lemma, count, examples)
+        return examples
 
-            examples = [line.strip() for line in content.split('\n') if line.strip()]
-
-            logger.info(f"GigaChat generated {len(examples)} examples for word '{word}'")
-            return examples
+    except CircuitOpenError:
+        logger.warning(f"GigaChat unavailable, falling back to cached examples for '{lemma}'")
+        return await examples_cache.fallback(lemma, count)
 
     except Exception as e:
         logger.error(f"GigaChat API error: {e}")
-        return None
+        return await examples_cache.fallback(lemma, count)
 
 
-async def format_examples(word: str, examples: list) -> str:
-    if not examples:
-        return f'❌ Не удалось сгенерировать примеры для слова "{word}" (возможно, проблема с токеном или API)'
-
-    result = f'📝 <b>Примеры использования слова "{word}":</b>\n\n'
-
-    for i, example in enumerate(examples[:5]):
-        if example[0].isdigit():
-            result += f'{example}\n'
-        else:
-            result += f'{i + 1}. {example}\n'
-
-    return result
+@timed('examples.generate')
+async def generate_examples(word: str, count: int = 3) -> Optional[List[str]]:
+    lemma = await examples_key(word)
+    # The cache lookup, upstream call and cache update run once per
+    # (lemma, count) no matter how many users ask at the same time.
+    return await examples_flight.run((lemma, count), lambda: _fetch_examples(word, lemma, count))
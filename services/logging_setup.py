@@ -0,0 +1,191 @@
+import atexit
+import copy
+import json
+import queue
+import sys
+import threading
+import traceback
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from config import (
+    LOG_COMPRESSION,
+    LOG_FILE,
+    LOG_FORMAT,
+    LOG_LEVEL,
+    LOG_QUEUE_SIZE,
+    LOG_RETENTION,
+    LOG_ROTATION,
+    LOG_SAMPLING,
+)
+
+Formatter = Callable[[Dict[str, Any]], str]
+
+
+def parse_sampling(spec: str) -> Dict[str, int]:
+    # "INFO=10,DEBUG=100": keep one line in N per call site for that level.
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        level, _, every = item.partition('=')
+        rates[level.strip().upper()] = max(int(every), 1)
+    return rates
+
+
+class Sampler:
+    # Counting is per call site, so the first occurrence of every line is
+    # always written and only lines that repeat are thinned out. Warnings and
+    # errors are never sampled unless configured explicitly.
+    def __init__(self, rates: Dict[str, int]) -> None:
+        self.rates = rates
+        self._seen: Dict[Tuple[str, str, int], int] = {}
+        self.dropped = 0
+
+    def __call__(self, record: Dict[str, Any]) -> bool:
+        every = self.rates.get(record['level'].name)
+        if every is None or every == 1:
+            return True
+
+        key = (record['name'], record['function'], record['line'])
+        seen = self._seen.get(key, 0)
+        self._seen[key] = seen + 1
+        if seen % every:
+            self.dropped += 1
+            return False
+        return True
+
+
+def _exception_text(record: Dict[str, Any]) -> str:
+    if record['exception'] is None:
+        return ''
+    kind, value, tb = record['exception']
+    return ''.join(traceback.format_exception(kind, value, tb))
+
+
+def text_format(record: Dict[str, Any], with_time: bool = True) -> str:
+    prefix = f"{record['time'].isoformat()} | " if with_time else ''
+    return (
+        f"{prefix}{record['level'].name: <8} | {record['name']}:{record['function']} "
+        f"- {record['message']}\n{_exception_text(record)}"
+    )
+
+
+def json_format(record: Dict[str, Any]) -> str:
+    payload = {
+        'time': record['time'].isoformat(),
+        'level': record['level'].name,
+        'logger': record['name'],
+        'function': record['function'],
+        'line': record['line'],
+        'message': record['message'],
+    }
+    if record['extra']:
+        payload['extra'] = record['extra']
+    if record['exception'] is not None:
+        payload['exception'] = _exception_text(record)
+    return json.dumps(payload, ensure_ascii=False, default=str) + '\n'
+
+
+class LogPipeline:
+    # The event loop only pays for building the loguru record and a
+    # non-blocking queue put. A writer thread formats records and writes them
+    # to stdout and to the log file; the file goes through a separate loguru
+    # instance so rotation, retention and compression stay loguru's. When the
+    # writer falls behind and the queue is full, records are dropped and
+    # counted instead of blocking handlers.
+    def __init__(self, max_queue: int = LOG_QUEUE_SIZE) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._file_logger = None
+        self._targets: List[Tuple[Formatter, Callable[[str], None]]] = []
+        self.dropped = 0
+
+    def sink(self, message: Any) -> None:
+        try:
+            self._queue.put_nowait(message.record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_stdout(self, text: str) -> None:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def _write_file(self, text: str) -> None:
+        self._file_logger.opt(raw=True).info(text)
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            for formatter, write in self._targets:
+                try:
+                    write(formatter(record))
+                except Exception as e:
+                    sys.stderr.write(f'Log pipeline write failed: {e}\n')
+
+    def start(self, use_json: bool, log_file: str = LOG_FILE) -> None:
+        self._targets = [(
+            json_format if use_json else (lambda record: text_format(record, with_time=False)),
+            self._write_stdout,
+        )]
+
+        if log_file:
+            # deepcopy after logger.remove() gives an independent logger with
+            # no handlers, so the main logger's sink is not re-entered.
+            self._file_logger = copy.deepcopy(logger)
+            self._file_logger.add(
+                log_file,
+                format='{message}',
+                rotation=LOG_ROTATION,
+                retention=LOG_RETENTION,
+                compression=LOG_COMPRESSION or None,
+            )
+            self._targets.append((json_format if use_json else text_format, self._write_file))
+
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._file_logger is not None:
+            self._file_logger.remove()
+            self._file_logger = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'queue_depth': self._queue.qsize(),
+            'dropped': self.dropped,
+            'sampled_out': sampler.dropped,
+        }
+
+
+sampler = Sampler(parse_sampling(LOG_SAMPLING))
+log_pipeline = LogPipeline()
+
+
+def worker_log_file(index: int, log_file: str = LOG_FILE) -> str:
+    # Worker processes cannot share one file: loguru rotates per process.
+    if not log_file:
+        return ''
+    path = Path(log_file)
+    return str(path.with_name(f'{path.stem}.worker-{index}{path.suffix}'))
+
+
+def setup_logging(log_file: str = LOG_FILE) -> None:
+    logger.remove()
+    log_pipeline.start(use_json=LOG_FORMAT == 'json', log_file=log_file)
+    logger.add(
+        log_pipeline.sink,
+        format='{message}',
+        level=LOG_LEVEL,
+        filter=sampler if sampler.rates else None,
+        catch=False,
+    )
@@ -0,0 +1,286 @@
+import functools
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from loguru import logger
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'bot'
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: Labels, extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric(ABC):
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> None:
+        self.name = f'{PREFIX}_{name}'
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        pass
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f'{self.name}{_format_labels(self.labelnames, labels)} {value}'
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Tuple[str, ...] = (),
+            buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (last slot is +Inf) and sum.
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def count(self, *labels: str) -> int:
+        return sum(self._counts.get(labels, ()))
+
+    def total(self, *labels: str) -> float:
+        return self._sums.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                lines.append(
+                    f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}'
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {self._sums[labels]}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, Any]], Optional[str]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames))
+
+    def register_stats(
+            self,
+            prefix: str,
+            collect: Callable[[], Dict[str, Any]],
+            label: Optional[str] = None,
+    ) -> None:
+        # Services already keep their own counters and expose them via
+        # stats(); those are read only when /metrics is scraped. With a label,
+        # collect() returns {label_value: stats_dict}.
+        self._collectors.append((prefix, collect, label))
+
+    def _render_stats(self) -> List[str]:
+        lines: List[str] = []
+        for prefix, collect, label in self._collectors:
+            try:
+                groups = collect() if label else {None: collect()}
+            except Exception as e:
+                logger.warning(f'Metrics collector {prefix} failed: {e}')
+                continue
+
+            samples: Dict[str, List[str]] = {}
+            for label_value, stats in groups.items():
+                label_text = f'{{{label}="{label_value}"}}' if label else ''
+                for key, value in stats.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        samples.setdefault(key, []).append(f'{label_text} {value}')
+
+            for key, values in samples.items():
+                name = f'{PREFIX}_{prefix}_{key}'
+                lines.append(f'# TYPE {name} gauge')
+                lines.extend(f'{name}{value}' for value in values)
+        return lines
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        lines.extend(self._render_stats())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+handler_latency = registry.histogram(
+    'handler_latency_seconds', 'Time spent in a command handler', ('command',)
+)
+handler_requests = registry.counter(
+    'handler_requests_total', 'Handled commands by outcome', ('command', 'status')
+)
+handler_inflight = registry.gauge(
+    'handler_inflight', 'Commands currently being handled', ('command',)
+)
+service_latency = registry.histogram(
+    'service_latency_seconds', 'Time spent in a service call', ('operation',)
+)
+service_errors = registry.counter(
+    'service_errors_total', 'Service calls that raised', ('operation',)
+)
+service_inflight = registry.gauge(
+    'service_inflight', 'Service calls currently running', ('operation',)
+)
+
+
+# Set by track_handler for the duration of a handler. Handlers catch their
+# own errors to reply to the user, so they flag the failure here instead of
+# raising it.
+_handler_failed: ContextVar[Optional[List[bool]]] = ContextVar('handler_failed', default=None)
+
+
+def mark_failed() -> None:
+    failed = _handler_failed.get()
+    if failed is not None:
+        failed[0] = True
+
+
+def _instrument(
+        latency: Histogram,
+        inflight: Gauge,
+        on_done: Callable[[str, bool], None],
+        label: str,
+        track_failures: bool = False,
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            inflight.inc(label)
+            started = time.perf_counter()
+            marked = [False]
+            token = _handler_failed.set(marked) if track_failures else None
+            failed = True
+            try:
+                result = await func(*args, **kwargs)
+                failed = marked[0]
+                return result
+            finally:
+                if token is not None:
+                    _handler_failed.reset(token)
+                latency.observe(time.perf_counter() - started, label)
+                inflight.dec(label)
+                on_done(label, failed)
+
+        return wrapper
+
+    return decorator
+
+
+def _count_handler(command: str, failed: bool) -> None:
+    handler_requests.inc(command, 'error' if failed else 'ok')
+
+
+def _count_service(operation: str, failed: bool) -> None:
+    if failed:
+        service_errors.inc(operation)
+
+
+def track_handler(command: str):
+    return _instrument(handler_latency, handler_inflight, _count_handler, command, track_failures=True)
+
+
+def timed(operation: str):
+    return _instrument(service_latency, service_inflight, _count_service, operation)
+
+
+class MetricsServer:
+    def __init__(self, host: str, port: int, metrics: Registry = registry) -> None:
+        self.host = host
+        self.port = port
+        self.registry = metrics
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.registry.render().encode(),
+            headers={'Content-Type': CONTENT_TYPE},
+        )
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f'Metrics available on http://{self.host}:{self.port}/metrics')
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -1,7 +1,24 @@
-from typing import Dict, List, Tuple
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import pymorphy3
 
+from config import (
+    HOT_WORDS_PATH,
+    MORPH_CACHE_MAX_BYTES,
+    MORPH_CACHE_MAX_ENTRIES,
+    PARADIGM_CACHE_MAX_ENTRIES,
+    TOKEN_CACHE_MAX_ENTRIES,
+)
+from services.cache import LRUCache
+from services.executor import run_light
+from services.hot_words import HotWords, load_table, serialize_table
+from services.metrics import timed
+from services.paradigm import Paradigm, build_paradigm
+from services.suggestion_index import source_fingerprint
+
 POS_MAP = {
     'NOUN': 'существительное',
     'ADJF': 'прилагательное',
@@ -55,15 +72,64 @@ GRAMMEME_MAP = {
     'loct': 'ПРЕДЛ',
 }
 
-morph = pymorphy3.MorphAnalyzer()
+_morph: Optional[pymorphy3.MorphAnalyzer] = None
+_morph_lock = threading.Lock()
+_hot_words: Optional[HotWords] = None
+_hot_words_loaded = False
+_hot_words_lock = threading.Lock()
+
+
+def get_morph() -> pymorphy3.MorphAnalyzer:
+    global _morph
+    if _morph is None:
+        with _morph_lock:
+            if _morph is None:
+                _morph = pymorphy3.MorphAnalyzer()
+    return _morph
+
+
+def hot_words_fingerprint() -> int:
+    # Entries depend on the analyzer, its dictionary and the label maps below.
+    meta = get_morph().dictionary.meta
+    return source_fingerprint(
+        pymorphy3.__version__, meta.get('source_revision'), meta.get('compiled_at'),
+        sorted(POS_MAP.items()), sorted(GRAMMEME_MAP.items()),
+    )
+
+
+def get_hot_words() -> Optional[HotWords]:
+    global _hot_words, _hot_words_loaded
+    if not _hot_words_loaded:
+        with _hot_words_lock:
+            if not _hot_words_loaded:
+                _hot_words = load_table(Path(HOT_WORDS_PATH), hot_words_fingerprint())
+                _hot_words_loaded = True
+    return _hot_words
+
+
+def warm_up() -> None:
+    build_paradigm(get_morph().parse('слово')[0])
+    get_hot_words()
 
 
 def map_grammemes(grammemes_set):
     return [GRAMMEME_MAP.get(g, g) for g in sorted(grammemes_set)]
 
 
-async def analyze_word(word: str) -> Dict[str, str]:
-    parsed = morph.parse(word)[0]
+TOKEN_RE = re.compile(r'[а-яёa-z]+(?:-[а-яёa-z]+)*', re.IGNORECASE)
+
+morphology_cache = LRUCache(MORPH_CACHE_MAX_ENTRIES, MORPH_CACHE_MAX_BYTES)
+token_cache = LRUCache(TOKEN_CACHE_MAX_ENTRIES)
+# Keyed by (lemma, POS): every form of a word shares one table.
+paradigm_cache = LRUCache(PARADIGM_CACHE_MAX_ENTRIES)
+
+
+def normalize_word(word: str) -> str:
+    return word.strip().lower()
+
+
+def _build_morphology(word: str) -> Tuple[Dict[str, Any], Paradigm]:
+    parsed = get_morph().parse(word)[0]
 
     grammemes = parsed.tag.grammemes if hasattr(parsed.tag, 'grammemes') else set()
     mapped_grammemes = map_grammemes(grammemes)
@@ -71,69 +137,123 @@ async def analyze_word(word: str) -> Dict[str, str]:
 
     pos = POS_MAP.get(str(parsed.tag.POS)) if hasattr(parsed.tag, 'POS') else 'СУЩ'
 
+    paradigm = build_paradigm(parsed)
+
     return {
-        'word': word,
         'normal_form': parsed.normal_form,
         'pos': pos,
         'grammemes': grammeme_str,
-    }
+        'paradigm_key': (paradigm.lemma, paradigm.pos),
+    }, paradigm
 
 
-async def get_word_variations(word: str) -> Dict[str, List[str]]:
-    parsed = morph.parse(word)[0]
-    normal_form = parsed.normal_form
+def _build_paradigm(word: str) -> Paradigm:
+    return build_paradigm(get_morph().parse(word)[0])
 
-    variations = {
-        'nominative': [],
-        'genitive': [],
-        'dative': [],
-        'accusative': [],
-        'instrumental': [],
-        'prepositional': [],
-    }
 
-    case_mapping = {
-        'nomn': 'nominative',
-        'gent': 'genitive',
-        'datv': 'dative',
-        'accs': 'accusative',
-        'ablt': 'instrumental',
-        'loct': 'prepositional',
+def build_hot_words(words: Iterable[str]) -> bytes:
+    entries = {}
+    for word in words:
+        key = normalize_word(word)
+        entries[key] = _build_morphology(key)
+    return serialize_table(entries, hot_words_fingerprint())
+
+
+@timed('morph.word')
+async def get_morphology(word: str) -> Dict[str, Any]:
+    key = normalize_word(word)
+    entry = morphology_cache.get(key)
+    if entry is None:
+        hot_words = get_hot_words()
+        entry = hot_words.morphology(key) if hot_words is not None else None
+        if entry is None:
+            entry, paradigm = await run_light(_build_morphology, key)
+            if entry['paradigm_key'] not in paradigm_cache:
+                paradigm_cache.set(entry['paradigm_key'], paradigm)
+        morphology_cache.set(key, entry)
+    return entry
+
+
+async def get_paradigm(word: str) -> Paradigm:
+    entry = await get_morphology(word)
+    paradigm = paradigm_cache.get(entry['paradigm_key'])
+    if paradigm is None:
+        key = normalize_word(word)
+        hot_words = get_hot_words()
+        paradigm = hot_words.paradigm(key) if hot_words is not None else None
+        if paradigm is None:
+            paradigm = await run_light(_build_paradigm, key)
+        paradigm_cache.set(entry['paradigm_key'], paradigm)
+    return paradigm
+
+
+async def analyze_word(word: str) -> Dict[str, str]:
+    entry = await get_morphology(word)
+
+    return {
+        'word': word,
+        'normal_form': entry['normal_form'],
+        'pos': entry['pos'],
+        'grammemes': entry['grammemes'],
     }
 
-    base_parsed = morph.parse(normal_form)[0]
-    for case_short, case_long in case_mapping.items():
-        try:
-            inflected = base_parsed.inflect({case_short})
-            if inflected:
-                variations[case_long].append(inflected.word)
-        except Exception:
-            pass
 
-    return variations
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text)
 
 
-async def lemmatize_text(text: str) -> List[Tuple[str, str]]:
-    words = text.split()
-    lemmatized = []
+def _parse_words(words: List[str]) -> Dict[str, Tuple[str, str]]:
+    morph = get_morph()
+    parsed_words = {}
 
     for word in words:
         parsed = morph.parse(word)[0]
-        lemmatized.append((word, parsed.normal_form))
+        parsed_words[word] = (parsed.normal_form, str(parsed.tag.POS))
+
+    return parsed_words
 
-    return lemmatized
+
+@timed('morph.parse')
+async def parse_tokens(tokens: List[str]) -> Dict[str, Tuple[str, str]]:
+    # Each distinct lower-cased token is parsed once per text, and only
+    # tokens missing from both the cache and the hot words table reach the
+    # executor.
+    parsed_words: Dict[str, Tuple[str, str]] = {}
+    missing = []
+    hot_words = get_hot_words()
+
+    for word in dict.fromkeys(token.lower() for token in tokens):
+        entry = token_cache.get(word)
+        if entry is None and hot_words is not None:
+            entry = hot_words.token(word)
+            if entry is not None:
+                token_cache.set(word, entry)
+        if entry is None:
+            missing.append(word)
+        else:
+            parsed_words[word] = entry
+
+    if missing:
+        fresh = await run_light(_parse_words, missing)
+        for word, entry in fresh.items():
+            token_cache.set(word, entry)
+        parsed_words.update(fresh)
+
+    return parsed_words
+
+
+async def lemmatize_text(text: str) -> List[Tuple[str, str]]:
+    tokens = tokenize(text)
+    parsed_words = await parse_tokens(tokens)
+    return [(token, parsed_words[token.lower()][0]) for token in tokens]
 
 
 async def extract_pos(text: str) -> Dict[str, List[str]]:
-    words = text.split()
+    tokens = tokenize(text)
+    parsed_words = await parse_tokens(tokens)
     pos_dict: Dict[str, List[str]] = {}
 
-    for word in words:
-        parsed = morph.parse(word)[0]
-        pos = str(parsed.tag.POS)
-
-        if pos not in pos_dict:
-            pos_dict[pos] = []
-        pos_dict[pos].append(word)
+    for token in tokens:
+        pos_dict.setdefault(parsed_words[token.lower()][1], []).append(token)
 
     return pos_dict
@@ -0,0 +1,212 @@
+import sys
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+CASES = ('nomn', 'gent', 'datv', 'accs', 'ablt', 'loct')
+NUMBERS = ('sing', 'plur')
+GENDER_COLUMNS = ('masc', 'femn', 'neut', 'plur')
+PERSONS = ('1per', '2per', '3per')
+
+CASE_LABELS = {
+    'nomn': 'Именительный',
+    'gent': 'Родительный',
+    'datv': 'Дательный',
+    'accs': 'Винительный',
+    'ablt': 'Творительный',
+    'loct': 'Предложный',
+}
+COLUMN_LABELS = {
+    'sing': 'ед.',
+    'plur': 'мн.',
+    'masc': 'м.',
+    'femn': 'ж.',
+    'neut': 'ср.',
+    'pres': 'наст.',
+    'past': 'прош.',
+    'futr': 'буд.',
+}
+PERSON_LABELS = {'1per': '1 л.', '2per': '2 л.', '3per': '3 л.'}
+PARTICIPLE_LABELS = {
+    'pres,actv': 'действительное, настоящее',
+    'past,actv': 'действительное, прошедшее',
+    'pres,pssv': 'страдательное, настоящее',
+    'past,pssv': 'страдательное, прошедшее',
+}
+
+DECLINABLE = {'NOUN', 'NPRO', 'NUMR', 'ADJF', 'PRTF'}
+BY_NUMBER = {'NOUN', 'NPRO'}
+
+Cell = Tuple[str, str, str, Tuple[int, ...]]
+
+
+class Paradigm(NamedTuple):
+    # Forms are stored once, in lexeme order; every cell of the table
+    # (section, row, column) points at them by index. Grammeme strings are
+    # interned, so cached paradigms share them.
+    lemma: str
+    pos: str
+    forms: Tuple[str, ...]
+    cells: Tuple[Cell, ...]
+
+    def get(self, section: str, row: str = '', column: str = '') -> List[str]:
+        for cell_section, cell_row, cell_column, indexes in self.cells:
+            if (cell_section, cell_row, cell_column) == (section, row, column):
+                return [self.forms[i] for i in indexes]
+        return []
+
+    def section(self, name: str) -> Dict[Tuple[str, str], List[str]]:
+        return {
+            (row, column): [self.forms[i] for i in indexes]
+            for section, row, column, indexes in self.cells
+            if section == name
+        }
+
+    def sections(self) -> List[str]:
+        return list(dict.fromkeys(section for section, _, _, _ in self.cells))
+
+
+def _cell_key(tag) -> Tuple[str, str, str]:
+    pos = tag.POS
+
+    if pos in DECLINABLE:
+        if pos == 'PRTF':
+            section = f'prtf {tag.tense},{tag.voice}'
+        elif pos == 'ADJF' and 'Supr' in tag:
+            section = 'supr'
+        else:
+            section = 'decl'
+        column = tag.number if pos in BY_NUMBER else (tag.gender or tag.number)
+        return section, tag.case or '', column or ''
+
+    if pos == 'ADJS':
+        return 'short', '', tag.gender or tag.number or ''
+    if pos == 'PRTS':
+        return f'prts {tag.tense},{tag.voice}', '', tag.gender or tag.number or ''
+    if pos == 'COMP':
+        return 'comp', '', ''
+    if pos == 'INFN':
+        return 'infn', '', ''
+    if pos == 'VERB':
+        if tag.mood == 'impr':
+            return 'impr', '', tag.number or ''
+        if tag.tense == 'past':
+            return 'past', '', tag.gender or tag.number or ''
+        return tag.tense or '', tag.person or '', tag.number or ''
+    if pos == 'GRND':
+        return 'grnd', '', tag.tense or ''
+    return 'other', '', ''
+
+
+def build_paradigm(parsed) -> Paradigm:
+    # One pass over the lexeme: each form lands in exactly one cell, variant
+    # spellings and anim/inan accusatives share a cell.
+    forms: Dict[str, int] = {}
+    cells: Dict[Tuple[str, str, str], List[int]] = {}
+
+    for form in parsed.lexeme:
+        index = forms.setdefault(sys.intern(form.word), len(forms))
+        key = tuple(sys.intern(str(part)) for part in _cell_key(form.tag))
+        indexes = cells.setdefault(key, [])
+        if index not in indexes:
+            indexes.append(index)
+
+    return Paradigm(
+        lemma=parsed.normal_form,
+        pos=str(parsed.tag.POS),
+        forms=tuple(forms),
+        cells=tuple(key + (tuple(indexes),) for key, indexes in cells.items()),
+    )
+
+
+def _join(forms: List[str]) -> str:
+    return '/'.join(forms) if forms else '—'
+
+
+def _declension_lines(paradigm: Paradigm, section: str, columns: Tuple[str, ...]) -> List[str]:
+    table = paradigm.section(section)
+    present = [column for column in columns if any(key[1] == column for key in table)]
+    if not present:
+        present = list(dict.fromkeys(column for _, column in table))
+
+    header = ' | '.join(COLUMN_LABELS.get(column, column) or '—' for column in present)
+    lines = [f'Падеж: {header}'] if len(present) > 1 else []
+    for case in CASES:
+        row = [_join(table.get((case, column), [])) for column in present]
+        if all(value == '—' for value in row):
+            # Forms that do not vary by the columns (e.g. "двух" for all genders).
+            row = [_join(table[(case, '')])] if (case, '') in table else []
+        if row:
+            lines.append(f'• {CASE_LABELS[case]}: {" | ".join(row)}')
+    return lines
+
+
+def _conjugation_lines(paradigm: Paradigm) -> List[str]:
+    lines = []
+    infinitive = paradigm.get('infn')
+    if infinitive:
+        lines.append(f'• Инфинитив: {_join(infinitive)}')
+
+    for tense, label in (('pres', 'Настоящее время'), ('futr', 'Будущее время')):
+        table = paradigm.section(tense)
+        if table:
+            lines.append(f'{label} (ед. | мн.):')
+            for person in PERSONS:
+                row = [_join(table.get((person, number), [])) for number in NUMBERS]
+                lines.append(f'• {PERSON_LABELS[person]}: {" | ".join(row)}')
+
+    past = paradigm.section('past')
+    if past:
+        row = [_join(past.get(('', column), [])) for column in GENDER_COLUMNS]
+        lines.append(f'Прошедшее время (м. | ж. | ср. | мн.): {" | ".join(row)}')
+
+    imperative = paradigm.section('impr')
+    if imperative:
+        row = [_join(imperative.get(('', number), [])) for number in NUMBERS]
+        lines.append(f'Повелительное наклонение: {", ".join(row)}')
+
+    gerunds = paradigm.section('grnd')
+    if gerunds:
+        row = [
+            f'{_join(forms)} ({COLUMN_LABELS.get(tense, tense)})'
+            for (_, tense), forms in gerunds.items()
+        ]
+        lines.append(f'Деепричастия: {", ".join(row)}')
+
+    participles = [
+        f'{_join(paradigm.get(section, "nomn", "masc"))} '
+        f'({PARTICIPLE_LABELS.get(section[5:], section[5:])})'
+        for section in paradigm.sections() if section.startswith('prtf ')
+    ]
+    if participles:
+        lines.append(f'Причастия: {", ".join(participles)}')
+
+    return lines
+
+
+def format_paradigm(paradigm: Optional[Paradigm]) -> str:
+    if paradigm is None or paradigm.sections() == ['other']:
+        return '📚 Неизменяемое слово'
+
+    lines = ['📚 Формы слова:']
+
+    if paradigm.pos in BY_NUMBER:
+        lines.extend(_declension_lines(paradigm, 'decl', NUMBERS))
+    elif 'decl' in paradigm.sections():
+        lines.extend(_declension_lines(paradigm, 'decl', GENDER_COLUMNS))
+
+    short = paradigm.section('short')
+    if short:
+        row = [_join(short.get(('', column), [])) for column in GENDER_COLUMNS]
+        lines.append(f'Краткая форма (м. | ж. | ср. | мн.): {" | ".join(row)}')
+
+    comparative = paradigm.get('comp')
+    if comparative:
+        lines.append(f'Сравнительная степень: {_join(comparative)}')
+
+    superlative = paradigm.get('supr', 'nomn', 'masc')
+    if superlative:
+        lines.append(f'Превосходная степень: {_join(superlative)}')
+
+    if paradigm.pos in ('INFN', 'VERB', 'GRND', 'PRTF', 'PRTS'):
+        lines.extend(_conjugation_lines(paradigm))
+
+    return '\n'.join(lines)
@@ -0,0 +1,99 @@
+import heapq
+import mmap
+import struct
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Union
+
+from services import index_file
+
+MAGIC = b'PREFIX01'
+HEADER = struct.Struct('<8sIII')
+
+
+def serialize_prefix_index(weights: Dict[str, int], fingerprint: int) -> bytes:
+    # Same layout idea as the suggestion index: sorted words in one UTF-8
+    # blob with an offsets array, plus a parallel array of weights.
+    words = sorted(weights)
+    encoded = [word.encode('utf-8') for word in words]
+    offsets = [0]
+    for word in encoded:
+        offsets.append(offsets[-1] + len(word))
+
+    return b''.join((
+        HEADER.pack(MAGIC, fingerprint, len(words), offsets[-1]),
+        struct.pack(f'<{len(offsets)}I', *offsets),
+        struct.pack(f'<{len(words)}I', *(min(weights[word], 0xFFFFFFFF) for word in words)),
+        *encoded,
+    ))
+
+
+class _Keys:
+    def __init__(self, index: 'PrefixIndex') -> None:
+        self.index = index
+
+    def __len__(self) -> int:
+        return self.index.word_count
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.index.word_bytes(i)
+
+
+class PrefixIndex:
+    # Autocomplete over dictionary lemmas. Words sharing a prefix are one
+    # contiguous run of the sorted blob, found with two binary searches;
+    # the run is then ranked by weight (corpus frequency of the lemma).
+    def __init__(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        magic, fingerprint, word_count, blob_len = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError('not a prefix index')
+
+        self.fingerprint = fingerprint
+        self.word_count = word_count
+        self._buffer = buffer
+
+        view = memoryview(buffer)
+        offset = HEADER.size
+        self.offsets = view[offset:offset + (word_count + 1) * 4].cast('I')
+        offset += (word_count + 1) * 4
+        self.weights = view[offset:offset + word_count * 4].cast('I')
+        offset += word_count * 4
+        self.blob = view[offset:offset + blob_len]
+
+    @classmethod
+    def load(cls, path: Path) -> 'PrefixIndex':
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return self.word_count
+
+    def word_bytes(self, i: int) -> bytes:
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+    def word(self, i: int) -> str:
+        return self.word_bytes(i).decode('utf-8')
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        # 0xFF never occurs in UTF-8, so every word starting with the prefix
+        # sorts before prefix + b'\xff'.
+        encoded = prefix.encode('utf-8')
+        keys = _Keys(self)
+        return bisect_left(keys, encoded), bisect_left(keys, encoded + b'\xff')
+
+    def complete(self, prefix: str, limit: int) -> List[str]:
+        start, end = self.prefix_range(prefix)
+        # nlargest keeps the alphabetical order among equal weights.
+        best = heapq.nlargest(limit, range(start, end), key=self.weights.__getitem__)
+        return [self.word(i) for i in best]
+
+
+def load_or_build(path: Path, fingerprint: int, weights: Callable[[], Dict[str, int]]) -> PrefixIndex:
+    return index_file.load_or_build(
+        path,
+        'prefix index',
+        PrefixIndex.load,
+        lambda index: index.fingerprint == fingerprint,
+        lambda: serialize_prefix_index(weights(), fingerprint),
+        PrefixIndex,
+    )
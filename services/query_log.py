@@ -0,0 +1,156 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import insert
+
+from config import QUERY_LOG_BATCH_SIZE, QUERY_LOG_FLUSH_INTERVAL, QUERY_LOG_MAX_PENDING
+from models.database import UserQuery, get_async_session
+from services.metrics import timed
+
+
+class QueryLogBuffer:
+    def __init__(
+            self,
+            batch_size: int = QUERY_LOG_BATCH_SIZE,
+            flush_interval: float = QUERY_LOG_FLUSH_INTERVAL,
+            max_pending: int = QUERY_LOG_MAX_PENDING,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.flushed_rows = 0
+        self.flush_count = 0
+        self.dropped_rows = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._total_flush_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    async def add(self, row: Dict[str, Any]) -> None:
+        row.setdefault('created_at', datetime.utcnow())
+        self._pending.append(row)
+        # Rows keep arriving while a slow flush holds the lock, so the bound
+        # is enforced on every add, not only when a failed batch is requeued.
+        self._trim()
+
+        # A full batch is written in the background so the handler that
+        # filled it does not wait for the database; only a buffer at
+        # max_pending makes callers wait.
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+        elif len(self._pending) >= self.batch_size and (
+                self._flush_task is None or self._flush_task.done()
+        ):
+            self._flush_task = asyncio.create_task(self._flush_in_background())
+
+    async def wait_for_flush(self) -> None:
+        # Rows already taken by a running flush cannot be discarded; callers
+        # that are about to delete wait until they are committed.
+        async with self._flush_lock:
+            pass
+
+    def discard_user(self, user_id: int) -> int:
+        before = len(self._pending)
+        self._pending = [row for row in self._pending if row['user_id'] != user_id]
+        return before - len(self._pending)
+
+    @timed('db.flush')
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, []
+            started = time.perf_counter()
+
+            async with get_async_session() as session:
+                try:
+                    await session.execute(insert(UserQuery), batch)
+                    await session.commit()
+                except Exception as e:
+                    await session.rollback()
+                    self._requeue(batch)
+                    logger.error(f'Failed to flush {len(batch)} queued queries: {e}')
+                    return 0
+
+            elapsed = time.perf_counter() - started
+            self.flush_count += 1
+            self.flushed_rows += len(batch)
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            self._total_flush_seconds += elapsed
+
+            logger.debug(f'Flushed {len(batch)} queued queries in {elapsed * 1000:.1f} ms')
+            return len(batch)
+
+    def _requeue(self, batch: List[Dict[str, Any]]) -> None:
+        self._pending = batch + self._pending
+        self._trim()
+
+    def _trim(self) -> None:
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            self._pending = self._pending[overflow:]
+            self.dropped_rows += overflow
+            logger.warning(f'Query log buffer full, dropped {overflow} oldest rows')
+
+    async def _flush_in_background(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f'Query log background flush error: {e}')
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f'Query log flush loop error: {e}')
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._flush_task is not None:
+            await self._flush_task
+            self._flush_task = None
+
+        await self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'queue_depth': self.queue_depth,
+            'flush_count': self.flush_count,
+            'flushed_rows': self.flushed_rows,
+            'dropped_rows': self.dropped_rows,
+            'last_flush_ms': self.last_flush_seconds * 1000,
+            'max_flush_ms': self.max_flush_seconds * 1000,
+            'avg_flush_ms': (
+                self._total_flush_seconds / self.flush_count * 1000 if self.flush_count else 0.0
+            ),
+        }
+
+
+query_log = QueryLogBuffer()
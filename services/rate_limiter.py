@@ -0,0 +1,181 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Deque, Dict
+
+from loguru import logger
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import (
+    MAX_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_WINDOW_SECONDS,
+)
+from models.database import RateLimitCounter, get_async_session
+
+UPSERT_DIALECTS = {
+    'sqlite': sqlite_insert,
+    'postgresql': postgresql_insert,
+}
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def hit(self, key: int, limit: int, window: float) -> bool:
+        ...
+
+
+# Sliding-window log per key: each key keeps at most `limit` timestamps and
+# keys are evicted in least-recently-used order once idle for a full window.
+class MemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS) -> None:
+        self.max_keys = max_keys
+        self._hits: 'OrderedDict[int, Deque[float]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+    async def hit(self, key: int, limit: int, window: float) -> bool:
+        now = time.monotonic()
+        self._evict(now, window, key)
+
+        hits = self._hits.get(key)
+        if hits is None or hits.maxlen != limit:
+            hits = deque(hits or (), maxlen=limit)
+            self._hits[key] = hits
+        self._hits.move_to_end(key)
+
+        if len(hits) == limit and now - hits[0] < window:
+            return False
+
+        hits.append(now)
+        return True
+
+    def _evict(self, now: float, window: float, key: int) -> None:
+        # Room for a new key is only made when `key` is not tracked yet;
+        # otherwise a full table would evict (and so reset) a key still hitting.
+        max_keys = self.max_keys if key in self._hits else self.max_keys - 1
+        while self._hits:
+            oldest_key, hits = next(iter(self._hits.items()))
+            idle = not hits or now - hits[-1] >= window
+            if not idle and len(self._hits) <= max_keys:
+                break
+            del self._hits[oldest_key]
+
+
+# Approximate sliding window over fixed-window counters stored in the shared
+# database, so several bot processes on one DATABASE_URL enforce a common limit.
+# The current window's counter is checked and incremented by one conditional
+# statement, so concurrent hits from other processes cannot all slip under
+# the limit; the previous window is closed and only read.
+class DatabaseRateLimitBackend(RateLimitBackend):
+    def __init__(self) -> None:
+        self.errors = 0
+
+    async def hit(self, key: int, limit: int, window: float) -> bool:
+        now = time.time()
+        window_size = int(window)
+        current = int(now // window_size) * window_size
+        previous = current - window_size
+        overlap = 1 - (now - current) / window_size
+
+        async with get_async_session() as session:
+            try:
+                previous_count = await session.scalar(
+                    select(RateLimitCounter.count).where(
+                        RateLimitCounter.user_id == key,
+                        RateLimitCounter.window_start == previous,
+                    )
+                )
+                # Hits the current window may still take.
+                allowed = limit - (previous_count or 0) * overlap
+                if allowed < 1 or not await self._increment(session, key, current, allowed):
+                    await session.rollback()
+                    return False
+
+                await session.execute(
+                    delete(RateLimitCounter).where(
+                        RateLimitCounter.user_id == key,
+                        RateLimitCounter.window_start < previous,
+                    )
+                )
+                await session.commit()
+                return True
+            except Exception as e:
+                # Fails open: a database outage must not lock every user out.
+                await session.rollback()
+                self.errors += 1
+                logger.error(f'Rate limit backend error for user {key}: {e}')
+                return True
+
+    async def _increment(self, session, key: int, window_start: int, allowed: float) -> bool:
+        # count + 1 only while count + 1 <= allowed; False when the limit is reached.
+        insert_factory = UPSERT_DIALECTS.get(session.bind.dialect.name)
+        if insert_factory is not None:
+            stmt = insert_factory(RateLimitCounter).values(
+                user_id=key, window_start=window_start, count=1
+            )
+            result = await session.execute(stmt.on_conflict_do_update(
+                index_elements=['user_id', 'window_start'],
+                set_={'count': RateLimitCounter.count + 1},
+                where=RateLimitCounter.count + 1 <= allowed,
+            ).returning(RateLimitCounter.count))
+            return result.first() is not None
+
+        result = await session.execute(
+            update(RateLimitCounter).where(
+                RateLimitCounter.user_id == key,
+                RateLimitCounter.window_start == window_start,
+                RateLimitCounter.count + 1 <= allowed,
+            ).values(count=RateLimitCounter.count + 1)
+        )
+        if result.rowcount:
+            return True
+        try:
+            async with session.begin_nested():
+                session.add(RateLimitCounter(user_id=key, window_start=window_start, count=1))
+            return True
+        except IntegrityError:
+            # The row exists, so the update above found it at the limit.
+            return False
+
+
+BACKENDS = {
+    'memory': MemoryRateLimitBackend,
+    'database': DatabaseRateLimitBackend,
+}
+
+
+class RateLimiter:
+    def __init__(
+            self,
+            backend: RateLimitBackend,
+            limit: int = MAX_REQUESTS_PER_MINUTE,
+            window: float = RATE_LIMIT_WINDOW_SECONDS,
+    ) -> None:
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+        self.allowed = 0
+        self.rejected = 0
+
+    async def allow(self, user_id: int) -> bool:
+        if await self.backend.hit(user_id, self.limit, self.window):
+            self.allowed += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'allowed': self.allowed,
+            'rejected': self.rejected,
+            'backend_errors': getattr(self.backend, 'errors', 0),
+        }
+
+
+rate_limiter = RateLimiter(BACKENDS[RATE_LIMIT_BACKEND]())
@@ -0,0 +1,359 @@
+from collections import Counter
+from html import escape
+from string import Formatter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import PARADIGM_CACHE_MAX_ENTRIES
+from services.cache import LRUCache
+from services.nlp_service import GRAMMEME_MAP, POS_MAP
+from services.paradigm import Paradigm, format_paradigm
+from services.stats_service import CorpusStats
+
+
+def escape_html(value: Any) -> str:
+    # Telegram's HTML mode only needs <, > and &. Most fields (numbers,
+    # Cyrillic words) contain none of them and are returned as they are.
+    text = value if type(value) is str else str(value)
+    if '&' in text or '<' in text or '>' in text:
+        return escape(text, quote=False)
+    return text
+
+
+class Template:
+    # Parsed and checked once into a plain str.format string, plus the names
+    # of the fields to escape, so rendering is a single format call. A reply
+    # built from many items renders each one into a shared list and joins
+    # it once. Fields of HTML templates are escaped; the template's own
+    # markup and fields marked {name!s} (markup already built from escaped
+    # parts) are not.
+    def __init__(self, source: str, html: bool = False) -> None:
+        self.source = source
+        self.html = html
+
+        fields: List[str] = []
+        escaped: List[str] = []
+        parts: List[str] = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            parts.append(literal.replace('{', '{{').replace('}', '}}'))
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion not in (None, 's'):
+                raise ValueError(f'Unsupported template field {{{field}}} in {source!r}')
+            if field not in fields:
+                fields.append(field)
+            if html and conversion is None and field not in escaped:
+                escaped.append(field)
+            parts.append(f'{{{field}}}')
+        self.fields = tuple(fields)
+        self._escaped = tuple(escaped)
+        self._format = ''.join(parts).format_map
+
+    def render(self, **values: Any) -> str:
+        for field in self._escaped:
+            values[field] = escape_html(values[field])
+        return self._format(values)
+
+    def render_into(self, out: List[str], **values: Any) -> None:
+        for field in self._escaped:
+            values[field] = escape_html(values[field])
+        out.append(self._format(values))
+
+    def __repr__(self) -> str:
+        return f'Template({self.source!r}, html={self.html})'
+
+
+ANALYSIS = Template(
+    '📖 Анализ слова: "{word}"\n\n'
+    '🔤 Нормальная форма: {normal_form}\n'
+    '📋 Часть речи: {pos}\n'
+    '📝 Морфологические признаки: {grammemes}\n\n'
+    '{paradigm}\n'
+)
+INLINE_DESCRIPTION = Template('{pos} · {normal_form} · {grammemes}')
+
+SPELL_CLEAN = '✅ Текст не содержит ошибок (или все слова есть в словаре)!'
+SPELL_HEADER = '❌ Найдены возможные ошибки:\n'
+SPELL_ERROR = Template('\n{number}. <b>{word}</b>', html=True)
+SPELL_ERROR_COUNT = Template(' (×{count})', html=True)
+SPELL_SUGGESTIONS = Template('\n   Варианты: <i>{suggestions!s}</i>', html=True)
+SPELL_MORE = Template('\n... и ещё {count} слов')
+SPELL_PROGRESS = Template('\n⏳ Проверено {percent}% текста…')
+SPELL_SUMMARY_CLEAN = Template('✅ Проверено {characters} символов: ошибок не найдено!', html=True)
+SPELL_FREQUENT = Template('<b>{word}</b> (×{count})', html=True)
+SPELL_SHOWN = 10
+SUGGESTIONS_SHOWN = 5
+
+EXAMPLES_FAILED = Template(
+    '❌ Не удалось сгенерировать примеры для слова "{word}" (возможно, проблема с токеном или API)',
+    html=True,
+)
+EXAMPLES_UNAVAILABLE = '⚠️ Генерация примеров недоступна (нет API ключа OpenAI)'
+EXAMPLES_HEADER = Template('📝 <b>Примеры использования слова "{word}":</b>\n\n', html=True)
+EXAMPLE = Template('{example}\n', html=True)
+NUMBERED_EXAMPLE = Template('{number}. {example}\n', html=True)
+EXAMPLES_SHOWN = 5
+
+HISTORY_EMPTY = '📭 История запросов пуста'
+HISTORY_HEADER = '📜 Ваша история запросов (последние 10):\n\n'
+HISTORY_ENTRY = Template('{number}. {command} — "{query}"\n   🕐 {timestamp}\n\n')
+HISTORY_PREVIEW = 40
+
+NO_WORDS = '❌ В тексте не найдено слов'
+LEMMAS_HEADER = Template('📝 Лемматизация: {words} слов, {unique} уникальных, {lemmas} лемм\n')
+LEMMA = Template('\n{word} → {lemma}')
+LEMMA_REPEATED = Template('\n{word} → {lemma} (×{count})')
+POS_HEADER = Template('📋 Части речи ({total} слов):\n')
+POS_ENTRY = Template('\n• {name} — {count}: ')
+
+STATS_HEADER = Template(
+    '📊 Статистика: {tokens} слов, {forms} словоформ, {lemmas} лемм\n'
+    'Отношение тип/токен: {type_token} (лемм на слово: {lemma_token})\n'
+)
+STATS_SOURCE = Template('Источник: {source}\n')
+STATS_SECTION = Template('\n{title}:')
+STATS_POS = Template('\n• {name} — {count} ({share}%)')
+STATS_SHARE = Template('{name} {share}%')
+STATS_GRAMMEMES = Template('\n• {category}: {shares!s}')
+STATS_CATEGORIES = {
+    'case': 'падеж',
+    'number': 'число',
+    'gender': 'род',
+    'animacy': 'одушевлённость',
+    'tense': 'время',
+    'aspect': 'вид',
+    'person': 'лицо',
+}
+# GRAMMEME_MAP labels only the nominal categories.
+STATS_GRAMMEME_LABELS = {
+    **GRAMMEME_MAP,
+    'gen2': 'РОД2',
+    'acc2': 'ВИН2',
+    'loc2': 'МЕСТН',
+    'voct': 'ЗВ',
+    'past': 'ПРОШ',
+    'pres': 'НАСТ',
+    'futr': 'БУД',
+    'perf': 'СОВ',
+    'impf': 'НЕСОВ',
+    '1per': '1Л',
+    '2per': '2Л',
+    '3per': '3Л',
+}
+STATS_POS_SHOWN = 8
+STATS_LEMMA = Template('{word} (×{count})')
+
+DOCUMENT_MODES = {'spell_check': 'Проверка орфографии', 'lemmatize': 'Лемматизация'}
+DOCUMENT_PROGRESS = Template('⏳ {mode}: {percent}%, {words} слов, {unique} уникальных', html=True)
+DOCUMENT_SPELL_SUMMARY = Template(
+    '📊 Проверено {characters} символов, {words} слов: {errors} неизвестных слов, {occurrences} вхождений.',
+    html=True,
+)
+DOCUMENT_LEMMA_SUMMARY = Template(
+    '📝 Лемматизировано {characters} символов: {words} слов, {unique} уникальных, {lemmas} лемм.',
+    html=True,
+)
+DOCUMENT_FREQUENT = Template('\nЧаще всего: {words!s}')
+DOCUMENT_ANNOTATED = '\nРазмеченный текст — в файле ниже.'
+DOCUMENT_FREQUENT_SHOWN = 5
+
+# The paradigm table is the largest part of an /analyze reply and depends
+# only on the lexeme, keyed like nlp_service.paradigm_cache.
+paradigm_text_cache = LRUCache(PARADIGM_CACHE_MAX_ENTRIES)
+
+
+def paradigm_text(paradigm: Optional[Paradigm]) -> str:
+    if paradigm is None:
+        return format_paradigm(None)
+    key = (paradigm.lemma, paradigm.pos)
+    text = paradigm_text_cache.get(key)
+    if text is None:
+        text = format_paradigm(paradigm)
+        paradigm_text_cache.set(key, text)
+    return text
+
+
+def render_analysis(analysis: Dict[str, Any], paradigm: Optional[Paradigm]) -> str:
+    return ANALYSIS.render(
+        word=analysis['word'],
+        normal_form=analysis['normal_form'],
+        pos=analysis['pos'],
+        grammemes=analysis['grammemes'],
+        paradigm=paradigm_text(paradigm),
+    )
+
+
+def render_inline_description(analysis: Dict[str, Any]) -> str:
+    return INLINE_DESCRIPTION.render(
+        pos=analysis['pos'] or 'н/д',
+        normal_form=analysis['normal_form'],
+        grammemes=analysis['grammemes'],
+    )
+
+
+def _spell_errors_into(out: List[str], errors: Sequence[Dict[str, Any]], first_number: int) -> None:
+    # Every error is followed by a blank line.
+    for number, error in enumerate(errors, first_number):
+        SPELL_ERROR.render_into(out, number=number, word=error.get('word', ''))
+        count = len(error.get('positions', ())) or 1
+        if count > 1:
+            SPELL_ERROR_COUNT.render_into(out, count=count)
+        suggestions = list(error.get('s', []))[:SUGGESTIONS_SHOWN]
+        if suggestions:
+            SPELL_SUGGESTIONS.render_into(out, suggestions='</i>, <i>'.join(map(escape_html, suggestions)))
+        out.append('\n')
+
+
+def render_spell_check_result(errors: Sequence[Dict[str, Any]]) -> str:
+    if not errors:
+        return SPELL_CLEAN
+
+    out = [SPELL_HEADER]
+    _spell_errors_into(out, errors[:SPELL_SHOWN], 1)
+    if len(errors) > SPELL_SHOWN:
+        SPELL_MORE.render_into(out, count=len(errors) - SPELL_SHOWN)
+    return ''.join(out)
+
+
+def render_spell_check_partial(errors: Sequence[Dict[str, Any]], chunk: int, chunks: int) -> str:
+    # The reply so far, while later chunks of a long text are checked.
+    out: List[str] = []
+    if errors:
+        out.append(render_spell_check_result(sorted(errors, key=lambda error: error['pos'])))
+    SPELL_PROGRESS.render_into(out, percent=chunk * 100 // chunks)
+    return ''.join(out).lstrip('\n')
+
+
+def render_examples(word: str, examples: Optional[Sequence[str]]) -> str:
+    # Examples are LLM output sent with ParseMode.HTML, so they are escaped
+    # like every other field.
+    if examples is None:
+        return EXAMPLES_UNAVAILABLE
+    if not examples:
+        return EXAMPLES_FAILED.render(word=word)
+
+    out: List[str] = []
+    EXAMPLES_HEADER.render_into(out, word=word)
+    for number, example in enumerate(examples[:EXAMPLES_SHOWN], 1):
+        if example[0].isdigit():
+            EXAMPLE.render_into(out, example=example)
+        else:
+            NUMBERED_EXAMPLE.render_into(out, number=number, example=example)
+    return ''.join(out)
+
+
+def render_history(history: Sequence[Tuple[str, str, str]]) -> str:
+    if not history:
+        return HISTORY_EMPTY
+
+    out = [HISTORY_HEADER]
+    for number, (command, query, timestamp) in enumerate(history, 1):
+        if len(query) > HISTORY_PREVIEW:
+            query = query[:HISTORY_PREVIEW] + '...'
+        HISTORY_ENTRY.render_into(out, number=number, command=command, query=query, timestamp=timestamp)
+    return ''.join(out)
+
+
+def render_lemmas(lemmatized: Sequence[Tuple[str, str]]) -> str:
+    if not lemmatized:
+        return NO_WORDS
+
+    counts = Counter(word.lower() for word, _ in lemmatized)
+    lemmas = {word.lower(): lemma for word, lemma in lemmatized}
+
+    out: List[str] = []
+    LEMMAS_HEADER.render_into(
+        out, words=len(lemmatized), unique=len(counts), lemmas=len(set(lemmas.values()))
+    )
+    for word, count in counts.items():
+        if count > 1:
+            LEMMA_REPEATED.render_into(out, word=word, lemma=lemmas[word], count=count)
+        else:
+            LEMMA.render_into(out, word=word, lemma=lemmas[word])
+    return ''.join(out)
+
+
+def render_pos(pos_dict: Dict[str, List[str]]) -> str:
+    if not pos_dict:
+        return NO_WORDS
+
+    total = sum(len(words) for words in pos_dict.values())
+    out: List[str] = []
+    POS_HEADER.render_into(out, total=total)
+    for pos, words in sorted(pos_dict.items(), key=lambda item: -len(item[1])):
+        POS_ENTRY.render_into(out, name=POS_MAP.get(pos, 'не определено'), count=len(words))
+        out.append(', '.join(dict.fromkeys(word.lower() for word in words)))
+    return ''.join(out)
+
+
+def render_document_progress(mode: str, progress: float, words: int, unique: int) -> str:
+    return DOCUMENT_PROGRESS.render(
+        mode=DOCUMENT_MODES[mode], percent=int(progress * 100), words=words, unique=unique
+    )
+
+
+def render_document_summary(mode: str, characters: int, words: int, unique: int, counts: Counter) -> str:
+    # counts: unknown words (spell check) or lemmas (lemmatize) with their
+    # number of occurrences.
+    if mode == 'spell_check' and not counts:
+        return SPELL_SUMMARY_CLEAN.render(characters=characters)
+
+    out: List[str] = []
+    if mode == 'spell_check':
+        DOCUMENT_SPELL_SUMMARY.render_into(
+            out, characters=characters, words=words, errors=len(counts), occurrences=sum(counts.values())
+        )
+    else:
+        DOCUMENT_LEMMA_SUMMARY.render_into(
+            out, characters=characters, words=words, unique=unique, lemmas=len(counts)
+        )
+    frequent = [
+        SPELL_FREQUENT.render(word=word, count=count)
+        for word, count in counts.most_common(DOCUMENT_FREQUENT_SHOWN)
+    ]
+    if frequent:
+        DOCUMENT_FREQUENT.render_into(out, words=', '.join(frequent))
+    out.append(DOCUMENT_ANNOTATED)
+    return ''.join(out)
+
+
+def _percent(count: int, total: int) -> str:
+    return f'{count * 100 / total:.1f}'
+
+
+def render_stats(stats: CorpusStats, source: str) -> str:
+    if not stats.tokens:
+        return NO_WORDS
+
+    out: List[str] = []
+    STATS_HEADER.render_into(
+        out,
+        tokens=stats.tokens,
+        forms=stats.forms,
+        lemmas=stats.lemmas,
+        type_token=f'{stats.type_token_ratio:.3f}',
+        lemma_token=f'{stats.lemma_token_ratio:.3f}',
+    )
+    STATS_SOURCE.render_into(out, source=source)
+
+    STATS_SECTION.render_into(out, title='Части речи')
+    for pos, count in stats.pos.most_common(STATS_POS_SHOWN):
+        STATS_POS.render_into(
+            out, name=POS_MAP.get(pos, 'не определено'), count=count, share=_percent(count, stats.tokens)
+        )
+
+    if stats.grammemes:
+        out.append('\n')
+        STATS_SECTION.render_into(out, title='Граммемы')
+        for category, counts in stats.grammemes.items():
+            total = sum(counts.values())
+            shares = ', '.join(
+                STATS_SHARE.render(name=STATS_GRAMMEME_LABELS.get(grammeme, grammeme), share=_percent(count, total))
+                for grammeme, count in counts.most_common()
+            )
+            STATS_GRAMMEMES.render_into(out, category=STATS_CATEGORIES[category], shares=shares)
+
+    out.append('\n')
+    STATS_SECTION.render_into(out, title='Частые леммы')
+    out.append('\n')
+    out.append(', '.join(STATS_LEMMA.render(word=lemma, count=count) for lemma, count in stats.top_lemmas))
+    return ''.join(out)
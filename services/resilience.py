@@ -0,0 +1,130 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    # Closed: calls go through and consecutive failures are counted. After
+    # `failure_threshold` of them the breaker opens and calls fail at once
+    # for `reset_timeout` seconds; then a single probe is let through
+    # (half-open) and its outcome closes or reopens the breaker.
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+            self,
+            failure_threshold: int,
+            reset_timeout: float,
+            clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_cancelled(self) -> None:
+        # A cancelled probe says nothing about the upstream; let the next
+        # call probe instead.
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = self._clock()
+            self._probing = False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'breaker_open': int(self.state == self.OPEN),
+            'breaker_half_open': int(self.state == self.HALF_OPEN),
+            'breaker_trips': self.trips,
+            'breaker_rejected': self.rejected,
+        }
+
+
+class LatencyWindow:
+    # Latencies of the most recent successful calls; the hedge delay is a
+    # percentile over them, so it follows the upstream as it speeds up or
+    # slows down.
+    def __init__(self, size: int = 200, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    # Full jitter: retries from many callers spread out instead of arriving
+    # at the recovering upstream together.
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def hedged(
+        call: Callable[[], Awaitable[Any]],
+        delay: float,
+        on_hedge: Optional[Callable[[], None]] = None,
+) -> Any:
+    # Starts a second identical call if the first has not finished after
+    # `delay`; the first successful result wins and the other call is
+    # cancelled. Fails only when every started call fails.
+    first = asyncio.ensure_future(call())
+    pending = {first}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return first.result()
+
+        if on_hedge is not None:
+            on_hedge()
+        pending.add(asyncio.ensure_future(call()))
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
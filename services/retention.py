@@ -0,0 +1,143 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from loguru import logger
+from sqlalchemy import delete, func, select
+
+from config import (
+    COMPACTION_BATCH_ROWS,
+    COMPACTION_BATCH_USERS,
+    COMPACTION_INTERVAL_SECONDS,
+    DATABASE_URL,
+    HISTORY_RETENTION_DAYS,
+    HISTORY_RETENTION_ROWS,
+)
+from models.database import UserQuery, engine, get_async_session
+
+VACUUM_PAGES = 2000
+
+
+async def delete_expired(days: int, batch_rows: int = COMPACTION_BATCH_ROWS) -> int:
+    # Oldest rows first, a batch of rows per transaction, like trim_users.
+    if days <= 0:
+        return 0
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    removed = 0
+    while True:
+        async with get_async_session() as session:
+            expired = select(UserQuery.id).where(
+                UserQuery.created_at < cutoff
+            ).order_by(UserQuery.created_at).limit(batch_rows)
+            result = await session.execute(
+                delete(UserQuery).where(UserQuery.id.in_(expired.scalar_subquery()))
+            )
+            await session.commit()
+        removed += result.rowcount
+        if result.rowcount < batch_rows:
+            return removed
+        await asyncio.sleep(0)
+
+
+async def trim_users(keep: int, batch_users: int = COMPACTION_BATCH_USERS) -> int:
+    # Only users over the limit are touched, a batch of users per transaction,
+    # so the writer lock is never held for the whole table.
+    if keep <= 0:
+        return 0
+
+    async with get_async_session() as session:
+        over_limit = (await session.scalars(
+            select(UserQuery.user_id).group_by(UserQuery.user_id).having(func.count() > keep)
+        )).all()
+
+    removed = 0
+    for start in range(0, len(over_limit), batch_users):
+        async with get_async_session() as session:
+            for user_id in over_limit[start:start + batch_users]:
+                newest = select(UserQuery.id).where(
+                    UserQuery.user_id == user_id
+                ).order_by(
+                    UserQuery.created_at.desc(), UserQuery.id.desc()
+                ).limit(keep)
+                result = await session.execute(
+                    delete(UserQuery).where(
+                        UserQuery.user_id == user_id,
+                        UserQuery.id.not_in(newest.scalar_subquery()),
+                    )
+                )
+                removed += result.rowcount
+            await session.commit()
+        await asyncio.sleep(0)
+
+    return removed
+
+
+def _reclaim_space() -> None:
+    # Python's sqlite3 steps a statement without result columns only once,
+    # and incremental_vacuum frees one page per step; executescript runs
+    # every statement to the end. The checkpoint then truncates the file.
+    connection = engine.raw_connection()
+    try:
+        connection.executescript(
+            f'PRAGMA incremental_vacuum({VACUUM_PAGES});'
+            'PRAGMA wal_checkpoint(TRUNCATE);'
+            'PRAGMA optimize;'
+        )
+    finally:
+        connection.close()
+
+
+async def reclaim_space() -> None:
+    if 'sqlite' not in DATABASE_URL:
+        return
+    await asyncio.get_running_loop().run_in_executor(None, _reclaim_space)
+
+
+async def compact_history(
+        keep_rows: int = HISTORY_RETENTION_ROWS,
+        keep_days: int = HISTORY_RETENTION_DAYS,
+) -> Dict[str, float]:
+    started = time.perf_counter()
+    expired = await delete_expired(keep_days)
+    trimmed = await trim_users(keep_rows)
+    await reclaim_space()
+
+    stats = {
+        'expired': expired,
+        'trimmed': trimmed,
+        'seconds': time.perf_counter() - started,
+    }
+    logger.info(f'History compaction finished: {stats}')
+    return stats
+
+
+class CompactionTask:
+    def __init__(self, interval: float = COMPACTION_INTERVAL_SECONDS) -> None:
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await compact_history()
+            except Exception as e:
+                logger.error(f'History compaction failed: {e}')
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+compaction = CompactionTask()
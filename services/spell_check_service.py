@@ -1,68 +1,160 @@
 import re
-from typing import List, Dict, Any
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
+import spellchecker
 from loguru import logger
 from spellchecker import SpellChecker
 
-spell = SpellChecker(language='ru')
-
-spell.word_frequency.load_words(['чат-бот', 'телеграм', 'онлайн', 'веб'])
-
-
-async def check_spelling(text: str) -> List[Dict[str, Any]]:
+from config import SPELL_CHUNK_SIZE, SPELL_INDEX_PATH
+from services.executor import run_heavy
+from services.metrics import timed
+from services.suggestion_index import SuggestionIndex, load_or_build, source_fingerprint
+
+EXTRA_WORDS = ['чат-бот', 'телеграм', 'онлайн', 'веб']
+SPELL_MAX_DISTANCE = 2
+
+_spell: Optional[SpellChecker] = None
+_suggestion_index: Optional[SuggestionIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_spell() -> SpellChecker:
+    global _spell
+    if _spell is None:
+        _spell = SpellChecker(language='ru', distance=SPELL_MAX_DISTANCE)
+        _spell.word_frequency.load_words(EXTRA_WORDS)
+    return _spell
+
+
+def get_suggestion_index() -> SuggestionIndex:
+    # The full pyspellchecker dictionary is only parsed when the precompiled
+    # index is missing or was built from a different dictionary.
+    global _suggestion_index
+    if _suggestion_index is None:
+        with _index_lock:
+            if _suggestion_index is None:
+                _suggestion_index = load_or_build(
+                    Path(SPELL_INDEX_PATH),
+                    source_fingerprint('ru', spellchecker.__version__, sorted(EXTRA_WORDS)),
+                    lambda: dict(get_spell().word_frequency.dictionary),
+                    max_distance=SPELL_MAX_DISTANCE,
+                )
+    return _suggestion_index
+
+
+def warm_up() -> None:
+    get_suggestion_index().lookup('првиет')
+
+
+WORD_RE = re.compile(r'[а-яА-ЯёЁ]{2,}')
+
+
+@dataclass
+class SpellCheckProgress:
+    chunk: int
+    chunks: int
+    new_errors: List[Dict[str, Any]]
+    errors: List[Dict[str, Any]]
+
+
+def split_text(text: str, size: int = SPELL_CHUNK_SIZE) -> List[Tuple[int, str]]:
+    # Chunks end on whitespace so no word is cut in two; each chunk keeps its
+    # offset in the full text.
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = max(text.rfind(' ', start, end), text.rfind('\n', start, end))
+            if cut > start:
+                end = cut
+        chunks.append((start, text[start:end]))
+        start = end
+    return chunks
+
+
+def collect_occurrences(text: str, offset: int = 0) -> Dict[str, List[int]]:
+    # Single pass over the text: every occurrence of a word with its offset.
+    occurrences: Dict[str, List[int]] = {}
+    for match in WORD_RE.finditer(text):
+        occurrences.setdefault(match.group().lower(), []).append(offset + match.start())
+    return occurrences
+
+
+def _error_entry(word: str, suggestions: List[str], positions: List[int]) -> Dict[str, Any]:
+    return {
+        'word': word,
+        's': suggestions,
+        'pos': positions[0],
+        'positions': positions,
+        'len': len(word),
+        'code': 1,
+    }
+
+
+def find_unknown_words(words: List[str]) -> Dict[str, List[str]]:
+    # Runs in an executor worker: each distinct word is looked up once and
+    # suggestions are only computed for unknown ones.
+    suggestion_index = get_suggestion_index()
+    return {
+        word: suggestion_index.lookup(word) or []
+        for word in words
+        if not suggestion_index.known(word)
+    }
+
+
+def find_spelling_errors(text: str) -> List[Dict[str, Any]]:
+    occurrences = collect_occurrences(text)
+    unknown = find_unknown_words(list(occurrences))
+    return sorted(
+        (_error_entry(word, unknown[word], occurrences[word]) for word in unknown),
+        key=lambda error: error['pos'],
+    )
+
+
+async def check_spelling_stream(
+        text: str,
+        chunk_size: int = SPELL_CHUNK_SIZE,
+) -> AsyncIterator[SpellCheckProgress]:
+    chunks = split_text(text, chunk_size)
+    checked: Set[str] = set()
+    errors: Dict[str, Dict[str, Any]] = {}
+
+    for number, (offset, chunk) in enumerate(chunks, 1):
+        occurrences = collect_occurrences(chunk, offset)
+        fresh = [word for word in occurrences if word not in checked]
+        checked.update(fresh)
+        unknown = await run_heavy(find_unknown_words, fresh) if fresh else {}
+
+        new_errors = []
+        for word, positions in occurrences.items():
+            if word in unknown:
+                errors[word] = _error_entry(word, unknown[word], positions)
+                new_errors.append(errors[word])
+            elif word in errors:
+                errors[word]['positions'].extend(positions)
+
+        new_errors.sort(key=lambda error: error['pos'])
+        yield SpellCheckProgress(number, len(chunks), new_errors, list(errors.values()))
+
+
+@timed('spell.check')
+async def check_spelling(
+        text: str,
+        on_progress: Optional[Callable[[SpellCheckProgress], Awaitable[None]]] = None,
+) -> List[Dict[str, Any]]:
     if not text:
         return []
 
-    words_in_text = re.findall(r'[а-яА-ЯёЁ]{2,}', text)
-
-    if not words_in_text:
-        return []
-
-    errors = []
-
-    unknown_words = spell.unknown(words_in_text)
-
-    logger.info(f"Checking text: '{text[:50]}...'. Found unknown words: {unknown_words}")
-
-    for word in unknown_words:
-        candidates = spell.candidates(word)
-
-        pos = text.find(word)
-
-        error_entry = {
-            'word': word,
-            's': list(candidates) if candidates else [],
-            'pos': pos,
-            'len': len(word),
-            'code': 1
-        }
-        errors.append(error_entry)
-
-    errors.sort(key=lambda x: x['pos'])
-
-    return errors
-
-
-async def format_spell_check_result(errors: List[Dict[str, Any]]) -> str:
-    if not errors:
-        return '✅ Текст не содержит ошибок (или все слова есть в словаре)!'
-
-    result = '❌ Найдены возможные ошибки:\n\n'
-
-    for i, error in enumerate(errors[:10], 1):
-        word = error.get('word', '')
-        suggestions = error.get('s', [])
-
-        result += f'{i}. <b>{word}</b>'
-
-        if suggestions:
-            top_suggestions = list(suggestions)[:5]
-            suggestions_str = ', '.join([f'<i>{s}</i>' for s in top_suggestions])
-            result += f'\n   Варианты: {suggestions_str}'
-
-        result += '\n\n'
+    errors: List[Dict[str, Any]] = []
+    async for progress in check_spelling_stream(text):
+        errors = progress.errors
+        if on_progress is not None:
+            await on_progress(progress)
 
-    if len(errors) > 10:
-        result += f'... и ещё {len(errors) - 10} слов'
+    logger.debug(f'Spell check found {len(errors)} unknown words in {len(text)} characters')
 
-    return result
+    return sorted(errors, key=lambda error: error['pos'])
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymorphy3.tagset import OpencorporaTag
+
+from config import STATS_TOP_LEMMAS, STATS_VOCABULARY_MAX_ENTRIES
+from services.executor import run_heavy, run_light
+from services.metrics import timed
+from services.nlp_service import TOKEN_RE, get_morph
+
+# Grammatical categories reported by /stats, in display order.
+GRAMMEME_CATEGORIES: Tuple[Tuple[str, frozenset], ...] = (
+    ('case', OpencorporaTag.CASES),
+    ('number', OpencorporaTag.NUMBERS),
+    ('gender', OpencorporaTag.GENDERS),
+    ('animacy', OpencorporaTag.ANIMACY),
+    ('tense', OpencorporaTag.TENSES),
+    ('aspect', OpencorporaTag.ASPECTS),
+    ('person', OpencorporaTag.PERSONS),
+)
+CATEGORY_OF = {grammeme: category for category, grammemes in GRAMMEME_CATEGORIES for grammeme in grammemes}
+# Forms parsed per executor task, so large inputs spread over the process
+# pool and every task stays well inside the time budget.
+ANALYSIS_BATCH = 2000
+
+# normal form, POS (None for non-words), grammemes of the reported categories.
+Analysis = Tuple[str, Optional[str], Tuple[str, ...]]
+
+
+@dataclass
+class CorpusStats:
+    tokens: int = 0
+    forms: int = 0
+    lemmas: int = 0
+    top_lemmas: List[Tuple[str, int]] = field(default_factory=list)
+    pos: Counter = field(default_factory=Counter)
+    # category -> Counter of grammemes, over the tokens that have the category.
+    grammemes: Dict[str, Counter] = field(default_factory=dict)
+
+    @property
+    def type_token_ratio(self) -> float:
+        return self.forms / self.tokens if self.tokens else 0.0
+
+    @property
+    def lemma_token_ratio(self) -> float:
+        return self.lemmas / self.tokens if self.tokens else 0.0
+
+
+def count_forms(texts: Iterable[str]) -> Counter:
+    counts: Counter = Counter()
+    for text in texts:
+        counts.update(TOKEN_RE.findall(text.lower()))
+    return counts
+
+
+def analyze_forms(forms: List[str]) -> List[Analysis]:
+    # Runs in the process pool: only plain tuples cross the boundary.
+    morph = get_morph()
+    analyses = []
+    for form in forms:
+        parsed = morph.parse(form)[0]
+        tag = parsed.tag
+        grammemes = tuple(sorted(grammeme for grammeme in tag.grammemes if grammeme in CATEGORY_OF))
+        analyses.append((parsed.normal_form, str(tag.POS) if tag.POS else None, grammemes))
+    return analyses
+
+
+class MorphologyTable:
+    # Every word form seen so far, interned: a form id indexes two flat
+    # arrays holding its lemma id and tag id. A tag is the (POS, grammemes)
+    # pair, and there are only a few hundred distinct ones, so a text is
+    # aggregated by counting ids and the per-category grammeme counts are
+    # expanded once per tag, not once per token. The table is dropped as a
+    # whole when it reaches its size limit.
+    def __init__(self, max_forms: int) -> None:
+        self.max_forms = max_forms
+        self.lock = threading.Lock()
+        self.resets = 0
+        self.clear()
+
+    def clear(self) -> None:
+        self.form_ids: Dict[str, int] = {}
+        self.lemma_of = array('I')
+        self.tag_of = array('I')
+        self.lemma_ids: Dict[str, int] = {}
+        self.lemma_names: List[str] = []
+        self.tag_ids: Dict[Tuple[Optional[str], Tuple[str, ...]], int] = {}
+        self.tags: List[Tuple[Optional[str], Tuple[Tuple[str, str], ...]]] = []
+
+    def __len__(self) -> int:
+        return len(self.form_ids)
+
+    def missing(self, forms: Iterable[str]) -> List[str]:
+        form_ids = self.form_ids
+        return [form for form in forms if form not in form_ids]
+
+    def _add(self, forms: Sequence[str], analyses: Sequence[Analysis]) -> None:
+        if len(self.form_ids) + len(forms) > self.max_forms:
+            self.clear()
+            self.resets += 1
+        for form, (normal_form, pos, grammemes) in zip(forms, analyses):
+            if form in self.form_ids:
+                continue
+            lemma_id = self.lemma_ids.get(normal_form)
+            if lemma_id is None:
+                lemma_id = self.lemma_ids[normal_form] = len(self.lemma_names)
+                self.lemma_names.append(normal_form)
+            tag_id = self.tag_ids.get((pos, grammemes))
+            if tag_id is None:
+                tag_id = self.tag_ids[(pos, grammemes)] = len(self.tags)
+                self.tags.append((pos, tuple((CATEGORY_OF[grammeme], grammeme) for grammeme in grammemes)))
+            self.form_ids[form] = len(self.lemma_of)
+            self.lemma_of.append(lemma_id)
+            self.tag_of.append(tag_id)
+
+    def aggregate(self, counts: Counter, forms: Sequence[str], analyses: Sequence[Analysis]) -> CorpusStats:
+        with self.lock:
+            self._add(forms, analyses)
+            # Forms interned before a concurrent reset are analysed again here.
+            late = self.missing(counts)
+            if late:
+                self._add(late, analyze_forms(late))
+
+            form_ids, lemma_of, tag_of = self.form_ids, self.lemma_of, self.tag_of
+            lemma_counts: Counter = Counter()
+            tag_counts: Counter = Counter()
+            for form, count in counts.items():
+                form_id = form_ids[form]
+                lemma_counts[lemma_of[form_id]] += count
+                tag_counts[tag_of[form_id]] += count
+
+            pos: Counter = Counter()
+            grammemes: Dict[str, Counter] = {category: Counter() for category, _ in GRAMMEME_CATEGORIES}
+            for tag_id, count in tag_counts.items():
+                tag_pos, tag_grammemes = self.tags[tag_id]
+                pos[tag_pos] += count
+                for category, grammeme in tag_grammemes:
+                    grammemes[category][grammeme] += count
+
+            return CorpusStats(
+                tokens=sum(counts.values()),
+                forms=len(counts),
+                lemmas=len(lemma_counts),
+                top_lemmas=[
+                    (self.lemma_names[lemma_id], count)
+                    for lemma_id, count in lemma_counts.most_common(STATS_TOP_LEMMAS)
+                ],
+                pos=pos,
+                grammemes={category: counter for category, counter in grammemes.items() if counter},
+            )
+
+
+morphology_table = MorphologyTable(STATS_VOCABULARY_MAX_ENTRIES)
+
+
+@timed('stats.analyze')
+async def analyze_texts(texts: Sequence[str]) -> CorpusStats:
+    # Tokens are counted per distinct form first; only forms the table has
+    # not seen yet are parsed, split across the process pool.
+    counts = await run_light(count_forms, texts)
+    missing = morphology_table.missing(counts)
+
+    batches = [missing[i:i + ANALYSIS_BATCH] for i in range(0, len(missing), ANALYSIS_BATCH)]
+    analyses: List[Analysis] = []
+    for result in await asyncio.gather(*(run_heavy(analyze_forms, forms) for forms in batches)):
+        analyses.extend(result)
+
+    return await run_light(morphology_table.aggregate, counts, missing, analyses)
+
+
+def stats() -> Dict[str, int]:
+    return {
+        'forms': len(morphology_table),
+        'lemmas': len(morphology_table.lemma_names),
+        'tags': len(morphology_table.tags),
+        'resets': morphology_table.resets,
+    }
@@ -0,0 +1,196 @@
+import hashlib
+import mmap
+import struct
+import zlib
+from bisect import bisect_left
+from itertools import combinations
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Union
+
+from services import index_file
+
+MAGIC = b'SPLIDX02'
+HEADER = struct.Struct('<8sIIIIII')
+
+
+def source_fingerprint(*parts: object) -> int:
+    return zlib.crc32(repr(parts).encode('utf-8'))
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    result = {word}
+    for distance in range(1, min(max_distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), distance):
+            result.add(''.join(c for i, c in enumerate(word) if i not in positions))
+    return result
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    # Optimal string alignment distance (Levenshtein plus adjacent transpositions),
+    # the same edit set pyspellchecker uses to generate candidates.
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def serialize_index(word_frequency: Dict[str, int], max_distance: int, fingerprint: int) -> bytes:
+    # Words are stored sorted as one UTF-8 blob; UTF-8 byte order matches code
+    # point order, so membership is a binary search straight over the buffer.
+    words = sorted(word_frequency)
+    encoded = [w.encode('utf-8') for w in words]
+    offsets = [0]
+    for word in encoded:
+        offsets.append(offsets[-1] + len(word))
+
+    entries = sorted(
+        (_hash(deleted), word_id)
+        for word_id, word in enumerate(words)
+        for deleted in _deletes(word, max_distance)
+    )
+
+    return b''.join((
+        HEADER.pack(
+            MAGIC, fingerprint, max_distance, max((len(w) for w in words), default=0),
+            len(words), len(entries), offsets[-1],
+        ),
+        struct.pack(f'<{len(entries)}Q', *(h for h, _ in entries)),
+        struct.pack(f'<{len(entries)}I', *(word_id for _, word_id in entries)),
+        struct.pack(f'<{len(offsets)}I', *offsets),
+        struct.pack(f'<{len(words)}I', *(int(word_frequency[w]) for w in words)),
+        *encoded,
+    ))
+
+
+class _WordBytes:
+    def __init__(self, index: 'SuggestionIndex') -> None:
+        self.index = index
+
+    def __len__(self) -> int:
+        return self.index.word_count
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.index.word_bytes(i)
+
+
+class SuggestionIndex:
+    # Symmetric-delete index: every dictionary word is registered under all of
+    # its deletions up to `max_distance`, so a lookup only needs the deletions
+    # of the query word instead of every insert/replace over the alphabet.
+    # All arrays are views over one buffer (usually a read-only mmap), so
+    # processes loading the same file share its pages.
+    def __init__(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        magic, fingerprint, max_distance, max_length, word_count, entry_count, blob_len = \
+            HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError('not a suggestion index')
+
+        self.fingerprint = fingerprint
+        self.max_distance = max_distance
+        self.max_length = max_length
+        self.word_count = word_count
+        self._buffer = buffer
+
+        view = memoryview(buffer)
+        offset = HEADER.size
+        self.hashes = view[offset:offset + entry_count * 8].cast('Q')
+        offset += entry_count * 8
+        self.ids = view[offset:offset + entry_count * 4].cast('I')
+        offset += entry_count * 4
+        self.offsets = view[offset:offset + (word_count + 1) * 4].cast('I')
+        offset += (word_count + 1) * 4
+        self.frequencies = view[offset:offset + word_count * 4].cast('I')
+        offset += word_count * 4
+        self.blob = view[offset:offset + blob_len]
+
+    @classmethod
+    def load(cls, path: Path) -> 'SuggestionIndex':
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def word_bytes(self, i: int) -> bytes:
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+    def word(self, i: int) -> str:
+        return self.word_bytes(i).decode('utf-8')
+
+    def words(self) -> Iterable[str]:
+        return (self.word(i) for i in range(self.word_count))
+
+    def word_id(self, word: str) -> Optional[int]:
+        encoded = word.encode('utf-8')
+        i = bisect_left(_WordBytes(self), encoded)
+        if i < self.word_count and self.word_bytes(i) == encoded:
+            return i
+        return None
+
+    def known(self, word: str) -> bool:
+        return self.word_id(word) is not None
+
+    def frequency(self, word: str) -> int:
+        word_id = self.word_id(word)
+        return self.frequencies[word_id] if word_id is not None else 0
+
+    def _word_ids_for(self, deleted: str) -> Iterable[int]:
+        key = _hash(deleted)
+        i = bisect_left(self.hashes, key)
+        while i < len(self.hashes) and self.hashes[i] == key:
+            yield self.ids[i]
+            i += 1
+
+    def lookup(self, word: str) -> Optional[List[str]]:
+        word = word.lower()
+        if self.known(word):
+            return [word]
+        if len(word) > self.max_length + self.max_distance:
+            return None
+
+        by_distance: Dict[int, Dict[int, str]] = {}
+        seen: Set[int] = set()
+        for deleted in _deletes(word, self.max_distance):
+            for word_id in self._word_ids_for(deleted):
+                if word_id in seen:
+                    continue
+                seen.add(word_id)
+                candidate = self.word(word_id)
+                distance = edit_distance(word, candidate, self.max_distance)
+                if distance <= self.max_distance:
+                    by_distance.setdefault(distance, {})[word_id] = candidate
+
+        for distance in sorted(by_distance):
+            found = by_distance[distance]
+            ranked = sorted(found, key=lambda i: (-self.frequencies[i], found[i]))
+            return [found[i] for i in ranked]
+        return None
+
+
+def load_or_build(
+        path: Path,
+        fingerprint: int,
+        word_frequency: Callable[[], Dict[str, int]],
+        max_distance: int = 2,
+) -> SuggestionIndex:
+    return index_file.load_or_build(
+        path,
+        'suggestion index',
+        SuggestionIndex.load,
+        lambda index: index.fingerprint == fingerprint and index.max_distance == max_distance,
+        lambda: serialize_index(word_frequency(), max_distance, fingerprint),
+        SuggestionIndex,
+    )
@@ -1,92 +1,93 @@
-from datetime import datetime, timedelta
-from typing import List
+import json
+from typing import Any, Dict, List, Optional
 
-from sqlalchemy import desc
+from sqlalchemy import delete, desc, select
 
-from models.database import UserQuery, get_session
+from config import STATS_HISTORY_MAX_ROWS
+from models.database import UserQuery, get_async_session
+from services.metrics import timed
+from services.query_log import query_log
+
+# Commands whose query_text is text the user wrote. Uploaded documents are
+# logged under their own commands with the file name as query_text.
+TEXT_COMMANDS = ('/analyze', '/spell_check', '/examples', '/lemmatize', '/pos', '/stats')
+
+
+def encode_result(result: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(result or {}, ensure_ascii=False, separators=(',', ':'))
 
 
 async def save_query(
         user_id: int,
         command: str,
         query_text: str,
-        response_text: str
+        result: Optional[Dict[str, Any]] = None,
 ) -> None:
-    session = get_session()
-    try:
-        new_query = UserQuery(
-            user_id=user_id,
-            command=command,
-            query_text=query_text,
-            response_text=response_text[:500],
-        )
-        session.add(new_query)
-        session.commit()
-    except Exception:
-        session.rollback()
-        raise
-    finally:
-        session.close()
+    # Replies are rendered from templates and can be rendered again, so the
+    # row keeps only a compact JSON summary of the result, not the text.
+    await query_log.add({
+        'user_id': user_id,
+        'command': command,
+        'query_text': query_text,
+        'response_text': encode_result(result),
+    })
 
 
+@timed('db.history')
 async def get_user_history(user_id: int, limit: int = 10) -> List[tuple]:
-    session = get_session()
-    try:
-        queries = session.query(UserQuery).filter(
-            UserQuery.user_id == user_id
-        ).order_by(
-            desc(UserQuery.created_at)
-        ).limit(limit).all()
-
-        history = [
-            (q.command, q.query_text, q.created_at.strftime('%d.%m %H:%M'))
-            for q in queries
-        ]
-        return history
-    except Exception:
-        return []
-    finally:
-        session.close()
-
-
+    await query_log.flush()
+
+    async with get_async_session() as session:
+        try:
+            result = await session.execute(
+                select(UserQuery).where(
+                    UserQuery.user_id == user_id
+                ).order_by(
+                    desc(UserQuery.created_at)
+                ).limit(limit)
+            )
+            queries = result.scalars().all()
+
+            history = [
+                (q.command, q.query_text, q.created_at.strftime('%d.%m %H:%M'))
+                for q in queries
+            ]
+            return history
+        except Exception:
+            return []
+
+
+@timed('db.texts')
+async def get_user_texts(user_id: int, limit: int = STATS_HISTORY_MAX_ROWS) -> List[str]:
+    await query_log.flush()
+
+    async with get_async_session() as session:
+        try:
+            result = await session.execute(
+                select(UserQuery.query_text).where(
+                    UserQuery.user_id == user_id,
+                    UserQuery.command.in_(TEXT_COMMANDS),
+                ).order_by(
+                    desc(UserQuery.created_at)
+                ).limit(limit)
+            )
+            return [query_text for query_text in result.scalars().all() if query_text]
+        except Exception:
+            return []
+
+
+@timed('db.clear_history')
 async def clear_user_history(user_id: int) -> int:
-    session = get_session()
-    try:
-        count = session.query(UserQuery).filter(
-            UserQuery.user_id == user_id
-        ).delete()
-        session.commit()
-        return count
-    except Exception:
-        session.rollback()
-        return 0
-    finally:
-        session.close()
-
-
-async def get_user_query_count(user_id: int, minutes: int = 1) -> int:
-    session = get_session()
-    try:
-        time_threshold = datetime.utcnow() - timedelta(minutes=minutes)
-        count = session.query(UserQuery).filter(
-            UserQuery.user_id == user_id,
-            UserQuery.created_at >= time_threshold
-        ).count()
-        return count
-    except Exception:
-        return 0
-    finally:
-        session.close()
-
-
-async def format_history(history: List[tuple]) -> str:
-    if not history:
-        return '📭 История запросов пуста'
-
-    result = '📜 Ваша история запросов (последние 10):\n\n'
-
-    for i, (command, query, timestamp) in enumerate(history, 1):
-        query_preview = query[:40] + '...' if len(query) > 40 else query
-        result += f'{i}. {command} — "{query_preview}"\n   🕐 {timestamp}\n\n'
-
-    return result
+    discarded = query_log.discard_user(user_id)
+    await query_log.wait_for_flush()
+
+    async with get_async_session() as session:
+        try:
+            result = await session.execute(
+                delete(UserQuery).where(UserQuery.user_id == user_id)
+            )
+            await session.commit()
+            return result.rowcount + discarded
+        except Exception:
+            await session.rollback()
+            return 0
@@ -0,0 +1,90 @@
+import asyncio
+from typing import Optional
+
+from aiohttp import web
+from loguru import logger
+from telegram import Update
+from telegram.ext import Application
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+RETRY_AFTER_SECONDS = 1
+
+
+class WebhookServer:
+    def __init__(
+            self,
+            application: Application,
+            host: str,
+            port: int,
+            path: str,
+            secret: str = '',
+    ) -> None:
+        self.application = application
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret = secret
+        self._runner: Optional[web.AppRunner] = None
+
+        self.accepted = 0
+        self.rejected = 0
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        if self.secret and request.headers.get(SECRET_HEADER) != self.secret:
+            return web.Response(status=403)
+
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        update = Update.de_json(data, self.application.bot)
+
+        # The update queue is bounded: when handlers fall behind, refuse new
+        # updates so Telegram (or a load balancer) retries later instead of
+        # the bot buffering without limit.
+        if self.backlog() >= self.application.update_queue.maxsize:
+            return self._reject()
+        try:
+            self.application.update_queue.put_nowait(update)
+        except asyncio.QueueFull:
+            return self._reject()
+
+        self.accepted += 1
+        return web.Response()
+
+    def backlog(self) -> int:
+        # Updates already handed to the dispatcher but not finished count
+        # against the same limit as updates still in the queue.
+        processor = self.application.update_processor
+        return self.application.update_queue.qsize() + getattr(processor, 'pending', 0)
+
+    def _reject(self) -> web.Response:
+        self.rejected += 1
+        return web.Response(status=429, headers={'Retry-After': str(RETRY_AFTER_SECONDS)})
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        processor = self.application.update_processor
+        return web.json_response({
+            'queue_depth': self.application.update_queue.qsize(),
+            'backlog': self.backlog(),
+            'queue_size': self.application.update_queue.maxsize,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            **({'dispatcher': processor.stats()} if hasattr(processor, 'stats') else {}),
+        })
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get('/health', self.handle_health)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f'Webhook server listening on {self.host}:{self.port}{self.path}')
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# config reads the environment at import time, so the test database is set
+# before any project module is imported.
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp(prefix="bot_tests_")}/test.db'
+
+import pytest_asyncio  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from models.database import Base, close_db, engine, init_db  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def database():
+    # Fresh tables for every test; the async engine is disposed before the
+    # test's event loop closes.
+    init_db()
+    yield
+    await close_db()
+    Base.metadata.drop_all(bind=engine)
+
+
+def count_rows(model, *conditions) -> int:
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(model).where(*conditions)).scalar()
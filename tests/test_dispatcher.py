@@ -0,0 +1,113 @@
+import asyncio
+import random
+from datetime import datetime
+
+import pytest
+from telegram import Chat, Document, Message, Update
+
+from services.dispatcher import OrderedUpdateProcessor
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_update(update_id: int, chat_id: int, text: str = 'слово', document: bool = False) -> Update:
+    message = Message(
+        message_id=update_id,
+        date=datetime.utcnow(),
+        chat=Chat(id=chat_id, type=Chat.PRIVATE),
+        text=None if document else text,
+        document=Document(file_id='file', file_unique_id='file') if document else None,
+    )
+    return Update(update_id=update_id, message=message)
+
+
+def make_processor(**kwargs) -> OrderedUpdateProcessor:
+    options = dict(
+        max_running=8, max_pending=100, fast_concurrency=8, slow_concurrency=1,
+        slow_commands=frozenset({'ask'}),
+    )
+    options.update(kwargs)
+    return OrderedUpdateProcessor(**options)
+
+
+async def test_updates_from_one_chat_run_in_arrival_order():
+    processor = make_processor()
+    rng = random.Random(0)
+    handled = {chat_id: [] for chat_id in range(4)}
+    overlapping = 0
+    running = set()
+
+    async def handle(update: Update) -> None:
+        nonlocal overlapping
+        chat_id = update.effective_chat.id
+        assert chat_id not in running
+        running.add(chat_id)
+        overlapping = max(overlapping, len(running))
+        await asyncio.sleep(rng.random() / 500)
+        handled[chat_id].append(update.update_id)
+        running.discard(chat_id)
+
+    # Chats interleave as they would in one getUpdates batch.
+    updates = [make_update(update_id, update_id % 4) for update_id in range(40)]
+    await asyncio.gather(*(
+        processor.process_update(update, handle(update)) for update in updates
+    ))
+
+    for chat_id, update_ids in handled.items():
+        assert update_ids == list(range(chat_id, 40, 4))
+    # Different chats were not serialised behind each other.
+    assert overlapping > 1
+    assert processor.stats()['pending'] == 0
+    assert not processor.stats()['max_chat_depth']
+
+
+async def test_slow_commands_use_the_slow_lane():
+    processor = make_processor()
+
+    assert processor.lane_for(make_update(1, 1, '/ask вопрос')).name == 'slow'
+    assert processor.lane_for(make_update(2, 1, '/Ask@philologist_bot вопрос')).name == 'slow'
+    assert processor.lane_for(make_update(4, 1, '/analyze слово')).name == 'fast'
+    assert processor.lane_for(make_update(5, 1, 'ask')).name == 'fast'
+    assert processor.lane_for(object()).name == 'fast'
+
+
+async def test_documents_use_the_slow_lane():
+    processor = make_processor()
+
+    assert processor.lane_for(make_update(1, 1, document=True)).name == 'slow'
+
+
+async def test_slow_lane_does_not_hold_up_fast_updates():
+    processor = make_processor(slow_concurrency=1)
+    release = asyncio.Event()
+    active_slow = 0
+    max_active_slow = 0
+    fast_done = []
+
+    async def slow() -> None:
+        nonlocal active_slow, max_active_slow
+        active_slow += 1
+        max_active_slow = max(max_active_slow, active_slow)
+        await release.wait()
+        active_slow -= 1
+
+    async def fast(update_id: int) -> None:
+        fast_done.append(update_id)
+
+    slow_tasks = [
+        asyncio.create_task(processor.process_update(make_update(chat_id, chat_id, '/ask ?'), slow()))
+        for chat_id in range(3)
+    ]
+    await asyncio.gather(*(
+        processor.process_update(make_update(100 + chat_id, 10 + chat_id), fast(chat_id))
+        for chat_id in range(5)
+    ))
+
+    assert sorted(fast_done) == list(range(5))
+    assert processor.lanes['slow'].stats()['active'] == 1
+    assert processor.lanes['slow'].stats()['waiting'] == 2
+
+    release.set()
+    await asyncio.gather(*slow_tasks)
+    assert max_active_slow == 1
+    assert processor.lanes['slow'].processed == 3
@@ -0,0 +1,72 @@
+import pytest
+
+from services.metrics import (
+    Registry,
+    handler_inflight,
+    handler_requests,
+    mark_failed,
+    service_errors,
+    timed,
+    track_handler,
+)
+
+
+@pytest.mark.asyncio
+async def test_track_handler_counts_outcomes():
+    @track_handler('test_outcomes')
+    async def handler(outcome: str) -> None:
+        if outcome == 'raise':
+            raise RuntimeError('boom')
+        if outcome == 'mark':
+            # Handlers that reply with an error message instead of raising.
+            mark_failed()
+
+    await handler('ok')
+    await handler('mark')
+    with pytest.raises(RuntimeError):
+        await handler('raise')
+
+    assert handler_requests.value('test_outcomes', 'ok') == 1
+    assert handler_requests.value('test_outcomes', 'error') == 2
+    assert handler_inflight.value('test_outcomes') == 0
+
+
+@pytest.mark.asyncio
+async def test_mark_failed_only_affects_the_enclosing_handler():
+    @timed('test_service')
+    async def service() -> None:
+        mark_failed()
+
+    @track_handler('test_nested')
+    async def handler() -> None:
+        await service()
+
+    await service()
+    await handler()
+    await track_handler('test_nested')(timed('test_service')(_noop))()
+
+    assert service_errors.value('test_service') == 0
+    assert handler_requests.value('test_nested', 'error') == 1
+    assert handler_requests.value('test_nested', 'ok') == 1
+
+
+async def _noop() -> None:
+    pass
+
+
+def test_registry_renders_metrics_and_collected_stats():
+    registry = Registry()
+    counter = registry.counter('test_total', 'Test counter', ('kind',))
+    counter.inc('a', amount=2)
+    registry.register_stats('cache', lambda: {'hits': 3, 'name': 'lru', 'enabled': True})
+    registry.register_stats('lane', lambda: {'fast': {'active': 1}, 'slow': {'active': 0}}, label='lane')
+    registry.register_stats('broken', lambda: 1 / 0)
+
+    text = registry.render()
+
+    assert 'test_total{kind="a"} 2' in text
+    assert 'cache_hits 3' in text
+    assert 'cache_name' not in text and 'cache_enabled' not in text
+    assert 'lane_active{lane="fast"} 1' in text
+    assert 'lane_active{lane="slow"} 0' in text
+    assert 'broken' not in text
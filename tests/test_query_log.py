@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from conftest import count_rows
+from models.database import UserQuery
+from services import query_log as query_log_module
+from services.query_log import QueryLogBuffer
+
+pytestmark = pytest.mark.asyncio
+
+
+def row(user_id: int, text: str = 'слово') -> dict:
+    return {'user_id': user_id, 'command': '/analyze', 'query_text': text, 'response_text': '{}'}
+
+
+class FailingSession:
+    async def __aenter__(self) -> 'FailingSession':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    async def execute(self, *args, **kwargs) -> None:
+        raise RuntimeError('database is down')
+
+    async def rollback(self) -> None:
+        pass
+
+
+async def test_flush_writes_pending_rows_in_one_batch(database):
+    buffer = QueryLogBuffer(batch_size=100, flush_interval=3600, max_pending=1000)
+    for user_id in range(3):
+        await buffer.add(row(user_id))
+
+    assert buffer.queue_depth == 3
+    assert count_rows(UserQuery) == 0
+
+    assert await buffer.flush() == 3
+    assert buffer.queue_depth == 0
+    assert buffer.flush_count == 1
+    assert count_rows(UserQuery) == 3
+
+
+async def test_full_batch_is_flushed_in_background(database):
+    buffer = QueryLogBuffer(batch_size=2, flush_interval=3600, max_pending=1000)
+    await buffer.add(row(1))
+    await buffer.add(row(1))
+
+    # The background flush takes the batch under its lock; waiting on the
+    # lock afterwards means the rows are committed.
+    while buffer.queue_depth:
+        await asyncio.sleep(0)
+    await buffer.wait_for_flush()
+
+    assert count_rows(UserQuery) == 2
+    assert buffer.queue_depth == 0
+
+
+async def test_stop_flushes_what_is_left(database):
+    buffer = QueryLogBuffer(batch_size=100, flush_interval=3600, max_pending=1000)
+    buffer.start()
+    await buffer.add(row(1))
+    await buffer.stop()
+
+    assert count_rows(UserQuery) == 1
+
+
+async def test_discard_user_drops_only_that_users_pending_rows(database):
+    buffer = QueryLogBuffer(batch_size=100, flush_interval=3600, max_pending=1000)
+    await buffer.add(row(1))
+    await buffer.add(row(2))
+    await buffer.add(row(1))
+
+    assert buffer.discard_user(1) == 2
+    await buffer.flush()
+
+    assert count_rows(UserQuery, UserQuery.user_id == 1) == 0
+    assert count_rows(UserQuery, UserQuery.user_id == 2) == 1
+
+
+async def test_failed_flush_requeues_and_bounds_the_buffer(database, monkeypatch):
+    buffer = QueryLogBuffer(batch_size=100, flush_interval=3600, max_pending=3)
+    monkeypatch.setattr(query_log_module, 'get_async_session', FailingSession)
+    for number in range(5):
+        await buffer.add(row(1, f'слово{number}'))
+
+    # Every flush attempt failed: the newest max_pending rows are kept.
+    assert buffer.queue_depth == 3
+    assert buffer.dropped_rows == 2
+    assert count_rows(UserQuery) == 0
+
+    monkeypatch.undo()
+    assert await buffer.flush() == 3
+    assert count_rows(UserQuery, UserQuery.query_text == 'слово0') == 0
+    assert count_rows(UserQuery, UserQuery.query_text == 'слово4') == 1
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from conftest import count_rows
+from models.database import RateLimitCounter
+from services import rate_limiter as rate_limiter_module
+from services.rate_limiter import (
+    DatabaseRateLimitBackend,
+    MemoryRateLimitBackend,
+    RateLimiter,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeClock:
+    def __init__(self, now: float = 6000.0) -> None:
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter_module, 'time', clock)
+    return clock
+
+
+class BrokenSession:
+    bind = None
+
+    async def __aenter__(self) -> 'BrokenSession':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    async def scalar(self, *args, **kwargs) -> None:
+        raise RuntimeError('database is down')
+
+    async def rollback(self) -> None:
+        pass
+
+
+async def test_memory_backend_limits_each_key_within_the_window(clock):
+    backend = MemoryRateLimitBackend()
+
+    assert [await backend.hit(1, 3, 60) for _ in range(4)] == [True, True, True, False]
+    assert await backend.hit(2, 3, 60)
+
+    clock.now += 59
+    assert not await backend.hit(1, 3, 60)
+    clock.now += 1
+    assert await backend.hit(1, 3, 60)
+
+
+async def test_memory_backend_evicts_least_recently_used_keys(clock):
+    backend = MemoryRateLimitBackend(max_keys=2)
+    for key in (1, 2, 3):
+        await backend.hit(key, 1, 60)
+
+    assert len(backend) == 2
+    # Key 1 was evicted, so its earlier hit no longer counts.
+    assert await backend.hit(1, 1, 60)
+    assert not await backend.hit(3, 1, 60)
+
+
+async def test_memory_backend_drops_idle_keys(clock):
+    backend = MemoryRateLimitBackend()
+    for key in range(5):
+        await backend.hit(key, 1, 60)
+
+    clock.now += 60
+    await backend.hit(100, 1, 60)
+    assert len(backend) == 1
+
+
+async def test_database_backend_lets_exactly_limit_concurrent_hits_through(database, clock):
+    backend = DatabaseRateLimitBackend()
+
+    results = await asyncio.gather(*(backend.hit(1, 5, 60) for _ in range(20)))
+
+    assert results.count(True) == 5
+    assert backend.errors == 0
+    assert not await backend.hit(1, 5, 60)
+    assert await backend.hit(2, 5, 60)
+
+
+async def test_database_backend_weights_the_previous_window(database, clock):
+    backend = DatabaseRateLimitBackend()
+    clock.now = 6000.0
+    for _ in range(4):
+        assert await backend.hit(1, 4, 60)
+
+    # A quarter into the next window, 3/4 of the previous four hits still
+    # count, leaving room for one more.
+    clock.now = 6075.0
+    assert await backend.hit(1, 4, 60)
+    assert not await backend.hit(1, 4, 60)
+
+    # Counters older than the previous window are removed.
+    clock.now = 6200.0
+    assert await backend.hit(1, 4, 60)
+    assert count_rows(RateLimitCounter, RateLimitCounter.user_id == 1) == 1
+
+
+async def test_database_backend_fails_open(monkeypatch):
+    backend = DatabaseRateLimitBackend()
+    monkeypatch.setattr(rate_limiter_module, 'get_async_session', BrokenSession)
+
+    assert await backend.hit(1, 1, 60)
+    assert await backend.hit(1, 1, 60)
+    assert backend.errors == 2
+
+
+async def test_rate_limiter_counts_decisions(clock):
+    limiter = RateLimiter(MemoryRateLimitBackend(), limit=2, window=60)
+
+    assert [await limiter.allow(7) for _ in range(3)] == [True, True, False]
+    assert limiter.stats() == {'allowed': 2, 'rejected': 1, 'backend_errors': 0}
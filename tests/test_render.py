@@ -0,0 +1,79 @@
+import pytest
+
+from services.render import (
+    Template,
+    escape_html,
+    render_examples,
+    render_spell_check_result,
+)
+
+
+def test_escape_html_only_touches_markup_characters():
+    assert escape_html('<b>&"\'') == '&lt;b&gt;&amp;"\''
+    assert escape_html('слово') == 'слово'
+    assert escape_html(42) == '42'
+
+
+def test_html_template_escapes_fields_but_not_its_markup():
+    template = Template('<b>{word}</b> ({count})', html=True)
+
+    assert template.render(word='<i>x</i> & y', count=3) == '<b>&lt;i&gt;x&lt;/i&gt; &amp; y</b> (3)'
+
+
+def test_s_conversion_marks_prebuilt_markup():
+    template = Template('<i>{markup!s}</i> {word}', html=True)
+
+    assert template.render(markup='a</i>, <i>b', word='<x>') == '<i>a</i>, <i>b</i> &lt;x&gt;'
+
+
+def test_plain_template_is_not_escaped():
+    assert Template('{word} → {lemma}').render(word='<a>', lemma='&') == '<a> → &'
+
+
+def test_literal_braces_and_repeated_fields():
+    template = Template('{{{word}}} {word}', html=True)
+
+    assert template.fields == ('word',)
+    assert template.render(word='<') == '{&lt;} &lt;'
+
+
+def test_render_into_matches_render():
+    template = Template('{number}. <b>{word}</b>\n', html=True)
+    out = []
+    template.render_into(out, number=1, word='a&b')
+    template.render_into(out, number=2, word='c')
+
+    assert out == [template.render(number=1, word='a&b'), template.render(number=2, word='c')]
+
+
+@pytest.mark.parametrize('source', [
+    '{word.attr}',
+    '{items[0]}',
+    '{0}',
+    '{}',
+    '{word:>10}',
+    '{word!r}',
+])
+def test_unsupported_fields_are_rejected(source):
+    with pytest.raises(ValueError):
+        Template(source)
+
+
+def test_missing_value_raises():
+    with pytest.raises(KeyError):
+        Template('{word}').render()
+
+
+def test_spell_check_result_escapes_words_and_suggestions():
+    text = render_spell_check_result([{'word': '<script>', 'pos': 0, 's': ['a&b', 'c']}])
+
+    assert '<b>&lt;script&gt;</b>' in text
+    assert '<i>a&amp;b</i>, <i>c</i>' in text
+
+
+def test_examples_are_escaped():
+    text = render_examples('<w>', ['1. x < y', 'a & b'])
+
+    assert '"&lt;w&gt;"' in text
+    assert '1. x &lt; y\n' in text
+    assert '2. a &amp; b\n' in text
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+
+from conftest import count_rows
+from models.database import UserQuery, engine
+from services.retention import compact_history, delete_expired, trim_users
+
+pytestmark = pytest.mark.asyncio
+
+
+def seed(user_id: int, ages_in_days) -> None:
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(UserQuery), [
+            {
+                'user_id': user_id,
+                'command': '/analyze',
+                'query_text': f'запрос {age}',
+                'response_text': '{}',
+                'created_at': now - timedelta(days=age),
+            }
+            for age in ages_in_days
+        ])
+
+
+def texts_of(user_id: int):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(UserQuery.query_text).where(UserQuery.user_id == user_id).order_by(UserQuery.created_at)
+        ).scalars().all()
+
+
+async def test_trim_users_keeps_the_newest_rows_per_user(database):
+    seed(1, range(10))
+    seed(2, range(3))
+    seed(3, range(5))
+
+    assert await trim_users(keep=3, batch_users=1) == 7 + 2
+
+    assert texts_of(1) == ['запрос 2', 'запрос 1', 'запрос 0']
+    assert count_rows(UserQuery, UserQuery.user_id == 2) == 3
+    assert count_rows(UserQuery, UserQuery.user_id == 3) == 3
+
+
+async def test_trim_users_without_a_limit_keeps_everything(database):
+    seed(1, range(10))
+
+    assert await trim_users(keep=0) == 0
+    assert count_rows(UserQuery) == 10
+
+
+async def test_delete_expired_removes_only_old_rows_in_batches(database):
+    seed(1, [0, 1, 29, 31, 40, 100])
+    seed(2, [31, 32, 33, 60, 90])
+
+    assert await delete_expired(days=30, batch_rows=2) == 3 + 5
+
+    assert texts_of(1) == ['запрос 29', 'запрос 1', 'запрос 0']
+    assert count_rows(UserQuery, UserQuery.user_id == 2) == 0
+
+
+async def test_delete_expired_with_an_exact_batch_multiple(database):
+    seed(1, [40, 41, 42, 43])
+
+    assert await delete_expired(days=30, batch_rows=2) == 4
+    assert count_rows(UserQuery) == 0
+
+
+async def test_default_compaction_deletes_nothing(database):
+    seed(1, [0, 400, 4000])
+
+    stats = await compact_history()
+
+    assert stats['expired'] == stats['trimmed'] == 0
+    assert count_rows(UserQuery) == 3
+
+
+async def test_compaction_applies_both_limits(database):
+    seed(1, [0, 1, 2, 3, 50])
+
+    stats = await compact_history(keep_rows=2, keep_days=30)
+
+    assert stats['expired'] == 1
+    assert stats['trimmed'] == 2
+    assert texts_of(1) == ['запрос 1', 'запрос 0']
@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import count_rows
+from models.database import UserQuery
+from services.query_log import query_log
+from services.user_service import clear_user_history, get_user_history, get_user_texts, save_query
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_history_includes_rows_still_in_the_buffer(database):
+    await save_query(1, '/analyze', 'слово', {'pos': 'NOUN'})
+    await save_query(1, '/pos', 'ещё слово')
+
+    history = await get_user_history(1)
+
+    assert [(command, query) for command, query, _ in history] == [
+        ('/pos', 'ещё слово'), ('/analyze', 'слово'),
+    ]
+
+
+async def test_user_texts_skip_uploaded_documents(database):
+    await save_query(1, '/lemmatize', 'мама мыла раму')
+    await save_query(1, '/spell_check_file', 'book.docx', {'errors': 3})
+    await save_query(1, '/lemmatize_file', 'book.txt')
+    await save_query(2, '/analyze', 'чужое')
+
+    assert await get_user_texts(1) == ['мама мыла раму']
+
+
+async def test_clear_history_removes_saved_and_buffered_rows(database):
+    await save_query(1, '/analyze', 'первое')
+    await query_log.flush()
+    await save_query(1, '/analyze', 'второе')
+    await save_query(2, '/analyze', 'чужое')
+
+    assert await clear_user_history(1) == 2
+
+    await query_log.flush()
+    assert count_rows(UserQuery, UserQuery.user_id == 1) == 0
+    assert count_rows(UserQuery, UserQuery.user_id == 2) == 1